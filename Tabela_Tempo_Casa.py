@@ -1,6 +1,15 @@
 import pandas as pd
-from datetime import date
-import numpy as np
+from instrumentacao import iniciar_execucao, etapa
+from saida_modelo import ler_tabela_modelo
+from atributos_derivados import tempo_de_casa_por_pessoa, tempo_de_casa_por_referencia, COLUNAS_TEMPO_CASA
+
+# Log de tempo/memória por etapa e etapa opcional a perfilar (ex.: 'classificacao')
+PASTA_LOG_EXECUCAO = 'logs_execucao'
+PERFILAR_ETAPA = None
+# Data(s) de referência do tempo de casa (None = hoje). Com mais de uma (ex.: [None, '2025-06-30', '2024-12-31'])
+# o CSV sai com uma linha por pessoa e data, com a coluna 'Data Referência' (todas as datas calculadas de uma vez)
+DATAS_REFERENCIA = [None]
+iniciar_execucao('Tabela_Tempo_Casa', PASTA_LOG_EXECUCAO, PERFILAR_ETAPA)
 
 # =======================================================================
 # 1. CARREGUE SEU DATAFRAME PRINCIPAL
@@ -8,69 +17,45 @@ import numpy as np
 # ATENÇÃO: Altere o caminho do arquivo para o seu caso
 caminho_arquivo = 'Base_MODELADA_PowerBI_V4.xlsx' 
 try:
-    # Tenta ler o arquivo
-    df_fatos = pd.read_excel(caminho_arquivo)
+    # Tenta ler a Fato (da pasta Parquet/CSV do modelo, se gravada, senão da aba do Excel), só com as colunas usadas
+    with etapa('leitura') as e:
+        try:
+            df_fatos = ler_tabela_modelo(caminho_arquivo, 'Fato_Contratos', colunas=COLUNAS_TEMPO_CASA)
+        except ValueError:
+            # Modelo antigo sem as colunas de afastamento/reintegração: só admissões
+            print("AVISO: Fato sem 'Data Afastamento'/'Data de Reintegração'/'Situação'. Desligamentos não serão considerados.")
+            df_fatos = ler_tabela_modelo(caminho_arquivo, 'Fato_Contratos', colunas=['Pessoa_ID', 'Admissão'])
+        e.saida(df_fatos)
     print(f"Dados carregados com sucesso de: {caminho_arquivo}")
 except FileNotFoundError:
     print(f"ERRO: Arquivo não encontrado no caminho: {caminho_arquivo}")
     print("Certifique-se de que o nome do arquivo e o caminho estão corretos.")
     # Cria um DataFrame vazio para evitar quebra do script, caso ocorra erro
-    df_fatos = pd.DataFrame(columns=['Pessoa_ID', 'Admissão'])
-
-
-# 2. TRATAMENTO INICIAL DE COLUNAS (garantir tipos)
-# Garante que a coluna 'Admissão' esteja em formato datetime. 
-# O errors='coerce' transforma datas inválidas/faltantes em NaT.
-df_fatos['Admissão'] = pd.to_datetime(df_fatos['Admissão'], errors='coerce').dt.normalize()
-
-# 3. CÁLCULO REVISADO: Meses na Empresa (Mais Preciso)
-# Esta lógica usa a média de dias no mês (30.4375) para calcular meses COMPLETOs,
-# resolvendo o problema de precisão do dia que ocorre no cálculo ano/mês simples.
-data_atual = pd.to_datetime(date.today())
-
-dias_na_empresa = (data_atual - df_fatos['Admissão']).dt.days
-
-# Arredonda para baixo (floor) para obter o número de meses COMPLETOS
-df_fatos['MesesNaEmpresa'] = np.floor(dias_na_empresa / 30.4375).astype('Int64')
-
-# 4. CRIAÇÃO DA COLUNA DE CATEGORIA (Lógica EXATA do Usuário)
-def classificar_tempo_de_casa(meses):
-    # 4.1. Trata valores NaN ou NaT (necessário para estabilidade)
-    if pd.isna(meses):
-        # Retorna uma etiqueta clara para dados inválidos
-        return "8. Data de Admissão Inválida"
-
-    # Conversão explícita para inteiro (Int64)
-    meses = int(meses)
-
-    # 4.2. Lógica de Classificação com Etiquetas do Usuário
-    if meses < 6:
-        return "1. Menos de 6 meses"
-    elif 6 <= meses < 12:
-        return "2. Mais de 6 meses" # 6 a 11 meses
-    elif 12 <= meses < 24:
-        return "3. 1 Ano"          # 12 a 23 meses
-    elif 24 <= meses < 36:
-        return "4. 2 Anos"          # 24 a 35 meses
-    elif 36 <= meses < 48:
-        return "5. 3 Anos"          # 36 a 47 meses
-    elif 48 <= meses < 60:
-        return "6. 4 Anos"          # 48 a 59 meses
-    elif meses >= 60:
-        return "7. 5 Anos ou Mais" # 60 meses ou mais
-    else:
-        # Caso catch-all
-        return "9. Não Classificado"
-
-df_fatos['Tempo de Casa Categoria Python'] = df_fatos['MesesNaEmpresa'].apply(classificar_tempo_de_casa)
-
-# 5. RESULTADO FINAL (DataFrame de Saída)
-# O Power BI só precisa da CHAVE e da NOVA COLUNA
+    df_fatos = pd.DataFrame(columns=COLUNAS_TEMPO_CASA)
+
+
+# 2. TEMPO DE CASA POR PESSOA (atributos_derivados.tempo_de_casa_por_pessoa)
+# Contratos ordenados por Pessoa_ID/Admissão: o período atual termina no desligamento (Situação 7 +
+# Data Afastamento) ou segue até a data de referência; reintegrações reabrem o contrato e readmissões
+# somam no tempo acumulado. Meses COMPLETOS pela média de 30.4375 dias por mês, arredondados para baixo.
+with etapa('calculo_meses', df_fatos) as e:
+    if 'Pessoa_ID' in df_fatos.columns:
+        if len(DATAS_REFERENCIA) > 1:
+            # Quem só foi admitido depois de uma data de referência não entra naquele retrato
+            df_pessoas = e.saida(tempo_de_casa_por_referencia(df_fatos, DATAS_REFERENCIA))
+        else:
+            df_pessoas = e.saida(tempo_de_casa_por_pessoa(df_fatos, DATAS_REFERENCIA[0]))
+        print(f"Tempo de casa calculado para {df_pessoas['Pessoa_ID'].nunique()} pessoas "
+              f"({len(df_fatos)} contratos, {len(DATAS_REFERENCIA)} data(s) de referência).")
+
+# 3. RESULTADO FINAL (DataFrame de Saída)
+# Uma linha por pessoa (por data de referência): Pessoa_ID é chave única para o relacionamento no Power BI
 if 'Pessoa_ID' in df_fatos.columns:
-    df_resultado = df_fatos[['Pessoa_ID', 'Tempo de Casa Categoria Python']].copy()
+    df_resultado = df_pessoas
     
     # Salva em CSV para que o Power BI acesse o dado
-    df_resultado.to_csv('TempoDeCasa_Calculado.csv', index=False, encoding='utf-8')
+    with etapa('escrita_csv', df_resultado):
+        df_resultado.to_csv('TempoDeCasa_Calculado.csv', index=False, encoding='utf-8')
     print("\nCálculo finalizado!")
     print("Arquivo 'TempoDeCasa_Calculado.csv' gerado com as categorias atualizadas conforme sua solicitação.")
 else:
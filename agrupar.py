@@ -1,26 +1,110 @@
 import pandas as pd
+import numpy as np
 import os
 import time
-from datetime import date
 import re
-from gender_guesser_br import Genero
-import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from inferencia_sexo import abrir_indice_sexo, consultar_ibge
+from normalizacao import padronizar_nomes, limpar_chaves
+from datas import converter_datas, converter_coluna_data, colunas_de_data, converter_coluna_duracao
+from intermediario import salvar_intermediario, ler_intermediario, GravadorIntermediario
+from leitura_lotes import ler_em_lotes
+from cache_ingestao import ler_excel_com_cache
+from registro_chaves import RegistroChaves
+from saida_modelo import salvar_tabelas
+from plano_tipos import aplicar_plano_tipos, compactar_chaves, preencher_vazios
+from atributos_derivados import adicionar_idade_faixa_etaria
+from headcount import fato_headcount_mensal
+from instrumentacao import iniciar_execucao, finalizar_execucao, etapa, medir_etapa
+from modelo_incremental import (
+    carregar_estado, salvar_estado, marcar_linhas, separar_delta, mesclar_dimensao, podar_dimensoes,
+    COLUNA_CHAVE_CONTRATO, COLUNA_PESSOA_ORIGEM, COLUNAS_CONTROLE
+)
 
 PASTA_ORIGEM_ONEDRIVE = r"C:\Users\LuisGuilhermeMoraesd\Nefroclinicas Serviço de Nefrologia e Dialise Ltda\Nefroclinicas - 07 - DADOS (1)"
 PASTA_TRABALHO = r"C:\Users\LuisGuilhermeMoraesd\OneDrive - Nefroclinicas Serviço de Nefrologia e Dialise Ltda\Área de Trabalho\Limpar_Dados"
 
 # Nomes dos arquivos de saída e auxiliares
 ARQUIVO_SEXO = os.path.join(PASTA_TRABALHO, "Nomes_e_Sexo_Inferido.xlsx")
+ARQUIVO_INDICE_SEXO = os.path.join(PASTA_TRABALHO, "indice_sexo.sqlite")
 ARQUIVO_INTERMEDIARIO_CSV = os.path.join(PASTA_TRABALHO, "Base_BI_Consolidada2.csv")
+# Formato da base intermediária: 'csv', 'parquet' ou 'feather' (os colunares preservam os tipos;
+# com MANTER_CSV_INTERMEDIARIO o CSV continua sendo gravado para compatibilidade)
+FORMATO_INTERMEDIARIO = 'parquet'
+MANTER_CSV_INTERMEDIARIO = True
 ARQUIVO_FINAL_MODELADO = os.path.join(PASTA_TRABALHO, "Base_MODELADA_PowerBI_V4.xlsx")
+# Saídas do modelo: 'xlsx' (a pasta de trabalho acima), 'parquet' e/ou 'csv' (pasta com um arquivo por
+# tabela ao lado dela, ex.: Base_MODELADA_PowerBI_V4_parquet\Fato_Contratos.parquet, lida direto pelo Power BI)
+FORMATOS_SAIDA_MODELO = ['xlsx']
+
+# Modo incremental: reaproveita o estado da última modelagem, reprocessa só os contratos
+# novos/alterados e mantém os IDs (chaves suplementares) já atribuídos
+MODO_INCREMENTAL = True
+PASTA_ESTADO_MODELO = os.path.join(PASTA_TRABALHO, "estado_modelo")
+# Registro persistente chave natural -> ID das dimensões (compartilhado com faltas.py)
+ARQUIVO_REGISTRO_CHAVES = os.path.join(PASTA_TRABALHO, "registro_chaves.sqlite")
 
 # Arquivos Auxiliares (Faltas e Absenteísmo)
 ARQUIVO_FALTAS = os.path.join(PASTA_TRABALHO, "faltas_cpf.csv")
 ARQUIVO_ABS = os.path.join(PASTA_TRABALHO, "abs_atualizado.csv")
+# Colunas de horas (HHH:MM[:SS]) dos auxiliares, gravadas no modelo como minutos inteiros em '<coluna> (min)'
+COLUNAS_DURACAO = ['Previsto', 'Ausência', 'Presença']
+
+# Ingestão do export Excel: motor de leitura ('calamine' se instalado; None = padrão do pandas)
+# e pasta do cache binário reaproveitado enquanto o arquivo de origem não mudar
+MOTOR_EXCEL = 'calamine'
+PASTA_CACHE_INGESTAO = os.path.join(PASTA_TRABALHO, "cache_ingestao")
+
+# Consolidação em lotes para exports muito grandes: com um tamanho (ex.: 50_000) o export é
+# lido, tratado e gravado na base intermediária lote a lote, com memória limitada; None = tudo de uma vez
+TAMANHO_LOTE_CONSOLIDACAO = None
+
+# Consultas remotas de sexo (IBGE) para primeiros nomes novos: paralelismo, timeout (s), retentativas
+# e prazo total (s) da rodada; nomes sem resposta no prazo ficam para a próxima execução
+MAX_CONSULTAS_SEXO_SIMULTANEAS = 8
+TIMEOUT_CONSULTA_SEXO = 10
+TENTATIVAS_CONSULTA_SEXO = 3
+PRAZO_TOTAL_CONSULTAS_SEXO = 300
+
+# Log de execução (tempo, CPU, linhas e memória por etapa, em JSON + CSV histórico) e
+# perfilamento opcional de UMA etapa pelo nome (ex.: 'escrita_modelo'); PERFILADOR 'cprofile' ou 'pyinstrument'
+PASTA_LOG_EXECUCAO = os.path.join(PASTA_TRABALHO, "logs_execucao")
+PERFILAR_ETAPA = None
+PERFILADOR = 'cprofile'
+
+# Ordem de resolução do Pessoa_ID das linhas da Fato: 'cpf' (só dígitos), 'nome_nascimento' (a chave da
+# Dim_Pessoa) e 'nome' (nome padronizado, apenas quando não há homônimos na dimensão)
+PRIORIDADE_RESOLUCAO_PESSOA = ['cpf', 'nome_nascimento', 'nome']
+
+# Data de referência da 'Idade Atual' e da faixa etária (None = hoje; ex.: '2025-12-31' refaz um retrato histórico)
+DATA_REFERENCIA_ATRIBUTOS = None
+# Fato_Headcount_Mensal (headcount, admissões, desligamentos e turnover por mês e Filial/C.Custo/Cargo)
+GERAR_HEADCOUNT_MENSAL = True
+# Fato_Faltas e Fato_Absenteismo não têm data de nascimento: CPF (quando houver) e depois o nome.
+# As linhas sem pessoa continuam nas tabelas (Pessoa_ID vazio) e são listadas no relatório de rejeitos
+PRIORIDADE_RESOLUCAO_AUSENCIAS = ['cpf', 'nome']
+ARQUIVO_REJEITOS_AUSENCIAS = os.path.join(PASTA_TRABALHO, "ausencias_sem_pessoa.csv")
+
+# Chaves de relacionamento padronizadas por limpar_chaves (normalizacao.py)
+COLUNAS_CHAVE = ['Nome', 'CPF', 'Empresa', 'Cadastro', 'Cargo', 'C.Custo', 'Filial']
 
 # Nome/Prefixo do arquivo único que contém todas as unidades (procura por nomes que comecem com isso)
 ARQUIVO_PREFIXO_UNICO = "relatório turnover - att"
 
+# Consolidação de vários exports: com MODO_MULTIPLOS_ARQUIVOS todos os .xls/.xlsx da pasta de origem que começam
+# com um dos prefixos abaixo são lidos em paralelo (um processo por arquivo, até MAX_PROCESSOS_LEITURA; None = nº de núcleos)
+MODO_MULTIPLOS_ARQUIVOS = False
+PREFIXOS_EXPORTS = [ARQUIVO_PREFIXO_UNICO, "ncipa - turnover"]
+MAX_PROCESSOS_LEITURA = None
+
+# Substituição de unidades na ingestão (antigo corrigir_IPANEMA.py): as linhas da unidade cujo valor em
+# COLUNA_UNIDADE é igual à chave (sem diferenciar maiúsculas) são trocadas, em memória, pelas linhas do
+# arquivo indicado na pasta de origem. O export original nunca é reescrito.
+COLUNA_UNIDADE = 'Nome (Empresa)'
+SUBSTITUICOES_UNIDADE = {
+    "Nefroclinicas Ipanema Servico de Nefrolo": "ncipa - turnover - Copiar.xlsx",
+}
+
 # Lista EXATA das colunas a serem extraídas e usadas no modelo
 COLUNAS_DESEJADAS = [
 'Nome', 'Sexo','CPF', 'Empresa', 'Cadastro', 'Admissão', 'Cargo', 'C.Custo', 
@@ -48,30 +132,6 @@ COLUNAS_DESEJADAS = [
 # 2. FUNÇÕES DE SUPORTE
 # =======================================================================
 
-def extrair_primeiro_nome(nome_completo):
-    if pd.isna(nome_completo):
-        return None
-    nome = str(nome_completo).strip()
-    nome_limpo_completo = re.sub(r'[^a-zA-Z\s]', ' ', nome) 
-    palavras = [p for p in nome_limpo_completo.split() if p]
-    if not palavras:
-        return None
-    return palavras[0].capitalize()
-
-def inferir_sexo_br(primeiro_nome):
-    if not primeiro_nome:
-        return None 
-    try:
-        resultado = Genero(primeiro_nome)() 
-        if resultado == 'masculino':
-            return 'Masculino'
-        elif resultado == 'feminino':
-            return 'Feminino'
-        else:
-            return None
-    except Exception:
-        return None 
-
 def formatar_cpf(cpf):
     cpf = str(cpf)
     cpf = re.sub(r'[^0-9]', '', cpf)
@@ -80,16 +140,7 @@ def formatar_cpf(cpf):
     else:
         return None
 
-def padronizar_nome_pessoa(nome):
-    if pd.isna(nome):
-        return None
-    nome = str(nome).strip()
-    nfkd = unicodedata.normalize('NFKD', nome)
-    nome_sem_acento = nfkd.encode('ASCII', 'ignore').decode('utf-8')
-    nome_limpo = re.sub(r'[^A-Z\s]', '', nome_sem_acento.upper())
-    nome_limpo = re.sub(r'\s+', ' ', nome_limpo)  # remove espaços duplos
-    return nome_limpo.strip()
-
+@medir_etapa('carregar_sexo_manual')
 def carregar_dados_sexo(caminho_arquivo):
     print(f"\n-> Carregando dados de Sexo de: {os.path.basename(caminho_arquivo)}")
     try:
@@ -114,12 +165,19 @@ def carregar_dados_sexo(caminho_arquivo):
         print(f"  ERRO ao processar o arquivo de sexo (EXCEL): {e}")
         return None
 
+@medir_etapa('leitura_export')
 def transformar_e_selecionar(caminho_arquivo_local, colunas_desejadas):
     nome_arquivo = os.path.basename(caminho_arquivo_local)
     if nome_arquivo.lower().endswith(('.xls', '.xlsx')):
         print(f"  -> Processando com Pandas: {nome_arquivo} (Lendo como Excel)")
         try:
-            df = pd.read_excel(caminho_arquivo_local)
+            # Só as colunas usadas são lidas ('Salário Simulado' entra para o rename abaixo)
+            df = ler_excel_com_cache(
+                caminho_arquivo_local,
+                colunas=list(colunas_desejadas) + ['Valor Salário', 'Salário Simulado'],
+                pasta_cache=PASTA_CACHE_INGESTAO,
+                motor=MOTOR_EXCEL
+            )
         except Exception as e:
             print(f"  ERRO CRÍTICO ao ler {nome_arquivo} como Excel: {e}")
             return None
@@ -135,14 +193,18 @@ def transformar_e_selecionar(caminho_arquivo_local, colunas_desejadas):
                 print(f"  Detalhes: {e}")
                 return None
 
+    return selecionar_colunas_export(df, colunas_desejadas, nome_arquivo)
+
+def selecionar_colunas_export(df, colunas_desejadas, nome_arquivo, avisar=True):
     df.columns = df.columns.str.strip()
     colunas_reais = df.columns.tolist()
     if 'Valor Salário' not in colunas_reais and 'Salário Simulado' in colunas_reais:
         df.rename(columns={'Salário Simulado': 'Valor Salário'}, inplace=True)
-        print(f"  AVISO: 'Salário Simulado' renomeado para 'Valor Salário' em {nome_arquivo}.")
+        if avisar:
+            print(f"  AVISO: 'Salário Simulado' renomeado para 'Valor Salário' em {nome_arquivo}.")
     colunas_presentes = [col.strip() for col in colunas_desejadas if col.strip() in df.columns]
     colunas_ausentes = [col.strip() for col in colunas_desejadas if col.strip() not in df.columns]
-    if colunas_ausentes:
+    if colunas_ausentes and avisar:
         print(f"  AVISO: Colunas não encontradas e IGNORADAS em {nome_arquivo}: {colunas_ausentes}")
     try:
         df_selecionado = df[colunas_presentes].copy()
@@ -153,31 +215,13 @@ def transformar_e_selecionar(caminho_arquivo_local, colunas_desejadas):
         print(f"  ERRO: Seleção final falhou após o mapeamento. Detalhes: {e}")
         return None
 
-def limpar_chave(df, coluna_id):
-    if coluna_id in df.columns:
-        if df[coluna_id].dtype in ['int64', 'float64']:
-            df[coluna_id] = df[coluna_id].astype(str).str.replace(r'\.0$', '', regex=True)
-        df[coluna_id] = df[coluna_id].astype(str).str.strip().str.upper().str.replace('NAN', '')
-    return df
-
-def calcular_idade_faixa_etaria(df):
+def calcular_idade_faixa_etaria(df, data_ref=None):
     if 'Nascimento' in df.columns:
-        print("Calculando 'Idade Atual' e 'Faixa Etária'...")
-        hoje = pd.to_datetime(date.today())
-        df['Nascimento'] = pd.to_datetime(df['Nascimento'], errors='coerce', dayfirst=True)
-        df['Idade Atual'] = (hoje - df['Nascimento']).dt.days / 365.25
-        df['Idade Atual'] = df['Idade Atual'].apply(lambda x: int(x) if pd.notna(x) else pd.NA).astype('Int64')
-        bins = [0, 20, 25, 30, 35, 40, 50, 60, 100]
-        labels = [
-            "1. Abaixo de 20", "2. 20 - 24 Anos", "3. 25 - 29 Anos", "4. 30 - 34 Anos",
-            "5. 35 - 39 Anos", "6. 40 - 49 Anos", "7. 50 - 59 Anos", "8. 60 ou Mais"
-        ]
-        df['Faixa Etária (Pirâmide)'] = pd.cut(
-            df['Idade Atual'],
-            bins=bins,
-            labels=labels,
-            right=False
-        ).astype(str).str.replace('nan', '9. Idade Inválida')
+        data_ref = data_ref if data_ref is not None else DATA_REFERENCIA_ATRIBUTOS
+        print(f"Calculando 'Idade Atual' e 'Faixa Etária' (referência: {data_ref or 'hoje'})...")
+        # Já convertida na etapa de datas; só converte se vier como texto
+        df['Nascimento'], _ = converter_coluna_data(df['Nascimento'])
+        adicionar_idade_faixa_etaria(df, data_ref)
         print("Colunas 'Idade Atual' e 'Faixa Etária' adicionadas à Dim_Pessoa.")
     else:
         print("AVISO: Coluna 'Nascimento' não encontrada. Idade não calculada.")
@@ -196,33 +240,214 @@ def etl_processa_csv_auxiliar(caminho_arquivo, nome_tabela):
         except Exception as e:
             print(f"  ERRO CRÍTICO ao ler {os.path.basename(caminho_arquivo)} como CSV. Detalhes: {e}")
             return None
-    df.columns = df.columns.str.strip().str.replace(r'[^a-zA-Z0-9\s\(\)%]', '', regex=True)
+    # \w mantém as letras acentuadas ('Ausência' não vira 'Ausncia')
+    df.columns = df.columns.str.strip().str.replace(r'[^\w\s\(\)%]', '', regex=True)
     if 'Nome' in df.columns:
         df['Nome'] = df['Nome'].astype(str).str.strip().str.upper()
         print("  Coluna 'Nome' padronizada (Upper, Strip).")
-    colunas_para_limpar = ['Previsto', 'Ausencia', 'Presenca']
-    for col in colunas_para_limpar:
+    for col in COLUNAS_DURACAO:
         if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.strip()
-                .str.replace(r'(?<=\d{2}):\d{2}$', '', regex=True)
-                .apply(lambda x: re.sub(r'^(\d{1,3}):(\d{1})$', r'\1:0\2', x))
-                .str.strip()
-            )
-            print(f"  ✅ Coluna '{col}' padronizada para HH:MM (sem segundos).")
+            df[col], invalidos = converter_coluna_duracao(df[col])
+            df.rename(columns={col: f"{col} (min)"}, inplace=True)
+            aviso = f" ({invalidos} valores fora do formato HH:MM viraram vazio)" if invalidos else ""
+            print(f"  ✅ Coluna '{col}' convertida para minutos em '{col} (min)'{aviso}.")
         else:
             print(f"  ⚠️ Coluna '{col}' não encontrada para limpeza.")
+    if 'ABS' in df.columns:
+        # '7,22%' -> 0.0722 (fração: o Power BI exibe com o formato de porcentagem)
+        texto = df['ABS'].astype('string').str.strip().str.rstrip('%').str.replace(',', '.', regex=False)
+        df['ABS'] = pd.to_numeric(texto, errors='coerce').astype('float64') / 100
+        invalidos = int((df['ABS'].isna() & texto.notna() & (texto != '')).sum())
+        if invalidos:
+            print(f"  AVISO: {invalidos} valores de 'ABS' não numéricos viraram vazio.")
+    if {'Previsto (min)', 'Ausência (min)'}.issubset(df.columns) and df['Previsto (min)'].sum():
+        print(f"  Absenteísmo geral: {df['Ausência (min)'].sum() / df['Previsto (min)'].sum():.2%} "
+              f"(ausência / previsto, em minutos).")
     print(f"  Tabela '{nome_tabela}' processada com {len(df)} linhas.")
     return df
 
+@medir_etapa('inferencia_sexo')
+def preencher_sexo(df, df_sexo, caminho_indice=None, consulta_remota=None, indice_sexo=None):
+    # Prioridade: planilha manual de sexo; o restante é inferido pelo primeiro nome.
+    # Com `indice_sexo` aberto pelo chamador (consolidação em lotes) o índice é reaproveitado e não é fechado aqui.
+    df.drop(columns=['Sexo'], inplace=True, errors='ignore')
+    if 'Sexo' not in df.columns:
+        df['Sexo'] = pd.NA
+
+    if df_sexo is not None and 'Nome' in df.columns:
+        print("\n-> Realizando Merge com a informação de Sexo do Excel (Prioridade Manual)...")
+        df_merged = pd.merge(
+            df.drop(columns=['Sexo'], errors='ignore'),
+            df_sexo,
+            on='Nome',
+            how='left'
+        )
+        df = df_merged
+        print(f" Merge concluído. {df['Sexo'].count()} valores de Sexo manual/existente carregados.")
+    else:
+        print(" AVISO: Arquivo de Sexo manual não carregado. Pulando merge.")
+
+    condicao_inferir = df['Sexo'].isna()
+    df_a_inferir = df[condicao_inferir].copy()
+
+    if not df_a_inferir.empty:
+        total_a_inferir = len(df_a_inferir)
+        print(f"\n -> Aplicando Inferência por primeiro nome (índice local + IBGE para nomes novos) a {total_a_inferir} registros NA/Nulos...")
+        indice_proprio = indice_sexo is None
+        if indice_proprio:
+            indice_sexo = abrir_indice_sexo(caminho_indice or ARQUIVO_INDICE_SEXO, df_sexo, df[['Nome', 'Sexo']].dropna())
+        novos_sexos = indice_sexo.inferir_serie(
+            df_a_inferir['Nome'],
+            consulta_remota=consulta_remota or consultar_ibge,
+            max_concorrencia=MAX_CONSULTAS_SEXO_SIMULTANEAS,
+            timeout=TIMEOUT_CONSULTA_SEXO,
+            tentativas=TENTATIVAS_CONSULTA_SEXO,
+            prazo_total=PRAZO_TOTAL_CONSULTAS_SEXO
+        )
+        if indice_proprio:
+            indice_sexo.imprimir_estatisticas()
+            indice_sexo.fechar()
+        sucesso_br = novos_sexos.dropna()
+        df.loc[sucesso_br.index, 'Sexo'] = sucesso_br
+        print(f" {sucesso_br.count()} valores de Sexo preenchidos por Inferência.")
+    else:
+        print(" Nenhum valor nulo (NA) de Sexo restante para inferência. Passo ignorado.")
+    return df
+
 # =======================================================================
 # 3. LÓGICA PRINCIPAL: CONSOLIDAÇÃO (ETL) - atualizado para arquivo único
 # =======================================================================
 
-def etl_consolida_e_salva_csv(colunas_desejadas):
+def localizar_exports(pasta, prefixos):
+    """Exports .xls/.xlsx da pasta cujo nome começa com um dos prefixos (sem backups e temporários do Excel)."""
+    prefixos = tuple(p.lower() for p in prefixos)
+    encontrados = []
+    for f in sorted(os.listdir(pasta)):
+        nome = f.lower()
+        if not os.path.isfile(os.path.join(pasta, f)) or f.startswith(('.', '~$')):
+            continue
+        if nome.startswith(prefixos) and nome.endswith(('.xls', '.xlsx')) and '_backup' not in nome:
+            encontrados.append(os.path.join(pasta, f))
+    return encontrados
+
+def localizar_substituicoes(pasta, substituicoes):
+    """Resolve {unidade: arquivo} para caminhos na pasta de origem; arquivos ausentes são ignorados com aviso."""
+    encontrados = {}
+    for unidade, arquivo in substituicoes.items():
+        caminho = os.path.join(pasta, arquivo)
+        if os.path.isfile(caminho):
+            encontrados[unidade] = caminho
+        else:
+            print(f"  AVISO: Arquivo substituto '{arquivo}' da unidade '{unidade}' não encontrado. Unidade mantida do export.")
+    return encontrados
+
+def mascara_unidades(df, unidades, coluna=None):
+    """Linhas cuja unidade é uma das informadas (comparação exata, sem diferenciar maiúsculas/espaços)."""
+    coluna = coluna or COLUNA_UNIDADE
+    if coluna not in df.columns or not unidades:
+        return pd.Series(False, index=df.index)
+    # Comparação feita só sobre os valores distintos da coluna
+    codigos, unicos = pd.factorize(df[coluna])
+    alvos = {str(u).strip().upper() for u in unidades}
+    bate = np.array([str(v).strip().upper() in alvos for v in unicos] + [False])
+    return pd.Series(bate[codigos], index=df.index)
+
+@medir_etapa('substituicao_unidades')
+def aplicar_substituicoes(df, substitutos):
+    """Remove as linhas das unidades substituídas que não vieram do próprio arquivo substituto."""
+    origens = set(df['Origem_Arquivo'].unique())
+    remover = pd.Series(False, index=df.index)
+    for unidade, caminho in substitutos.items():
+        nome_substituto = os.path.basename(caminho)
+        if nome_substituto not in origens:
+            print(f"  AVISO: '{nome_substituto}' não foi lido. Linhas da unidade '{unidade}' mantidas do export.")
+            continue
+        da_unidade = mascara_unidades(df, [unidade]) & df['Origem_Arquivo'].ne(nome_substituto)
+        if not da_unidade.any():
+            print(f"  AVISO: Nenhuma linha da unidade '{unidade}' encontrada nos exports (confira a chave em SUBSTITUICOES_UNIDADE).")
+        print(f"  Unidade '{unidade}': {int(da_unidade.sum())} linhas removidas, "
+              f"{int(df['Origem_Arquivo'].eq(nome_substituto).sum())} inseridas de {nome_substituto}.")
+        remover |= da_unidade
+    return df[~remover].reset_index(drop=True)
+
+def _configurar_processo_leitura(motor, pasta_cache):
+    # Os processos de leitura importam este módulo do zero (Windows): repassa a configuração em uso
+    global MOTOR_EXCEL, PASTA_CACHE_INGESTAO
+    MOTOR_EXCEL, PASTA_CACHE_INGESTAO = motor, pasta_cache
+
+def _ler_export_com_origem(caminho_arquivo, colunas_desejadas):
+    df = transformar_e_selecionar(caminho_arquivo, colunas_desejadas)
+    if df is not None:
+        df['Origem_Arquivo'] = os.path.basename(caminho_arquivo)
+    return df
+
+@medir_etapa('leitura_exports')
+def ler_exports(arquivos, colunas_desejadas, max_processos=None):
+    """Lê e seleciona as colunas de cada export; com mais de um arquivo, cada um em um processo."""
+    processos = min(len(arquivos), max_processos or os.cpu_count() or 1)
+    if processos <= 1:
+        resultados = []
+        for arquivo in arquivos:
+            try:
+                resultados.append(_ler_export_com_origem(arquivo, colunas_desejadas))
+            except Exception as e:
+                print(f"  ERRO ao processar {os.path.basename(arquivo)}: {e}")
+                resultados.append(None)
+    else:
+        print(f"-> Lendo {len(arquivos)} arquivos em {processos} processos paralelos...")
+        with ProcessPoolExecutor(max_workers=processos, initializer=_configurar_processo_leitura,
+                                 initargs=(MOTOR_EXCEL, PASTA_CACHE_INGESTAO)) as executor:
+            futuros = [executor.submit(_ler_export_com_origem, arquivo, colunas_desejadas) for arquivo in arquivos]
+            resultados = []
+            for arquivo, futuro in zip(arquivos, futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    print(f"  ERRO ao processar {os.path.basename(arquivo)}: {e}")
+                    resultados.append(None)
+
     lista_dataframes = []
+    for arquivo, df in zip(arquivos, resultados):
+        if df is not None and not df.empty:
+            lista_dataframes.append(df)
+            print(f" Arquivo {os.path.basename(arquivo)} processado com sucesso. Linhas: {len(df)}")
+        else:
+            print(f" ERRO: Não foi possível processar o arquivo {os.path.basename(arquivo)}.")
+    return lista_dataframes
+
+def alinhar_esquemas(dataframes):
+    """Une as colunas dos exports e alinha tipos divergentes antes do concat."""
+    colunas = list(dict.fromkeys(col for df in dataframes for col in df.columns))
+    for col in colunas:
+        tipos = {df[col].dtype for df in dataframes if col in df.columns}
+        if len(tipos) <= 1:
+            continue
+        # Ex.: Cadastro lido como float (por causa de vazios) num arquivo e como texto em outro:
+        # os inteiros voltam a ser inteiros para não virarem '123.0' no texto das chaves
+        for df in dataframes:
+            if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+                valores = df[col].dropna()
+                if (valores % 1 == 0).all():
+                    df[col] = df[col].astype('Int64').astype(object).where(df[col].notna(), float('nan'))
+    return [df.reindex(columns=colunas) for df in dataframes]
+
+def avisar_contratos_repetidos(df):
+    # O mesmo contrato (Empresa + Cadastro) vindo de mais de um arquivo indica exports sobrepostos
+    if not {'Empresa', 'Cadastro', 'Origem_Arquivo'}.issubset(df.columns):
+        return
+    chave = df['Empresa'].astype(str) + '|' + df['Cadastro'].astype(str)
+    arquivos_por_chave = df.groupby(chave)['Origem_Arquivo'].nunique()
+    repetidos = int((arquivos_por_chave > 1).sum())
+    if repetidos:
+        print(f"  AVISO: {repetidos} contratos (Empresa + Cadastro) aparecem em mais de um arquivo.")
+
+@medir_etapa('plano_tipos')
+def tipar_base_consolidada(df):
+    print("\n-> Aplicando plano de tipos à base consolidada...")
+    return aplicar_plano_tipos(df, colunas_chave=COLUNAS_CHAVE)
+
+@medir_etapa('consolidacao')
+def etl_consolida_e_salva_csv(colunas_desejadas):
     print("\n" + "="*70)
     print(f"ETAPA 1/2: CONSOLIDAÇÃO E INFERÊNCIA DE SEXO | Início: {time.ctime()}")
     print("="*70)
@@ -230,92 +455,72 @@ def etl_consolida_e_salva_csv(colunas_desejadas):
     # PASSO 0: Carregar Dados Auxiliares (Sexo)
     df_sexo = carregar_dados_sexo(ARQUIVO_SEXO)
 
-    # 1. BUSCAR O ARQUIVO ÚNICO PELO PREFIXO
+    # 1. BUSCAR O(S) ARQUIVO(S) PELO PREFIXO
+    prefixos = PREFIXOS_EXPORTS if MODO_MULTIPLOS_ARQUIVOS else [ARQUIVO_PREFIXO_UNICO]
     try:
-        arquivos_na_pasta = [
-            f for f in os.listdir(PASTA_ORIGEM_ONEDRIVE)
-            if os.path.isfile(os.path.join(PASTA_ORIGEM_ONEDRIVE, f)) and not f.startswith('.')
-        ]
+        arquivos_match = localizar_exports(PASTA_ORIGEM_ONEDRIVE, prefixos)
     except FileNotFoundError:
         print(f"\nERRO: Pasta de origem não encontrada: {PASTA_ORIGEM_ONEDRIVE}.")
         return None
 
-    arquivos_match = [
-        os.path.join(PASTA_ORIGEM_ONEDRIVE, f)
-        for f in arquivos_na_pasta
-        if f.lower().startswith(ARQUIVO_PREFIXO_UNICO) and f.lower().endswith(('.xls', '.xlsx'))
-    ]
+    # Arquivos substitutos de unidades entram só pela substituição, nunca como export comum
+    substitutos = localizar_substituicoes(PASTA_ORIGEM_ONEDRIVE, SUBSTITUICOES_UNIDADE)
+    arquivos_match = [a for a in arquivos_match if a not in substitutos.values()]
 
     if not arquivos_match:
         print("\n" + "="*70)
-        print(f"ERRO: Nenhum arquivo começando com '{ARQUIVO_PREFIXO_UNICO}' (.xls/.xlsx) foi encontrado na pasta especificada.")
+        print(f"ERRO: Nenhum arquivo começando com {' / '.join(repr(p) for p in prefixos)} (.xls/.xlsx) foi encontrado na pasta especificada.")
         print(f"Caminho verificado: {PASTA_ORIGEM_ONEDRIVE}")
         print("="*70)
         return None
 
-    # pega o primeiro encontrado (se houver mais de um, usa o primeiro)
-    arquivo_unico = arquivos_match[0]
-    print(f"-> Arquivo único selecionado para processamento: {os.path.basename(arquivo_unico)}")
+    if MODO_MULTIPLOS_ARQUIVOS:
+        print(f"-> {len(arquivos_match)} exports encontrados para consolidação:")
+        for arquivo in arquivos_match:
+            print(f"   - {os.path.basename(arquivo)}")
+    else:
+        # pega o primeiro encontrado (se houver mais de um, usa o primeiro)
+        arquivos_match = arquivos_match[:1]
+        print(f"-> Arquivo único selecionado para processamento: {os.path.basename(arquivos_match[0])}")
 
-    # 2. Processamento do arquivo único (mantendo a lógica original)
-    df_processado = transformar_e_selecionar(arquivo_unico, colunas_desejadas)
+    if TAMANHO_LOTE_CONSOLIDACAO:
+        return consolidar_em_lotes(arquivos_match, colunas_desejadas, df_sexo=df_sexo,
+                                   tamanho_lote=TAMANHO_LOTE_CONSOLIDACAO, substitutos=substitutos)
 
-    if df_processado is not None and not df_processado.empty:
-        df_processado['Origem_Arquivo'] = os.path.basename(arquivo_unico)
-        lista_dataframes.append(df_processado)
-        print(f" Arquivo único processado com sucesso. Linhas: {len(df_processado)}")
-    else:
-        print(" ERRO: Não foi possível processar o arquivo único.")
-        return None
+    # 2. Leitura dos arquivos e dos substitutos de unidade (em paralelo quando houver mais de um)
+    lista_dataframes = ler_exports(arquivos_match + list(substitutos.values()), colunas_desejadas, MAX_PROCESSOS_LEITURA)
 
-    # 3. Combinação Final (apenas um arquivo agora)
+    # 3. Combinação Final: colunas e tipos alinhados entre os arquivos, concatenados de uma vez
     if lista_dataframes:
-        CONTEUDO_FINAL = pd.concat(lista_dataframes, ignore_index=True, sort=False)
+        CONTEUDO_FINAL = pd.concat(alinhar_esquemas(lista_dataframes), ignore_index=True, sort=False)
+        if substitutos:
+            CONTEUDO_FINAL = aplicar_substituicoes(CONTEUDO_FINAL, substitutos)
+        if len(lista_dataframes) > 1:
+            print(f" {len(lista_dataframes)} arquivos consolidados. Linhas: {len(CONTEUDO_FINAL)}")
+            avisar_contratos_repetidos(CONTEUDO_FINAL)
 
         # --- MERGE E INFERÊNCIA CONDICIONAL DE SEXO ---
-        CONTEUDO_FINAL.drop(columns=['Sexo'], inplace=True, errors='ignore')
-        if 'Sexo' not in CONTEUDO_FINAL.columns:
-            CONTEUDO_FINAL['Sexo'] = pd.NA
-
-        if df_sexo is not None and 'Nome' in CONTEUDO_FINAL.columns:
-            print("\n-> Realizando Merge com a informação de Sexo do Excel (Prioridade Manual)...")
-            df_merged = pd.merge(
-                CONTEUDO_FINAL.drop(columns=['Sexo'], errors='ignore'),
-                df_sexo,
-                on='Nome',
-                how='left'
-            )
-            CONTEUDO_FINAL = df_merged
-            print(f" Merge concluído. {CONTEUDO_FINAL['Sexo'].count()} valores de Sexo manual/existente carregados.")
-        else:
-            print(" AVISO: Arquivo de Sexo manual não carregado. Pulando merge.")
-
-        condicao_inferir = CONTEUDO_FINAL['Sexo'].isna()
-        df_a_inferir = CONTEUDO_FINAL[condicao_inferir].copy()
-
-        if not df_a_inferir.empty:
-            total_a_inferir = len(df_a_inferir)
-            print(f"\n -> Aplicando Inferência do IBGE (Lenta) a {total_a_inferir} registros NA/Nulos...")
-            df_a_inferir['Primeiro_Nome'] = df_a_inferir['Nome'].apply(extrair_primeiro_nome)
-            novos_sexos = df_a_inferir['Primeiro_Nome'].apply(inferir_sexo_br)
-            sucesso_br = novos_sexos.dropna()
-            CONTEUDO_FINAL.loc[sucesso_br.index, 'Sexo'] = sucesso_br
-            print(f" {sucesso_br.count()} valores de Sexo preenchidos por Inferência.")
-        else:
-            print(" Nenhum valor nulo (NA) de Sexo restante para inferência. Passo ignorado.")
+        CONTEUDO_FINAL = preencher_sexo(CONTEUDO_FINAL, df_sexo)
 
         # Garante que todas as colunas desejadas estejam presentes
         for col in [str(coluna).strip() for coluna in colunas_desejadas if coluna is not None]:
             if col not in CONTEUDO_FINAL.columns:
                 CONTEUDO_FINAL[col] = pd.NA
 
-        # Salvar o Resultado Intermediário (CSV)
+        # Tipos compactos (datas, percentuais, inteiros e categorias) para a Etapa 2 e a base colunar
+        CONTEUDO_FINAL = tipar_base_consolidada(CONTEUDO_FINAL)
+
+        # Salvar o Resultado Intermediário (CSV e/ou colunar)
         colunas_finais_ordenadas = [c.strip() for c in colunas_desejadas] + ['Origem_Arquivo']
         colunas_para_salvar = [col for col in colunas_finais_ordenadas if col in CONTEUDO_FINAL.columns]
-        CONTEUDO_FINAL[colunas_para_salvar].to_csv(ARQUIVO_INTERMEDIARIO_CSV, index=False, encoding='utf-8')
+        with etapa('salvar_intermediario', CONTEUDO_FINAL):
+            arquivos_salvos = salvar_intermediario(
+                CONTEUDO_FINAL[colunas_para_salvar], ARQUIVO_INTERMEDIARIO_CSV,
+                formato=FORMATO_INTERMEDIARIO, manter_csv=MANTER_CSV_INTERMEDIARIO
+            )
 
         print("\n" + "="*70)
-        print(f"ETAPA 1/2 COMPLETA! CSV Intermediário salvo em: {ARQUIVO_INTERMEDIARIO_CSV}")
+        print(f"ETAPA 1/2 COMPLETA! Base Intermediária salva em: {', '.join(arquivos_salvos)}")
         print(f"Total de linhas consolidadas: {len(CONTEUDO_FINAL)}")
         print("="*70)
         return CONTEUDO_FINAL
@@ -323,25 +528,74 @@ def etl_consolida_e_salva_csv(colunas_desejadas):
         print("\nNenhum arquivo pôde ser processado com sucesso.")
         return None
 
-# =======================================================================
-# 4. LÓGICA PRINCIPAL: MODELAGEM (ELT) - MANTIDA
-# =======================================================================
-
-def etl_modela_e_salva_excel(df_input, colunas_desejadas):
-    if df_input is None or df_input.empty:
-        print("ERRO: O DataFrame consolidado está vazio ou não foi gerado.")
-        return
+@medir_etapa('consolidacao_lotes')
+def consolidar_em_lotes(arquivos, colunas_desejadas, df_sexo, tamanho_lote, substitutos=None):
+    # Cada lote passa por seleção de colunas, sexo (manual + índice compartilhado) e limpeza das
+    # chaves, e é acrescentado à base intermediária; só o lote atual fica em memória.
+    # A limpeza de chaves repetida na Etapa 2 não altera valores já limpos. Vários arquivos são lidos em sequência;
+    # as unidades substituídas são descartadas dos exports e os arquivos substitutos entram no final.
+    substitutos = substitutos or {}
+    colunas_finais = [c.strip() for c in colunas_desejadas] + ['Origem_Arquivo']
+    print(f"-> Consolidação em lotes de até {tamanho_lote} linhas.")
+
+    indice_sexo = abrir_indice_sexo(ARQUIVO_INDICE_SEXO, df_sexo)
+    gravador = GravadorIntermediario(
+        ARQUIVO_INTERMEDIARIO_CSV, formato=FORMATO_INTERMEDIARIO, manter_csv=MANTER_CSV_INTERMEDIARIO
+    )
+    nome_arquivo = None
+    try:
+        removidas = 0
+        for arquivo in arquivos + list(substitutos.values()):
+            nome_arquivo = os.path.basename(arquivo)
+            eh_substituto = arquivo in substitutos.values()
+            lotes = ler_em_lotes(arquivo, list(colunas_desejadas) + ['Valor Salário', 'Salário Simulado'], tamanho_lote)
+            for numero, lote in enumerate(lotes, start=1):
+                print(f"\n--- {nome_arquivo} | Lote {numero} ({len(lote)} linhas, {gravador.linhas} já gravadas) ---")
+                lote = selecionar_colunas_export(lote, colunas_desejadas, nome_arquivo, avisar=numero == 1)
+                if not eh_substituto and substitutos:
+                    da_unidade = mascara_unidades(lote, substitutos)
+                    removidas += int(da_unidade.sum())
+                    lote = lote[~da_unidade].reset_index(drop=True)
+                    if lote.empty:
+                        continue
+                lote['Origem_Arquivo'] = nome_arquivo
+                lote = preencher_sexo(lote, df_sexo, indice_sexo=indice_sexo)
+                limpar_chaves(lote, COLUNAS_CHAVE)
+                for col in colunas_finais:
+                    if col not in lote.columns:
+                        lote[col] = pd.NA
+                gravador.acrescentar(lote[colunas_finais])
+        if substitutos:
+            print(f"\n  {removidas} linhas de unidades substituídas descartadas dos exports.")
+        if gravador.linhas == 0:
+            gravador.descartar()
+            print(" ERRO: Nenhuma linha lida dos arquivos de origem.")
+            return None
+        arquivos_salvos = gravador.fechar()
+    except Exception as e:
+        gravador.descartar()
+        print(f"  ERRO CRÍTICO na consolidação em lotes de {nome_arquivo}: {e}")
+        return None
+    finally:
+        indice_sexo.imprimir_estatisticas()
+        indice_sexo.fechar()
 
     print("\n" + "="*70)
-    print("ETAPA 2/2: MODELAGEM E CRIAÇÃO DE MODELO ESTRELA/SNOWFLAKE")
+    print(f"ETAPA 1/2 COMPLETA! Base Intermediária salva em: {', '.join(arquivos_salvos)}")
+    print(f"Total de linhas consolidadas: {gravador.linhas}")
     print("="*70)
 
-    df = df_input.copy()
+    # A Etapa 2 trabalha sobre a base inteira: recarrega a intermediária e aplica o plano de tipos
+    with etapa('ler_intermediario') as e:
+        df = e.saida(ler_intermediario(ARQUIVO_INTERMEDIARIO_CSV, colunas=colunas_finais, formato=FORMATO_INTERMEDIARIO))
+    return tipar_base_consolidada(df)
 
-    # Processamento das tabelas auxiliares
-    df_faltas = etl_processa_csv_auxiliar(ARQUIVO_FALTAS, 'Fato_Faltas')
-    df_abs = etl_processa_csv_auxiliar(ARQUIVO_ABS, 'Fato_Absenteismo')
+# =======================================================================
+# 4. LÓGICA PRINCIPAL: MODELAGEM (ELT) - MANTIDA
+# =======================================================================
 
+@medir_etapa('limpeza_chaves')
+def preparar_base_modelagem(df, colunas_desejadas):
     # 1. SELEÇÃO DE COLUNAS
     colunas_para_selecao = [col for col in colunas_desejadas if col in df.columns]
     df = df[colunas_para_selecao + ['Origem_Arquivo']].copy()
@@ -349,53 +603,190 @@ def etl_modela_e_salva_excel(df_input, colunas_desejadas):
 
     # 2. LIMPEZA E TRATAMENTO DE DADOS
     print("\nIniciando limpeza e padronização das chaves de relacionamento...")
-    colunas_para_limpar = ['Nome', 'CPF', 'Empresa', 'Cadastro', 'Cargo', 'C.Custo', 'Filial']
-    for col in colunas_para_limpar:
-        df = limpar_chave(df, col)
+    limpar_chaves(df, COLUNAS_CHAVE)
     print("Limpeza de chaves de relacionamento (strip e upper) concluída.")
 
-    df.replace('', pd.NA, inplace=True)
+    # '' só aparece nas colunas de texto (as category já tratam vazio como nulo)
+    colunas_texto = df.columns[df.dtypes == object]
+    df[colunas_texto] = df[colunas_texto].replace('', pd.NA)
     df.dropna(subset=['CPF', 'Nome'], inplace=True)
-    df = df[df['CPF'] != 'NAN']
-    df = df[df['Nome'] != 'NAN']
     print(f"Linhas com CPF e/ou Nome vazios removidas. Linhas restantes: {len(df)}")
 
     if 'Descrição (T. Adm)' in df.columns:
-        df['Descrição (T. Adm)'] = df['Descrição (T. Adm)'].fillna('NÃO INFORMADO')
+        df['Descrição (T. Adm)'] = preencher_vazios(df['Descrição (T. Adm)'], 'NÃO INFORMADO')
         print("Valores nulos em 'Descrição (T. Adm)' preenchidos.")
     if 'Sexo' in df.columns:
-        df['Sexo'] = df['Sexo'].fillna('Não Definido/Inferido')
+        df['Sexo'] = preencher_vazios(df['Sexo'], 'Não Definido/Inferido')
         print("Valores nulos em 'Sexo' preenchidos com 'Não Definido/Inferido'.")
 
-    # 3. CONVERSÃO DE DATAS
-    COLUNAS_DE_DATA = [col for col in colunas_desejadas if 'Data' in col or 'Admissão' in col or 'Nascimento' in col or 'Última Simulação' in col]
-    print("\nIniciando conversão de colunas de data...")
-    for col in COLUNAS_DE_DATA:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
-    print("Conversão de datas concluída.")
-
-    # ===================================================================
-    # 4. GERAÇÃO DAS TABELAS DIMENSÃO
-    # ===================================================================
-    print("\nGerando Tabelas Dimensão com ID Sequencial (Chaves Suplementares)...")
+    # Chaves limpas como category: dimensões e merges comparam códigos inteiros
+    compactar_chaves(df, COLUNAS_CHAVE)
+    return df
 
-    # Dim Empresa
-    dim_empresa = df[['Empresa', 'Nome (Empresa)']].copy().dropna(subset=['Empresa'])
-    dim_empresa.drop_duplicates(subset=['Empresa'], inplace=True)
-    dim_empresa.insert(0, 'Empresa_ID', range(1, len(dim_empresa) + 1))
+def dimensao_por_codigos(df, registro, dimensao, colunas_chave, colunas_atributos, coluna_id):
+    """
+    Dimensão e chave estrangeira da Fato a partir da mesma fatoração da chave
+    natural: a Fato recebe a coluna de ID (gravada em df) e a dimensão são as
+    primeiras linhas de cada chave, sem drop_duplicates nem merge.
+    """
+    chave = df[colunas_chave] if len(colunas_chave) > 1 else df[colunas_chave[0]]
+    ids, posicoes = registro.atribuir_com_posicoes(dimensao, chave)
+    df[coluna_id] = ids
+    colunas = colunas_chave + [col for col in colunas_atributos if col in df.columns]
+    dim = df[colunas].iloc[posicoes].reset_index(drop=True)
+    dim.insert(0, coluna_id, ids.iloc[posicoes].to_numpy(dtype='int64'))
+    return dim
+
+@medir_etapa('dim_empresa')
+def construir_dim_empresa(df, registro, anterior=None):
+    dim_empresa = dimensao_por_codigos(df, registro, 'Empresa', ['Empresa'], ['Nome (Empresa)'], 'Empresa_ID')
+    dim_empresa = mesclar_dimensao(dim_empresa, anterior, 'Empresa', 'Empresa_ID')
     print(f"Dimensão Empresa (Pai) criada com {len(dim_empresa)} registros únicos.")
+    return dim_empresa
 
-    # Dim Filial
-    colunas_filial_origem = ['Filial', 'Apelido (Filial)', 'Empresa']
-    dim_filial = df[[col for col in colunas_filial_origem if col in df.columns]].copy().dropna(subset=['Filial'])
-    dim_filial.drop_duplicates(subset=['Filial', 'Empresa'], inplace=True)
+@medir_etapa('dim_filial')
+def construir_dim_filial(df, registro, anterior=None):
+    # Chave composta Filial + Empresa; o Empresa_ID da dimensão vem da coluna já gravada por construir_dim_empresa
+    dim_filial = dimensao_por_codigos(df, registro, 'Filial', ['Filial', 'Empresa'], ['Apelido (Filial)', 'Empresa_ID'], 'Filial_ID')
     if 'Apelido (Filial)' in dim_filial.columns:
-        dim_filial['Apelido (Filial)'] = dim_filial['Apelido (Filial)'].fillna('NÃO INFORMADO')
-    dim_filial.insert(0, 'Filial_ID', range(1, len(dim_filial) + 1))
-    dim_filial = pd.merge(dim_filial, dim_empresa[['Empresa', 'Empresa_ID']], on='Empresa', how='left')
-    dim_filial.drop(columns=['Empresa'], inplace=True, errors='ignore')
+        dim_filial['Apelido (Filial)'] = preencher_vazios(dim_filial['Apelido (Filial)'], 'NÃO INFORMADO')
+    dim_filial['Empresa_ID'] = dim_filial['Empresa_ID'].astype('int64')
+    dim_filial.drop(columns=['Empresa'], inplace=True)
+    dim_filial = mesclar_dimensao(dim_filial, anterior, ['Filial', 'Empresa_ID'], 'Filial_ID')
     print(f"Dimensão Filial (Filho) criada com {len(dim_filial)} registros únicos e ligada à Empresa (FK Empresa_ID).")
+    return dim_filial
+
+def normalizar_cpf(serie):
+    """CPF só com dígitos; vazio vira NA."""
+    return serie.astype(str).str.replace(r'[^0-9]', '', regex=True).replace({'': pd.NA})
+
+def chave_cpf(serie):
+    """CPF com 11 dígitos para comparação: o export numérico perde os zeros à esquerda, os CSVs auxiliares não."""
+    return normalizar_cpf(serie).str.zfill(11)
+
+def chave_nome_nascimento(nomes_padrao, nascimento):
+    """Chave natural da Dim_Pessoa: nome padronizado + data de nascimento."""
+    return nomes_padrao.fillna('') + "_" + nascimento.astype(str).fillna('')
+
+def indexar_pessoas(dim_pessoa):
+    """
+    Dicionários chave -> Pessoa_ID para cada critério de resolução. Retorna
+    (índices, ambíguos): chaves que apontam para mais de uma pessoa ficam com
+    a primeira e são listadas em `ambíguos` (nome: homônimos ficam de fora).
+    """
+    indices, ambiguos = {}, {}
+    ids = dim_pessoa['Pessoa_ID']
+    if 'CPF' in dim_pessoa.columns:
+        cpfs = pd.DataFrame({'chave': chave_cpf(dim_pessoa['CPF']), 'id': ids}).dropna(subset=['chave'])
+        pessoas_por_cpf = cpfs.groupby('chave')['id'].nunique()
+        ambiguos['cpf'] = set(pessoas_por_cpf.index[pessoas_por_cpf > 1])
+        indices['cpf'] = dict(cpfs.drop_duplicates('chave').itertuples(index=False, name=None))
+    if 'Chave_Nome_Nasc' in dim_pessoa.columns:
+        indices['nome_nascimento'] = dict(zip(dim_pessoa['Chave_Nome_Nasc'], ids))
+    if 'Nome' in dim_pessoa.columns:
+        # A dimensão guarda o Nome já padronizado
+        nomes = pd.DataFrame({'chave': dim_pessoa['Nome'], 'id': ids}).dropna(subset=['chave'])
+        pessoas_por_nome = nomes.groupby('chave')['id'].nunique()
+        ambiguos['nome'] = set(pessoas_por_nome.index[pessoas_por_nome > 1])
+        unicos = nomes[~nomes['chave'].isin(ambiguos['nome'])].drop_duplicates('chave')
+        indices['nome'] = dict(unicos.itertuples(index=False, name=None))
+    return indices, ambiguos
+
+@medir_etapa('resolucao_pessoa')
+def resolver_pessoas(df, dim_pessoa, prioridade=None, indice=None, tabela='Fato'):
+    """
+    Pessoa_ID de cada linha de `df` (mesmo índice, Int64): para as linhas ainda
+    sem ID, cada critério da prioridade é aplicado com um único `map` sobre a
+    chave normalizada. Nenhuma linha é duplicada. Imprime o relatório de resolução.
+    `indice` é o retorno de indexar_pessoas(dim_pessoa), para reaproveitá-lo entre tabelas.
+    """
+    indices, ambiguos = indice if indice is not None else indexar_pessoas(dim_pessoa)
+    chaves_da_linha = {
+        'cpf': lambda linhas: chave_cpf(linhas['CPF']) if 'CPF' in linhas.columns else None,
+        'nome_nascimento': lambda linhas: (
+            chave_nome_nascimento(padronizar_nomes(linhas['Nome']), linhas['Nascimento'])
+            if {'Nome', 'Nascimento'}.issubset(linhas.columns) else None
+        ),
+        'nome': lambda linhas: padronizar_nomes(linhas['Nome']) if 'Nome' in linhas.columns else None,
+    }
+
+    pessoa_id = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    print(f"\nResolvendo Pessoa_ID de {tabela} (índice por {' / '.join(prioridade or PRIORIDADE_RESOLUCAO_PESSOA)})...")
+    for criterio in prioridade or PRIORIDADE_RESOLUCAO_PESSOA:
+        pendentes = pessoa_id.isna()
+        if not pendentes.any():
+            break
+        chave = chaves_da_linha[criterio](df.loc[pendentes])
+        if chave is None or criterio not in indices:
+            continue
+        encontrados = chave.map(indices[criterio]).dropna()
+        pessoa_id.loc[encontrados.index] = encontrados.astype('int64')
+        em_ambiguas = int(chave.isin(ambiguos.get(criterio, ())).sum())
+        detalhe = ""
+        if criterio == 'cpf' and em_ambiguas:
+            detalhe = f" ({em_ambiguas} linhas com CPF de mais de uma pessoa -> primeira pessoa do CPF)"
+        elif criterio == 'nome' and em_ambiguas:
+            detalhe = f" ({em_ambiguas} linhas com nome de homônimos não resolvidas)"
+        print(f"  - {criterio:<16} {len(encontrados):>8} linhas{detalhe}")
+
+    sem_pessoa = int(pessoa_id.isna().sum())
+    if sem_pessoa:
+        print(f"  AVISO: {sem_pessoa} linhas de {tabela} ficaram sem Pessoa_ID.")
+    print(f"✅ Pessoa_ID resolvido para {len(df) - sem_pessoa} de {len(df)} registros (sem duplicar linhas).")
+    return pessoa_id
+
+def motivos_rejeicao(df, indice):
+    """Por que cada linha sem Pessoa_ID não foi resolvida (para o relatório de rejeitos)."""
+    _, ambiguos = indice
+    motivo = pd.Series('Nome não encontrado na Dim_Pessoa', index=df.index, dtype=object)
+    if 'CPF' in df.columns:
+        motivo[chave_cpf(df['CPF']).notna()] = 'CPF e nome não encontrados na Dim_Pessoa'
+    if 'Nome' in df.columns:
+        nomes = padronizar_nomes(df['Nome'])
+        motivo[nomes.isin(ambiguos.get('nome', ()))] = 'Nome de homônimos (sem CPF que desempate)'
+        motivo[nomes.isna() | (nomes == '')] = 'Sem nome'
+    return motivo
+
+def vincular_ausencias(tabelas, dim_pessoa, caminho_rejeitos=None):
+    """
+    Acrescenta Pessoa_ID (Int64) às tabelas auxiliares {nome: DataFrame ou None},
+    com um único índice de pessoas para todas. As linhas não resolvidas são
+    gravadas no relatório de rejeitos (CSV) com o motivo.
+    """
+    linhas = sum(len(df) for df in tabelas.values() if df is not None)
+    with etapa('vinculo_ausencias', linhas) as e:
+        indice = indexar_pessoas(dim_pessoa)
+        vinculadas, rejeitos = {}, []
+        for nome, df in tabelas.items():
+            if df is None:
+                vinculadas[nome] = None
+                continue
+            df = df.drop(columns=['Pessoa_ID'], errors='ignore')
+            df.insert(0, 'Pessoa_ID', resolver_pessoas(df, dim_pessoa, PRIORIDADE_RESOLUCAO_AUSENCIAS, indice, nome))
+            sem_pessoa = df[df['Pessoa_ID'].isna()].drop(columns=['Pessoa_ID'])
+            if not sem_pessoa.empty:
+                sem_pessoa.insert(0, 'Motivo_Rejeicao', motivos_rejeicao(sem_pessoa, indice))
+                sem_pessoa.insert(0, 'Linha_Origem', sem_pessoa.index + 2)  # linha no CSV de origem (cabeçalho = 1)
+                sem_pessoa.insert(0, 'Tabela', nome)
+                rejeitos.append(sem_pessoa)
+            vinculadas[nome] = df
+        e.saida(linhas - sum(len(r) for r in rejeitos))
+
+    caminho_rejeitos = caminho_rejeitos or ARQUIVO_REJEITOS_AUSENCIAS
+    if rejeitos:
+        relatorio = pd.concat(rejeitos, ignore_index=True, sort=False)
+        try:
+            relatorio.to_csv(caminho_rejeitos, index=False, sep=';', encoding='utf-8-sig')
+            print(f"  AVISO: {len(relatorio)} linhas de faltas/absenteísmo sem Pessoa_ID listadas em: {caminho_rejeitos}")
+        except OSError as e:
+            print(f"  ERRO: não foi possível gravar o relatório de rejeitos '{caminho_rejeitos}': {e}")
+    elif os.path.exists(caminho_rejeitos):
+        # Sem rejeitos nesta execução: o relatório antigo não vale mais
+        os.remove(caminho_rejeitos)
+    return vinculadas
+
+@medir_etapa('dim_pessoa')
+def construir_dim_pessoa(df, registro, anterior=None):
     colunas_pessoa = [
         'Nome', 'CPF', 'Cadastro', 'Nascimento', 'Sexo',
         'Estado Civil', 'Descrição (Estado Civil)', 'Instrução', 'Descrição (Instrução)',
@@ -406,23 +797,18 @@ def etl_modela_e_salva_excel(df_input, colunas_desejadas):
     dim_pessoa = df[cols_existentes_pessoa].copy()
 
     # Padroniza nome (remove acentos, deixa maiúsculo e sem espaços duplos)
-    dim_pessoa['Nome_Padrao'] = dim_pessoa['Nome'].apply(padronizar_nome_pessoa)
+    dim_pessoa['Nome_Padrao'] = padronizar_nomes(dim_pessoa['Nome'])
 
     # Remove pontos e traços do CPF, mas não usa mais como critério de duplicidade
-    dim_pessoa['CPF'] = (
-        dim_pessoa['CPF']
-        .astype(str)
-        .str.replace(r'[^0-9]', '', regex=True)
-        .replace({'': pd.NA, 'nan': pd.NA, 'NaN': pd.NA})
-    )
-
-    # Converte nascimento para data (se ainda não estiver)
-    dim_pessoa['Nascimento'] = pd.to_datetime(dim_pessoa['Nascimento'], errors='coerce', dayfirst=True)
+    dim_pessoa['CPF'] = normalizar_cpf(dim_pessoa['CPF'])
 
     # Cria chave composta Nome + Data Nascimento
-    dim_pessoa['Chave_Nome_Nasc'] = (
-        dim_pessoa['Nome_Padrao'].fillna('') + "_" + dim_pessoa['Nascimento'].astype(str).fillna('')
-    )
+    dim_pessoa['Chave_Nome_Nasc'] = chave_nome_nascimento(dim_pessoa['Nome_Padrao'], dim_pessoa['Nascimento'])
+
+    # Obtém o ID no registro persistente (chave Nome + Data de Nascimento); cada linha da Fato guarda
+    # o ID da sua própria chave, usado para podar a dimensão no modo incremental
+    df[COLUNA_PESSOA_ORIGEM] = registro.atribuir('Pessoa', dim_pessoa['Chave_Nome_Nasc'])
+    dim_pessoa.insert(0, 'Pessoa_ID', df[COLUNA_PESSOA_ORIGEM].astype('int64'))
 
     # Remove duplicatas
     antes = len(dim_pessoa)
@@ -430,66 +816,57 @@ def etl_modela_e_salva_excel(df_input, colunas_desejadas):
     depois = len(dim_pessoa)
     print(f"✅ Removidas {antes - depois} duplicatas baseadas em Nome + Data de Nascimento.")
 
-    # Gera o ID sequencial
-    dim_pessoa.insert(0, 'Pessoa_ID', range(1, len(dim_pessoa) + 1))
-
-    # Calcula idade e faixa etária
-    dim_pessoa = calcular_idade_faixa_etaria(dim_pessoa)
-
     # Padroniza novamente o Nome final
     if 'Nome' in dim_pessoa.columns:
-        dim_pessoa['Nome'] = dim_pessoa['Nome'].apply(padronizar_nome_pessoa)
+        dim_pessoa['Nome'] = padronizar_nomes(dim_pessoa['Nome'])
     if 'Nome (Cadastro O. Contrato)' in dim_pessoa.columns:
-        dim_pessoa['Nome (Cadastro O. Contrato)'] = dim_pessoa['Nome (Cadastro O. Contrato)'].apply(padronizar_nome_pessoa)
+        dim_pessoa['Nome (Cadastro O. Contrato)'] = padronizar_nomes(dim_pessoa['Nome (Cadastro O. Contrato)'])
+    dim_pessoa = mesclar_dimensao(dim_pessoa, anterior, 'Chave_Nome_Nasc', 'Pessoa_ID')
 
-    print(f"Dimensão Pessoa criada com {len(dim_pessoa)} registros únicos (base Nome + Nascimento).")
+    # Calcula idade e faixa etária (sempre sobre a dimensão completa: depende da data de hoje)
+    dim_pessoa = calcular_idade_faixa_etaria(dim_pessoa)
 
+    print(f"Dimensão Pessoa criada com {len(dim_pessoa)} registros únicos (base Nome + Nascimento).")
+    return dim_pessoa
 
-    # Dim Cargo
-    dim_cargo = df[['Cargo', 'Título Reduzido (Cargo)']].copy().dropna(subset=['Cargo'])
-    dim_cargo.drop_duplicates(subset=['Cargo'], inplace=True)
-    dim_cargo.insert(0, 'Cargo_ID', range(1, len(dim_cargo) + 1))
+@medir_etapa('dim_cargo')
+def construir_dim_cargo(df, registro, anterior=None):
+    dim_cargo = dimensao_por_codigos(df, registro, 'Cargo', ['Cargo'], ['Título Reduzido (Cargo)'], 'Cargo_ID')
+    dim_cargo = mesclar_dimensao(dim_cargo, anterior, 'Cargo', 'Cargo_ID')
     print(f"Dimensão Cargo criada com {len(dim_cargo)} registros únicos.")
+    return dim_cargo
 
-    # Dim CCusto
-    dim_ccusto = df[['C.Custo', 'Descrição (C.Custo)']].copy().dropna(subset=['C.Custo'])
-    dim_ccusto.drop_duplicates(subset=['C.Custo'], inplace=True)
-    dim_ccusto.insert(0, 'CCusto_ID', range(1, len(dim_ccusto) + 1))
+@medir_etapa('dim_ccusto')
+def construir_dim_ccusto(df, registro, anterior=None):
+    dim_ccusto = dimensao_por_codigos(df, registro, 'CCusto', ['C.Custo'], ['Descrição (C.Custo)'], 'CCusto_ID')
+    dim_ccusto = mesclar_dimensao(dim_ccusto, anterior, 'C.Custo', 'CCusto_ID')
     print(f"Dimensão C.Custo criada com {len(dim_ccusto)} registros únicos.")
-
-    # ===================================================================
-    # 5. CRIAÇÃO DA TABELA FATO (Fato_Contratos)
-    # ===================================================================
+    return dim_ccusto
+
+@medir_etapa('dimensoes')
+def construir_dimensoes(df, registro, estado=None):
+    # IDs vêm do registro persistente de chaves; com 'estado' (modo incremental) as linhas
+    # anteriores que não aparecem no delta são mantidas. As dimensões Empresa, Filial, Cargo
+    # e C.Custo gravam em df a chave estrangeira da Fato (Empresa_ID, Filial_ID, ...)
+    anterior = estado or {}
+    print("\nGerando Tabelas Dimensão com IDs do Registro Persistente (Chaves Suplementares)...")
+    return {
+        'dim_empresa': construir_dim_empresa(df, registro, anterior.get('dim_empresa')),
+        'dim_filial': construir_dim_filial(df, registro, anterior.get('dim_filial')),
+        'dim_pessoa': construir_dim_pessoa(df, registro, anterior.get('dim_pessoa')),
+        'dim_cargo': construir_dim_cargo(df, registro, anterior.get('dim_cargo')),
+        'dim_ccusto': construir_dim_ccusto(df, registro, anterior.get('dim_ccusto')),
+    }
+
+@medir_etapa('fato')
+def construir_fato(df, dims):
     print("\nPreparando a Tabela Fato com todos os novos IDs...")
-    df_fato = df.copy()
-
-    # Merge Pessoa por CPF
-    if 'CPF' in df_fato.columns and 'CPF' in dim_pessoa.columns:
-        df_fato = pd.merge(df_fato, dim_pessoa[['Pessoa_ID', 'CPF']], on='CPF', how='left')
-
-    faltando_pessoa = df_fato['Pessoa_ID'].isna().sum()
-    if faltando_pessoa > 0 and 'Nome' in df_fato.columns:
-        print(f"⚠️ {faltando_pessoa} registros sem Pessoa_ID via CPF. Tentando merge por Nome padronizado...")
-        df_fato['Nome_Padrao'] = df_fato['Nome'].apply(padronizar_nome_pessoa)
-        df_fato = pd.merge(
-            df_fato.drop(columns=['Pessoa_ID'], errors='ignore'),
-            dim_pessoa[['Pessoa_ID', 'Nome']].rename(columns={'Nome': 'Nome_Padrao'}),
-            on='Nome_Padrao', how='left'
-        )
-    df_fato.drop(columns=['Nome_Padrao'], inplace=True, errors='ignore')
-    print(f"✅ Merge final de Pessoa_ID concluído. Total de registros com ID: {df_fato['Pessoa_ID'].notna().sum()}")
-
-    # Merge Cargo, CCusto, Empresa e Filial
-    df_fato = pd.merge(df_fato, dim_cargo[['Cargo', 'Cargo_ID']], on='Cargo', how='left')
-    df_fato = pd.merge(df_fato, dim_ccusto[['C.Custo', 'CCusto_ID']], on='C.Custo', how='left')
-    df_fato = pd.merge(df_fato, dim_empresa[['Empresa', 'Empresa_ID']], on='Empresa', how='left')
-    dim_filial_chaves = dim_filial[['Filial_ID', 'Filial', 'Empresa_ID']]
-    df_fato = pd.merge(df_fato, dim_filial_chaves, on=['Filial', 'Empresa_ID'], how='left', suffixes=('_drop', ''))
-    print("Todos os novos IDs (Surrogate Keys) foram adicionados à Tabela Fato.")
 
-    # Remoção de colunas que viraram IDs
-    colunas_para_descartar = ['Nome', 'CPF', 'Cargo', 'C.Custo', 'Empresa', 'Filial', 'Sexo']
-    df_fato.drop(columns=[col for col in colunas_para_descartar if col in df_fato.columns], inplace=True, errors='ignore')
+    # Cargo_ID, CCusto_ID, Empresa_ID e Filial_ID já foram gravados em df pelas dimensões (mesmos
+    # códigos da fatoração); Pessoa_ID por índice (CPF -> Nome + Nascimento -> Nome). Sem merge:
+    # a Fato mantém uma linha por contrato e só as colunas finais são copiadas
+    df['Pessoa_ID'] = resolver_pessoas(df, dims['dim_pessoa'])
+    print("Todos os novos IDs (Surrogate Keys) foram adicionados à Tabela Fato.")
 
     # Seleção final das colunas da tabela fato
     colunas_fato_desejadas = [
@@ -502,15 +879,132 @@ def etl_modela_e_salva_excel(df_input, colunas_desejadas):
         'Escala', 'Descrição (Escala)', 'Opção FGTS', 'Período Pagto',
         'Descrição (Período Pagto)', 'Descrição (T. Adm)', 'Descrição (T. Contrato)',
         'Descrição (Cat. eSocial)', 'Descrição (Motivo Alt. Salário)',
-        'Recebe 13° Salário', 'Código Fornecedor', 'Origem_Arquivo'
+        'Recebe 13° Salário', 'Código Fornecedor', 'Origem_Arquivo',
+        *COLUNAS_CONTROLE
     ]
-    df_fato_final = df_fato[[col for col in colunas_fato_desejadas if col in df_fato.columns]].copy()
+    df_fato_final = df[[col for col in colunas_fato_desejadas if col in df.columns]].copy()
     print("Tabela Fato final criada com as colunas de IDs e medidas.")
+    return df_fato_final
+
+@medir_etapa('headcount_mensal')
+def construir_headcount_mensal(df_fato, data_ref=None):
+    data_ref = data_ref if data_ref is not None else DATA_REFERENCIA_ATRIBUTOS
+    df_headcount = fato_headcount_mensal(df_fato, data_ref=data_ref)
+    if not df_headcount.empty:
+        print(f"Fato_Headcount_Mensal criada com {len(df_headcount)} linhas "
+              f"({df_headcount['Mês'].min():%m/%Y} a {df_headcount['Mês'].max():%m/%Y}).")
+    return df_headcount
+
+@medir_etapa('escrita_modelo')
+def salvar_modelo(caminho, df_fato_final, dims, df_faltas=None, df_abs=None, formatos=None, df_headcount=None):
+    formatos = formatos or FORMATOS_SAIDA_MODELO
+    tabelas = {
+        'Fato_Contratos': df_fato_final,
+        'Dim_Pessoa': dims['dim_pessoa'],
+        'Dim_Cargo': dims['dim_cargo'].drop(columns=['Cargo']),
+        'Dim_CCusto': dims['dim_ccusto'].drop(columns=['C.Custo']),
+        'Dim_Filial': dims['dim_filial'],
+        'Dim_Empresa': dims['dim_empresa'].drop(columns=['Empresa']),
+    }
+    if df_faltas is not None:
+        tabelas['Fato_Faltas'] = df_faltas
+    if df_abs is not None:
+        tabelas['Fato_Absenteismo'] = df_abs
+    if df_headcount is not None:
+        tabelas['Fato_Headcount_Mensal'] = df_headcount
+
+    print(f"\nSalvando Modelo Estrela/Snowflake ({', '.join(formatos)}): {caminho} ({len(tabelas)} tabelas)")
+    try:
+        relatorio = salvar_tabelas(tabelas, caminho, formatos)
+        if not relatorio:
+            print("\nERRO: nenhum formato de saída pôde ser gravado.")
+            return relatorio
+
+        print("\n" + "="*70)
+        print("Modelagem e salvamento CONCLUÍDOS com sucesso!")
+        for item in relatorio:
+            print(f"Saída '{item['formato']}' pronta em: {item['caminho']}")
+        print("Instrução para Power BI: As chaves 'Empresa_ID' e 'Filial_ID' ligam as dimensões à Fato, formando o Snowflake/Estrela.")
+        print("="*70)
+        return relatorio
+
+    except Exception as e:
+        print(f"\nERRO ao salvar o modelo: {e}")
+
+@medir_etapa('modelagem')
+def etl_modela_e_salva_excel(df_input, colunas_desejadas, incremental=None):
+    if incremental is None:
+        incremental = MODO_INCREMENTAL
+    if df_input is None or df_input.empty:
+        print("ERRO: O DataFrame consolidado está vazio ou não foi gerado.")
+        return
+
+    print("\n" + "="*70)
+    print("ETAPA 2/2: MODELAGEM E CRIAÇÃO DE MODELO ESTRELA/SNOWFLAKE")
+    print("="*70)
+
+    df = df_input.copy()
+
+    # Processamento das tabelas auxiliares
+    with etapa('auxiliar_faltas') as e:
+        df_faltas = e.saida(etl_processa_csv_auxiliar(ARQUIVO_FALTAS, 'Fato_Faltas'))
+    with etapa('auxiliar_abs') as e:
+        df_abs = e.saida(etl_processa_csv_auxiliar(ARQUIVO_ABS, 'Fato_Absenteismo'))
+
+    # 1-2. SELEÇÃO DE COLUNAS E LIMPEZA DAS CHAVES
+    df = preparar_base_modelagem(df, colunas_desejadas)
+
+    # 3. DELTA EM RELAÇÃO À EXECUÇÃO ANTERIOR (modo incremental)
+    # O estado só é aproveitado se os IDs dele vieram deste mesmo registro de chaves
+    registro = RegistroChaves(ARQUIVO_REGISTRO_CHAVES)
+    colunas_origem = list(df.columns)
+    with etapa('delta_incremental', df) as e:
+        df = marcar_linhas(df)
+        estado = carregar_estado(PASTA_ESTADO_MODELO, colunas_origem, registro.assinatura()) if incremental else None
+        fato_mantida = None
+        if estado is not None and df[COLUNA_CHAVE_CONTRATO].duplicated().any():
+            print("AVISO: chave Empresa + Cadastro duplicada na base atual. Reconstrução completa do modelo.")
+            estado = None
+        if estado is not None:
+            df, fato_mantida, resumo = separar_delta(df, estado['fato'])
+            print(f"\nModo incremental: {resumo['novas']} contratos novos, {resumo['alteradas']} alterados, "
+                  f"{resumo['inalteradas']} inalterados e {resumo['removidas']} removidos desde a última execução.")
+        else:
+            print("\nReconstrução completa do modelo (sem estado incremental aproveitável).")
+        e.saida(df)
+
+    # 3.1 CONVERSÃO DE DATAS (apenas das linhas a reprocessar)
+    COLUNAS_DE_DATA = colunas_de_data(colunas_desejadas)
+    print("\nIniciando conversão de colunas de data (formato dd/mm/aaaa, uma passada por coluna)...")
+    with etapa('conversao_datas', df):
+        converter_datas(df, COLUNAS_DE_DATA)
+    print("Conversão de datas concluída.")
+
+    # ===================================================================
+    # 4. GERAÇÃO DAS TABELAS DIMENSÃO
+    # ===================================================================
+    dims = construir_dimensoes(df, registro, estado)
+    print(f"Registro de chaves: {registro.salvar()} novos IDs gravados em {os.path.basename(ARQUIVO_REGISTRO_CHAVES)}.")
+    assinatura_registro = registro.assinatura()
+    registro.fechar()
+
+    # ===================================================================
+    # 5. CRIAÇÃO DA TABELA FATO (Fato_Contratos)
+    # ===================================================================
+    df_fato_final = construir_fato(df, dims)
+    if fato_mantida is not None:
+        df_fato_final = pd.concat([fato_mantida, df_fato_final], ignore_index=True, sort=False)
+        print(f"Tabela Fato recomposta: {len(fato_mantida)} linhas reaproveitadas + {len(df_fato_final) - len(fato_mantida)} reprocessadas.")
+    # Linhas de dimensão que só vinham de contratos removidos/alterados saem (igual a uma reconstrução completa)
+    dims = podar_dimensoes(dims, df_fato_final)
+    with etapa('salvar_estado', df_fato_final):
+        salvar_estado(PASTA_ESTADO_MODELO, colunas_origem, {**dims, 'fato': df_fato_final}, assinatura_registro)
+    df_fato_final = df_fato_final.drop(columns=COLUNAS_CONTROLE)
 
     # ===================================================================
     # 6. SALVAMENTO EM MÚLTIPLAS ABAS (EXCEL)
     # ===================================================================
-    total_colaboradores_unicos = len(dim_pessoa)
+    total_colaboradores_unicos = len(dims['dim_pessoa'])
     total_contratos = len(df_fato_final)
 
     print("\n" + "#"*70)
@@ -519,55 +1013,39 @@ def etl_modela_e_salva_excel(df_input, colunas_desejadas):
     print(f"2. Total de Colaboradores Únicos (Baseado em CPF): {total_colaboradores_unicos}")
     print("#"*70)
 
-    print(f"\nSalvando Modelo Estrela/Snowflake em EXCEL: {ARQUIVO_FINAL_MODELADO} (Múltiplas abas)")
-    try:
-        with pd.ExcelWriter(ARQUIVO_FINAL_MODELADO, engine='xlsxwriter') as writer:
-            df_fato_final.to_excel(writer, sheet_name='Fato_Contratos', index=False)
-            dim_pessoa.to_excel(writer, sheet_name='Dim_Pessoa', index=False)
-            dim_cargo.drop(columns=['Cargo']).to_excel(writer, sheet_name='Dim_Cargo', index=False)
-            dim_ccusto.drop(columns=['C.Custo']).to_excel(writer, sheet_name='Dim_CCusto', index=False)
-            dim_filial.to_excel(writer, sheet_name='Dim_Filial', index=False)
-            dim_empresa.drop(columns=['Empresa']).to_excel(writer, sheet_name='Dim_Empresa', index=False)
-
-            if df_faltas is not None:
-                df_faltas.to_excel(writer, sheet_name='Fato_Faltas', index=False)
-                print("Tabela auxiliar 'Fato_Faltas' salva.")
-            if df_abs is not None:
-                df_abs.to_excel(writer, sheet_name='Fato_Absenteismo', index=False)
-                print("Tabela auxiliar 'Fato_Absenteismo' salva.")
+    # 5.1 Fato_Faltas e Fato_Absenteismo ligadas à Dim_Pessoa por Pessoa_ID
+    auxiliares = vincular_ausencias({'Fato_Faltas': df_faltas, 'Fato_Absenteismo': df_abs}, dims['dim_pessoa'])
+    df_faltas, df_abs = auxiliares['Fato_Faltas'], auxiliares['Fato_Absenteismo']
 
-        print("\n" + "="*70)
-        print("Modelagem e salvamento CONCLUÍDOS com sucesso!")
-        print(f"O arquivo EXCEL '{ARQUIVO_FINAL_MODELADO}' (6 + Auxiliares abas) está pronto.")
-        print("Instrução para Power BI: As chaves 'Empresa_ID' e 'Filial_ID' ligam as dimensões à Fato, formando o Snowflake/Estrela.")
-        print("="*70)
+    # 5.2 Agregado mensal de headcount/turnover (sobre a Fato completa)
+    df_headcount = construir_headcount_mensal(df_fato_final) if GERAR_HEADCOUNT_MENSAL else None
 
-    except Exception as e:
-        print(f"\nERRO ao salvar o arquivo Excel: {e}")
+    salvar_modelo(ARQUIVO_FINAL_MODELADO, df_fato_final, dims, df_faltas, df_abs, df_headcount=df_headcount)
 
 # =======================================================================
 # 5. EXECUÇÃO DO FLUXO COMPLETO
 # =======================================================================
 def run_full_etl():
-    df_consolidado = etl_consolida_e_salva_csv(COLUNAS_DESEJADAS)
-    if df_consolidado is not None:
-        etl_modela_e_salva_excel(df_consolidado, COLUNAS_DESEJADAS)
+    iniciar_execucao('agrupar', PASTA_LOG_EXECUCAO, PERFILAR_ETAPA, PERFILADOR)
+    try:
+        df_consolidado = etl_consolida_e_salva_csv(COLUNAS_DESEJADAS)
+        if df_consolidado is not None:
+            etl_modela_e_salva_excel(df_consolidado, COLUNAS_DESEJADAS)
+    finally:
+        finalizar_execucao()
 
 if __name__ == "__main__":
-    # Verificação da existência do arquivo único pelo prefixo
+    # Verificação da existência do(s) arquivo(s) pelo prefixo
+    prefixos = PREFIXOS_EXPORTS if MODO_MULTIPLOS_ARQUIVOS else [ARQUIVO_PREFIXO_UNICO]
     try:
-        arquivos_na_pasta = [
-            f for f in os.listdir(PASTA_ORIGEM_ONEDRIVE)
-            if os.path.isfile(os.path.join(PASTA_ORIGEM_ONEDRIVE, f)) and not f.startswith('.')
-        ]
+        encontrados = localizar_exports(PASTA_ORIGEM_ONEDRIVE, prefixos)
     except FileNotFoundError:
         print(f"ALERTA: Pasta de origem não encontrada: {PASTA_ORIGEM_ONEDRIVE}")
-        arquivos_na_pasta = []
+        encontrados = []
 
-    encontrados = [f for f in arquivos_na_pasta if f.lower().startswith(ARQUIVO_PREFIXO_UNICO) and f.lower().endswith(('.xls', '.xlsx'))]
     if not encontrados:
-        print(f"ALERTA: Nenhum arquivo começando com '{ARQUIVO_PREFIXO_UNICO}' (.xls/.xlsx) encontrado em: {PASTA_ORIGEM_ONEDRIVE}")
-        print("Coloque o arquivo na pasta ou ajuste ARQUIVO_PREFIXO_UNICO se o nome mudou.")
+        print(f"ALERTA: Nenhum arquivo começando com {' / '.join(repr(p) for p in prefixos)} (.xls/.xlsx) encontrado em: {PASTA_ORIGEM_ONEDRIVE}")
+        print("Coloque o arquivo na pasta ou ajuste ARQUIVO_PREFIXO_UNICO / PREFIXOS_EXPORTS se o nome mudou.")
     elif not os.path.exists(ARQUIVO_SEXO):
         print("ALERTA: Arquivo de sexo não encontrado. Verifique ARQUIVO_SEXO.")
     else:
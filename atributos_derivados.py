@@ -0,0 +1,226 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# =======================================================================
+# ATRIBUTOS DERIVADOS: IDADE, TEMPO DE CASA E FAIXAS
+# =======================================================================
+# Idade e tempo de casa dependem da data de referência ("hoje"). Ela é um
+# parâmetro explícito (None = data de hoje), para que um retrato histórico
+# possa ser refeito com os mesmos números. Os cálculos trabalham em dias
+# inteiros (datetime64[D]) e as faixas saem de np.digitize sobre os limites,
+# sem apply por linha. Com várias datas de referência, todas são calculadas
+# de uma vez (matriz referências x linhas; no tempo de casa por pessoa, os
+# períodos repetidos por referência e agrupados por referência + pessoa).
+
+# Faixa etária: [0, 20), [20, 25), ... [60, 100); fora disso a idade é inválida
+LIMITES_FAIXA_ETARIA = [0, 20, 25, 30, 35, 40, 50, 60, 100]
+ROTULOS_FAIXA_ETARIA = [
+    "1. Abaixo de 20", "2. 20 - 24 Anos", "3. 25 - 29 Anos", "4. 30 - 34 Anos",
+    "5. 35 - 39 Anos", "6. 40 - 49 Anos", "7. 50 - 59 Anos", "8. 60 ou Mais"
+]
+ROTULO_IDADE_INVALIDA = "9. Idade Inválida"
+
+# Tempo de casa em meses completos: < 6, 6-11, 12-23, 24-35, 36-47, 48-59, 60+
+LIMITES_TEMPO_CASA_MESES = [6, 12, 24, 36, 48, 60]
+ROTULOS_TEMPO_CASA = [
+    "1. Menos de 6 meses", "2. Mais de 6 meses", "3. 1 Ano", "4. 2 Anos",
+    "5. 3 Anos", "6. 4 Anos", "7. 5 Anos ou Mais"
+]
+ROTULO_ADMISSAO_INVALIDA = "8. Data de Admissão Inválida"
+
+DIAS_POR_ANO = 365.25
+DIAS_POR_MES = 30.4375
+
+
+def data_referencia(valor=None):
+    """Data de referência como datetime64[D]; None = hoje."""
+    return np.datetime64(pd.Timestamp(date.today() if valor is None else valor).normalize().date(), 'D')
+
+
+def _dias_decorridos(datas, datas_referencia):
+    """Matriz (referências x linhas) de dias entre cada data e cada referência; NaN onde a data é vazia."""
+    dias = pd.to_datetime(pd.Series(datas), errors='coerce').to_numpy(dtype='datetime64[D]')
+    referencias = np.array([data_referencia(r) for r in datas_referencia], dtype='datetime64[D]')
+    decorridos = (referencias[:, None] - dias[None, :]).astype('int64').astype('float64')
+    decorridos[:, np.isnat(dias)] = np.nan
+    return decorridos
+
+
+def idades(nascimento, datas_referencia=(None,)):
+    """Idade em anos completos (matriz referências x linhas, NaN = sem data)."""
+    return np.trunc(_dias_decorridos(nascimento, datas_referencia) / DIAS_POR_ANO)
+
+
+def meses_de_casa(admissao, datas_referencia=(None,)):
+    """Meses completos desde a admissão, pela média de 30,4375 dias por mês (matriz referências x linhas)."""
+    return np.floor(_dias_decorridos(admissao, datas_referencia) / DIAS_POR_MES)
+
+
+def _rotular(codigos, validos, rotulos, rotulo_invalido):
+    tabela = np.array(list(rotulos) + [rotulo_invalido], dtype=object)
+    return tabela[np.where(validos, codigos, len(rotulos))]
+
+
+def classificar_faixa_etaria(anos):
+    anos = np.asarray(anos, dtype='float64')
+    codigos = np.digitize(np.nan_to_num(anos, nan=-1), LIMITES_FAIXA_ETARIA) - 1
+    validos = ~np.isnan(anos) & (codigos >= 0) & (codigos < len(ROTULOS_FAIXA_ETARIA))
+    return _rotular(codigos, validos, ROTULOS_FAIXA_ETARIA, ROTULO_IDADE_INVALIDA)
+
+
+def classificar_tempo_de_casa(meses):
+    # Admissão futura (meses negativos) conta como "menos de 6 meses"
+    meses = np.asarray(meses, dtype='float64')
+    codigos = np.digitize(np.nan_to_num(meses, nan=0), LIMITES_TEMPO_CASA_MESES)
+    return _rotular(codigos, ~np.isnan(meses), ROTULOS_TEMPO_CASA, ROTULO_ADMISSAO_INVALIDA)
+
+
+def _inteiros(valores, index, nome=None):
+    return pd.Series(pd.array(np.where(np.isnan(valores), None, valores), dtype='Int64'), index=index, name=nome)
+
+
+def adicionar_idade_faixa_etaria(df, data_ref=None, coluna='Nascimento'):
+    """Acrescenta 'Idade Atual' (Int64) e 'Faixa Etária (Pirâmide)' calculadas na data de referência."""
+    anos = idades(df[coluna], [data_ref])[0]
+    df['Idade Atual'] = _inteiros(anos, df.index)
+    df['Faixa Etária (Pirâmide)'] = classificar_faixa_etaria(anos)
+    return df
+
+
+# =======================================================================
+# TEMPO DE CASA POR PESSOA (READMISSÕES, DESLIGAMENTO E REINTEGRAÇÃO)
+# =======================================================================
+# Cada contrato vira um ou dois períodos trabalhados:
+#   - Admissão -> Data Afastamento, se a situação é de desligamento (ou se
+#     houve reintegração depois do afastamento); senão, até a referência.
+#     ('Data Afastamento' também é preenchida em férias/licenças, que não
+#     encerram o contrato.)
+#   - Data de Reintegração -> referência, quando a reintegração é posterior
+#     ao afastamento e a pessoa não está desligada.
+# Os períodos de cada pessoa são ordenados e os sobrepostos (contratos
+# simultâneos em outra empresa) fundidos num mesmo bloco contínuo, tudo por
+# cummax/cumsum agrupados, sem laço por pessoa. Tempo atual = último bloco;
+# acumulado = soma dos blocos.
+
+# Códigos de 'Situação' que encerram o contrato (7 = Demitido)
+SITUACOES_DESLIGAMENTO = [7]
+COLUNAS_TEMPO_CASA = ['Pessoa_ID', 'Admissão', 'Data Afastamento', 'Data de Reintegração', 'Situação']
+
+
+def periodos_contrato(contratos, colunas=('Pessoa_ID',), com_reintegracao=False):
+    """
+    Períodos de cada contrato com as `colunas` dele, 'inicio' e 'fim' (NaT =
+    ainda aberto), sem data de referência. Contratos sem admissão ficam de fora.
+    Com `com_reintegracao`, também 'reintegracao' (o período começa numa
+    reintegração) e 'fim_revertido' (o fim é um afastamento desfeito depois
+    por reintegração, não um desligamento).
+    """
+    def coluna_data(nome):
+        if nome not in contratos.columns:
+            return np.full(len(contratos), np.datetime64('NaT'), dtype='datetime64[D]')
+        return pd.to_datetime(contratos[nome], errors='coerce').to_numpy(dtype='datetime64[D]')
+
+    admissao, afastamento, reintegracao = coluna_data('Admissão'), coluna_data('Data Afastamento'), coluna_data('Data de Reintegração')
+    if 'Situação' in contratos.columns:
+        desligado = pd.to_numeric(contratos['Situação'], errors='coerce').isin(SITUACOES_DESLIGAMENTO).to_numpy()
+    else:
+        desligado = ~np.isnat(afastamento)
+    reintegrado = ~np.isnat(reintegracao) & ~np.isnat(afastamento) & (reintegracao > afastamento)
+
+    fim_primeiro = np.where(desligado | reintegrado, afastamento, np.datetime64('NaT'))
+    segundo = reintegrado & ~desligado
+    periodos = pd.DataFrame({col: np.concatenate([contratos[col].to_numpy(), contratos[col].to_numpy()[segundo]]) for col in colunas})
+    periodos['inicio'] = np.concatenate([admissao, reintegracao[segundo]])
+    periodos['fim'] = np.concatenate([fim_primeiro, np.full(int(segundo.sum()), np.datetime64('NaT'), dtype='datetime64[D]')])
+    if com_reintegracao:
+        periodos['reintegracao'] = np.concatenate([np.zeros(len(contratos), dtype=bool), np.ones(int(segundo.sum()), dtype=bool)])
+        periodos['fim_revertido'] = np.concatenate([segundo, np.zeros(int(segundo.sum()), dtype=bool)])
+    return periodos[periodos['inicio'].notna()]
+
+
+def periodos_trabalhados(contratos, datas_referencia=(None,)):
+    """
+    Períodos (Pessoa_ID, inicio, fim, referencia) repetidos para cada data de
+    referência e cortados nela (os abertos terminam na referência).
+    """
+    referencias = np.array([data_referencia(r) for r in datas_referencia], dtype='datetime64[D]')
+    periodos = periodos_contrato(contratos, ['Pessoa_ID'])
+    periodos = periodos[periodos['Pessoa_ID'].notna()]
+    quantidade = len(periodos)
+    periodos = periodos.iloc[np.tile(np.arange(quantidade), len(referencias))].reset_index(drop=True)
+    periodos['referencia'] = np.repeat(referencias, quantidade).astype('datetime64[ns]')
+    # Só o que já tinha começado na referência, com o fim limitado a ela
+    periodos = periodos[periodos['inicio'] <= periodos['referencia']].copy()
+    periodos['fim'] = np.minimum(periodos['fim'].fillna(periodos['referencia']), periodos['referencia'])
+    return periodos
+
+
+def tempo_de_casa_por_referencia(contratos, datas_referencia=(None,)):
+    """
+    Uma linha por (data de referência, Pessoa_ID), todas as datas numa única
+    passada: 'Data Referência', contratos, primeira admissão, início do
+    período atual, se está ativa, data de desligamento, meses no período atual
+    ('MesesNaEmpresa') e acumulados em todos os contratos, com as faixas.
+    Pessoas admitidas só depois de uma referência ficam fora daquele retrato.
+    """
+    tempos = _tempo_de_casa(contratos, datas_referencia)
+    ja_admitida = ~(tempos['Primeira Admissão'] > tempos['Data Referência'])
+    return tempos[ja_admitida].reset_index(drop=True)
+
+
+def tempo_de_casa_por_pessoa(contratos, data_ref=None):
+    """
+    Uma linha por Pessoa_ID na data de referência (mesmas colunas de
+    tempo_de_casa_por_referencia, sem 'Data Referência'). Quem foi admitido
+    depois da referência aparece com 0 meses.
+    """
+    return _tempo_de_casa(contratos, [data_ref]).drop(columns=['Data Referência'])
+
+
+def _tempo_de_casa(contratos, datas_referencia):
+    referencias = pd.DatetimeIndex(np.array([data_referencia(r) for r in datas_referencia], dtype='datetime64[D]'))
+    periodos = periodos_trabalhados(contratos, datas_referencia).sort_values(
+        ['referencia', 'Pessoa_ID', 'inicio', 'fim'], kind='stable'
+    )
+
+    # Blocos contínuos: um período abre bloco novo quando começa depois do maior fim anterior da pessoa (na mesma referência)
+    grupo = periodos.groupby(['referencia', 'Pessoa_ID'], sort=False).ngroup()
+    fim_anterior = periodos['fim'].groupby(grupo).cummax().groupby(grupo).shift()
+    novo_bloco = fim_anterior.isna() | (periodos['inicio'] > fim_anterior)
+    blocos = periodos.groupby(novo_bloco.cumsum()).agg(
+        referencia=('referencia', 'first'), Pessoa_ID=('Pessoa_ID', 'first'), inicio=('inicio', 'min'), fim=('fim', 'max')
+    )
+    blocos['dias'] = (blocos['fim'] - blocos['inicio']).dt.days
+
+    por_pessoa = blocos.groupby(['referencia', 'Pessoa_ID']).agg(
+        inicio_atual=('inicio', 'last'), fim_atual=('fim', 'last'),
+        dias_atual=('dias', 'last'), dias_acumulados=('dias', 'sum'),
+    )
+    admissoes = pd.DataFrame({'Pessoa_ID': contratos['Pessoa_ID'], 'admissao': pd.to_datetime(contratos['Admissão'], errors='coerce')})
+    contagem = admissoes.groupby('Pessoa_ID').agg(Contratos=('admissao', 'size'), primeira=('admissao', 'min'))
+    # Todas as pessoas em todas as referências, na ordem das datas pedidas
+    indice = pd.MultiIndex.from_product([referencias, contagem.index], names=['referencia', 'Pessoa_ID'])
+    resultado = contagem.reindex(indice, level='Pessoa_ID').join(por_pessoa, how='left')
+    referencia = resultado.index.get_level_values('referencia')
+    ativo = resultado['fim_atual'].to_numpy() == referencia.to_numpy()
+    # Admitida só depois da referência: 0 meses ("menos de 6 meses"), como no cálculo por contrato
+    ainda_nao_admitida = (resultado['primeira'].to_numpy() > referencia.to_numpy())
+    meses_atual = np.floor(resultado['dias_atual'].to_numpy(dtype='float64') / DIAS_POR_MES)
+    meses_acumulados = np.floor(resultado['dias_acumulados'].to_numpy(dtype='float64') / DIAS_POR_MES)
+    meses_atual[ainda_nao_admitida] = meses_acumulados[ainda_nao_admitida] = 0
+
+    return pd.DataFrame({
+        'Pessoa_ID': resultado.index.get_level_values('Pessoa_ID'),
+        'Data Referência': referencia,
+        'Contratos': resultado['Contratos'].to_numpy(),
+        'Primeira Admissão': resultado['primeira'].to_numpy(),
+        'Início Período Atual': resultado['inicio_atual'].to_numpy(),
+        'Ativo': ativo,
+        'Data Desligamento': resultado['fim_atual'].where(~ativo).to_numpy(),
+        'MesesNaEmpresa': pd.array(np.where(np.isnan(meses_atual), None, meses_atual), dtype='Int64'),
+        'MesesAcumulados': pd.array(np.where(np.isnan(meses_acumulados), None, meses_acumulados), dtype='Int64'),
+        'Tempo de Casa Categoria Python': classificar_tempo_de_casa(meses_atual),
+        'Tempo de Casa Acumulado Categoria': classificar_tempo_de_casa(meses_acumulados),
+    })
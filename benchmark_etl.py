@@ -0,0 +1,246 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import agrupar
+import datas
+import normalizacao
+from gerador_dados_sinteticos import (
+    NOME_EXPORT, PRIMEIROS_NOMES, TAMANHOS_PADRAO, salvar_dados_sinteticos
+)
+from registro_chaves import RegistroChaves
+from saida_modelo import FORMATOS_SAIDA
+
+# =======================================================================
+# BENCHMARK DO ETL (agrupar.py) SOBRE DADOS SINTÉTICOS
+# =======================================================================
+# Para cada tamanho, gera (ou reaproveita) o export de turnover, faltas e
+# absenteísmo sintéticos e executa as etapas do ETL uma a uma, com as mesmas
+# funções do agrupar.py, medindo tempo e pico de memória (tracemalloc) de cada
+# etapa. O resultado vai para um CSV; com --referencia, cada etapa é comparada
+# com uma execução anterior e o script termina com código 1 se alguma piorou
+# além da tolerância. O rastreio de memória deixa as etapas várias vezes mais
+# lentas, então os tempos só são comparados entre execuções no mesmo modo.
+
+PASTA_DADOS_PADRAO = "dados_sinteticos"
+ARQUIVO_RESULTADOS_PADRAO = "benchmark_resultados.csv"
+TOLERANCIA_PADRAO = 0.25          # 25% mais lento (ou mais memória) que a referência
+MINIMO_SEGUNDOS_COMPARACAO = 0.05  # etapas mais rápidas que isso não são comparadas (ruído)
+PROPORCAO_SEXO_MANUAL = 0.3       # parte dos nomes com sexo na "planilha manual"
+
+_SEXO_POR_PRIMEIRO_NOME = {
+    normalizacao.primeiro_nome(nome): sexo for sexo, nomes in PRIMEIROS_NOMES.items() for nome in nomes
+}
+
+
+def consulta_sexo_local(latencia=0.0):
+    """Substitui a consulta ao IBGE por um dicionário (com latência opcional por consulta)."""
+    def consultar(primeiro_nome):
+        if latencia:
+            time.sleep(latencia)
+        return _SEXO_POR_PRIMEIRO_NOME.get(primeiro_nome)
+    return consultar
+
+
+class Medidor:
+    """Executa cada etapa medindo tempo e pico de memória e acumula os resultados."""
+
+    def __init__(self, linhas, medir_memoria=True, verboso=False):
+        self.linhas = linhas
+        self.medir_memoria = medir_memoria
+        self.verboso = verboso
+        self.resultados = []
+
+    def __call__(self, etapa, funcao, *args, **kwargs):
+        saida = contextlib.nullcontext() if self.verboso else contextlib.redirect_stdout(io.StringIO())
+        if self.medir_memoria:
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        with saida:
+            resultado = funcao(*args, **kwargs)
+        segundos = time.perf_counter() - inicio
+        pico_mb = None
+        if self.medir_memoria:
+            pico_mb = round((tracemalloc.get_traced_memory()[1] - memoria_inicial) / 2**20, 1)
+        self.resultados.append({
+            'linhas': self.linhas, 'etapa': etapa, 'segundos': round(segundos, 4),
+            'pico_mb': pico_mb, 'rastreio_memoria': self.medir_memoria,
+        })
+        memoria = f" | pico {pico_mb:8.1f} MB" if pico_mb is not None else ""
+        print(f"  {etapa:<20} {segundos:9.3f} s{memoria}")
+        return resultado
+
+
+def preparar_dados(pasta_dados, linhas, formato, semente):
+    """Reaproveita os arquivos já gerados para o tamanho; gera se não existirem."""
+    pasta = os.path.join(pasta_dados, f"{linhas}_linhas")
+    caminhos = {
+        'export': os.path.join(pasta, f"{NOME_EXPORT}.{formato}"),
+        'faltas': os.path.join(pasta, "faltas_cpf.csv"),
+        'abs': os.path.join(pasta, "abs_atualizado.csv"),
+    }
+    if all(os.path.exists(c) for c in caminhos.values()):
+        print(f"  Dados sintéticos reaproveitados de: {pasta}")
+        return caminhos
+    print(f"  Gerando dados sintéticos ({linhas} linhas, {formato}) em: {pasta}")
+    inicio = time.perf_counter()
+    caminhos = salvar_dados_sinteticos(pasta, linhas, semente, formato)
+    print(f"  Dados gerados em {time.perf_counter() - inicio:.1f}s.")
+    return caminhos
+
+
+def _tabela_sexo_manual(df, semente):
+    # Simula Nomes_e_Sexo_Inferido.xlsx cobrindo parte dos nomes da base
+    nomes = df[['Nome', 'Sexo']].dropna().drop_duplicates(subset=['Nome'])
+    return nomes.sample(frac=PROPORCAO_SEXO_MANUAL, random_state=semente).reset_index(drop=True)
+
+
+def executar_etapas(caminhos, medir, pasta_temporaria, latencia_remota=0.0, formatos_saida=('xlsx',), semente=0):
+    """Executa as etapas do ETL na ordem do agrupar.py, cada uma medida por `medir`."""
+    # Cada tamanho começa sem memo/cache de execuções anteriores, como um processo novo
+    datas._CACHE_DATAS.clear()
+    normalizacao.limpar_memo()
+    colunas = agrupar.COLUNAS_DESEJADAS
+
+    # ETAPA 1: leitura do export e inferência de sexo
+    df = medir('leitura', agrupar.transformar_e_selecionar, caminhos['export'], colunas)
+    df['Origem_Arquivo'] = os.path.basename(caminhos['export'])
+    df_sexo = _tabela_sexo_manual(df, semente)
+    df = medir('inferencia_sexo', agrupar.preencher_sexo, df, df_sexo,
+               caminho_indice=os.path.join(pasta_temporaria, 'indice_sexo.sqlite'),
+               consulta_remota=consulta_sexo_local(latencia_remota))
+    df = medir('plano_tipos', agrupar.tipar_base_consolidada, df)
+
+    # ETAPA 2: modelagem
+    df_faltas = medir('auxiliar_faltas', agrupar.etl_processa_csv_auxiliar, caminhos['faltas'], 'Fato_Faltas')
+    df_abs = medir('auxiliar_abs', agrupar.etl_processa_csv_auxiliar, caminhos['abs'], 'Fato_Absenteismo')
+    df = medir('limpeza_chaves', agrupar.preparar_base_modelagem, df, colunas)
+    df = medir('hash_linhas', agrupar.marcar_linhas, df)
+    medir('conversao_datas', agrupar.converter_datas, df, agrupar.colunas_de_data(colunas))
+
+    registro = RegistroChaves(os.path.join(pasta_temporaria, 'registro_chaves.sqlite'))
+    dims = {}
+    dims['dim_empresa'] = medir('dim_empresa', agrupar.construir_dim_empresa, df, registro)
+    dims['dim_filial'] = medir('dim_filial', agrupar.construir_dim_filial, df, registro)
+    dims['dim_pessoa'] = medir('dim_pessoa', agrupar.construir_dim_pessoa, df, registro)
+    dims['dim_cargo'] = medir('dim_cargo', agrupar.construir_dim_cargo, df, registro)
+    dims['dim_ccusto'] = medir('dim_ccusto', agrupar.construir_dim_ccusto, df, registro)
+    medir('registro_chaves', registro.salvar)
+    registro.fechar()
+
+    df_fato = medir('fato', agrupar.construir_fato, df, dims)
+    df_fato = df_fato.drop(columns=agrupar.COLUNAS_CONTROLE)
+    auxiliares = medir('vinculo_ausencias', agrupar.vincular_ausencias,
+                       {'Fato_Faltas': df_faltas, 'Fato_Absenteismo': df_abs}, dims['dim_pessoa'],
+                       os.path.join(pasta_temporaria, 'ausencias_sem_pessoa.csv'))
+    df_faltas, df_abs = auxiliares['Fato_Faltas'], auxiliares['Fato_Absenteismo']
+    df_headcount = medir('headcount_mensal', agrupar.construir_headcount_mensal, df_fato)
+    # Uma etapa por formato de saída, para comparar os backends de gravação
+    for formato in formatos_saida:
+        medir(f'escrita_{formato}', agrupar.salvar_modelo,
+              os.path.join(pasta_temporaria, 'modelo.xlsx'), df_fato, dims, df_faltas, df_abs, formatos=[formato],
+              df_headcount=df_headcount)
+    return {'linhas_fato': len(df_fato), 'pessoas': len(dims['dim_pessoa'])}
+
+
+def comparar_com_referencia(resultados, caminho_referencia, tolerancia, minimo_segundos=MINIMO_SEGUNDOS_COMPARACAO):
+    """Compara tempo e memória por (linhas, etapa) com a referência. Retorna a lista de regressões."""
+    referencia = pd.read_csv(caminho_referencia)
+    comparacao = resultados.merge(referencia, on=['linhas', 'etapa', 'rastreio_memoria'], how='inner', suffixes=('', '_ref'))
+    if comparacao.empty:
+        print(f"AVISO: nenhuma etapa em comum com a referência {caminho_referencia} (mesmos tamanhos e mesmo modo de rastreio de memória).")
+        return []
+
+    regressoes = []
+    print(f"\nComparação com a referência {os.path.basename(caminho_referencia)} (tolerância {tolerancia:.0%}):")
+    for _, linha in comparacao.iterrows():
+        variacao = linha['segundos'] / linha['segundos_ref'] - 1 if linha['segundos_ref'] else 0.0
+        problemas = []
+        if max(linha['segundos'], linha['segundos_ref']) >= minimo_segundos and variacao > tolerancia:
+            problemas.append(f"tempo {variacao:+.0%}")
+        if pd.notna(linha['pico_mb']) and pd.notna(linha['pico_mb_ref']) and linha['pico_mb_ref'] > 1:
+            variacao_memoria = linha['pico_mb'] / linha['pico_mb_ref'] - 1
+            if variacao_memoria > tolerancia:
+                problemas.append(f"memória {variacao_memoria:+.0%}")
+        marca = "REGRESSÃO: " + ", ".join(problemas) if problemas else "ok"
+        print(f"  {linha['linhas']:>9} | {linha['etapa']:<20} {linha['segundos_ref']:9.3f}s -> {linha['segundos']:9.3f}s  {marca}")
+        if problemas:
+            regressoes.append((linha['linhas'], linha['etapa'], problemas))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo e a memória de cada etapa do ETL sobre dados sintéticos.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO, help="tamanhos do export a medir")
+    parser.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx',
+                        help="formato do export sintético (xlsx mede a leitura real; csv é bem mais rápido de gerar)")
+    parser.add_argument('--pasta-dados', default=PASTA_DADOS_PADRAO, help="onde os dados sintéticos são gerados/reaproveitados")
+    parser.add_argument('--saida', default=ARQUIVO_RESULTADOS_PADRAO, help="CSV com os resultados desta execução")
+    parser.add_argument('--referencia', help="CSV de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument('--latencia-remota', type=float, default=0.0,
+                        help="segundos simulados por consulta remota de sexo (a consulta real ao IBGE não é usada)")
+    parser.add_argument('--formatos-saida', nargs='+', choices=FORMATOS_SAIDA, default=['xlsx'],
+                        help="formatos de gravação do modelo medidos (uma etapa 'escrita_<formato>' cada)")
+    parser.add_argument('--sem-excel', action='store_true', help="não mede a escrita do modelo (em nenhum formato)")
+    parser.add_argument('--sem-memoria', action='store_true', help="desliga o tracemalloc (tempos sem o custo do rastreio)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--verboso', action='store_true', help="mostra as mensagens das etapas do ETL")
+    args = parser.parse_args(argv)
+
+    # A leitura é medida sem o cache de ingestão (sempre a leitura completa do arquivo)
+    agrupar.PASTA_CACHE_INGESTAO = None
+
+    resultados = []
+    if not args.sem_memoria:
+        tracemalloc.start()
+    try:
+        for linhas in args.linhas:
+            print("\n" + "=" * 70)
+            print(f"BENCHMARK: {linhas} linhas | {time.ctime()}")
+            print("=" * 70)
+            caminhos = preparar_dados(args.pasta_dados, linhas, args.formato, args.semente)
+            medir = Medidor(linhas, medir_memoria=not args.sem_memoria, verboso=args.verboso)
+            pasta_temporaria = tempfile.mkdtemp(prefix='benchmark_etl_')
+            inicio = time.perf_counter()
+            try:
+                totais = executar_etapas(caminhos, medir, pasta_temporaria, args.latencia_remota,
+                                         formatos_saida=[] if args.sem_excel else args.formatos_saida,
+                                         semente=args.semente)
+            finally:
+                shutil.rmtree(pasta_temporaria, ignore_errors=True)
+            print(f"  {'TOTAL':<20} {time.perf_counter() - inicio:9.3f} s "
+                  f"({totais['linhas_fato']} linhas na fato, {totais['pessoas']} pessoas)")
+            resultados.extend(medir.resultados)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    df_resultados = pd.DataFrame(resultados)
+    df_resultados.to_csv(args.saida, index=False)
+    print(f"\nResultados salvos em: {args.saida}")
+    if len(args.linhas) > 1:
+        print("\nTempo por etapa (s):")
+        print(df_resultados.pivot(index='etapa', columns='linhas', values='segundos')
+              .reindex(df_resultados['etapa'].unique()).to_string())
+
+    if args.referencia:
+        regressoes = comparar_com_referencia(df_resultados, args.referencia, args.tolerancia)
+        if regressoes:
+            print(f"\nERRO: {len(regressoes)} etapa(s) com regressão acima de {args.tolerancia:.0%}.")
+            return 1
+        print("\nNenhuma regressão em relação à referência.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+# =======================================================================
+# CACHE DE INGESTÃO DO EXPORT EXCEL
+# =======================================================================
+# O export é lido uma única vez (só com as colunas desejadas e, se disponível,
+# com o motor calamine) e o DataFrame resultante fica num cache binário local.
+# A chave do cache é o caminho + colunas + motor; a validade é conferida por
+# tamanho/mtime e, se esses mudarem, pelo hash do conteúdo (ex.: arquivo
+# re-sincronizado pelo OneDrive sem alteração real).
+#
+# Cache e manifesto são gravados com sufixo '.parcial' e só então substituem
+# os anteriores: uma execução interrompida no meio da gravação não deixa um
+# cache truncado. Cache ilegível (ex.: pickle de outra versão do pandas) é
+# tratado como ausente: o Excel é relido e o cache regravado.
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def motor_excel_disponivel(motor):
+    """
+    Retorna o motor pedido se a dependência estiver instalada; senão None (padrão do pandas).
+    Verificado uma vez por processo (o aviso não se repete a cada arquivo).
+    """
+    if motor == 'calamine':
+        try:
+            import python_calamine  # noqa: F401
+        except ImportError:
+            print("  AVISO: motor 'calamine' indisponível (pip install python-calamine). Usando o padrão do pandas.")
+            return None
+    return motor
+
+
+def hash_conteudo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _caminhos_cache(pasta_cache, caminho, colunas, motor):
+    assinatura = json.dumps([os.path.abspath(caminho), sorted(colunas) if colunas else None, motor])
+    identificador = hashlib.sha1(assinatura.encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(pasta_cache, f"{os.path.splitext(os.path.basename(caminho))[0]}_{identificador}")
+    return base + '.pkl', base + '.json'
+
+
+def _ler_manifesto(caminho_manifesto):
+    try:
+        with open(caminho_manifesto, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _gravar_manifesto(caminho_manifesto, manifesto):
+    with open(caminho_manifesto + '.parcial', 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+    os.replace(caminho_manifesto + '.parcial', caminho_manifesto)
+
+
+def ler_excel_com_cache(caminho, colunas=None, pasta_cache=None, motor=None):
+    """
+    Lê o Excel com `usecols` restrito a `colunas` (comparação sem espaços nas pontas),
+    reaproveitando o cache binário quando o arquivo de origem não mudou.
+    """
+    motor = motor_excel_disponivel(motor)
+    desejadas = {col.strip() for col in colunas} if colunas else None
+    usecols = (lambda c: str(c).strip() in desejadas) if desejadas else None
+
+    if pasta_cache is None:
+        return pd.read_excel(caminho, usecols=usecols, engine=motor)
+
+    os.makedirs(pasta_cache, exist_ok=True)
+    caminho_dados, caminho_manifesto = _caminhos_cache(pasta_cache, caminho, desejadas, motor)
+    estado = os.stat(caminho)
+    manifesto = _ler_manifesto(caminho_manifesto)
+
+    if manifesto is not None and os.path.exists(caminho_dados):
+        mesmo_arquivo = manifesto['tamanho'] == estado.st_size and manifesto['mtime'] == estado.st_mtime
+        conteudo = None
+        if not mesmo_arquivo:
+            conteudo = hash_conteudo(caminho)
+            mesmo_arquivo = conteudo == manifesto['sha256']
+        if mesmo_arquivo:
+            inicio = time.perf_counter()
+            try:
+                df = pd.read_pickle(caminho_dados)
+            except Exception as e:
+                print(f"  AVISO: cache de ingestão de {os.path.basename(caminho)} ilegível ({e}). Relendo o Excel.")
+            else:
+                print(f"  -> Cache de ingestão válido para {os.path.basename(caminho)}. "
+                      f"Carregado em {time.perf_counter() - inicio:.2f}s (sem re-ler o Excel).")
+                if conteudo is not None:
+                    manifesto.update(tamanho=estado.st_size, mtime=estado.st_mtime)
+                    _gravar_manifesto(caminho_manifesto, manifesto)
+                return df
+
+    inicio = time.perf_counter()
+    df = pd.read_excel(caminho, usecols=usecols, engine=motor)
+    print(f"  -> Excel lido em {time.perf_counter() - inicio:.2f}s (motor: {motor or 'padrão'}). Atualizando cache de ingestão...")
+    df.to_pickle(caminho_dados + '.parcial')
+    os.replace(caminho_dados + '.parcial', caminho_dados)
+    _gravar_manifesto(caminho_manifesto, {
+        'caminho': os.path.abspath(caminho),
+        'tamanho': estado.st_size,
+        'mtime': estado.st_mtime,
+        'sha256': hash_conteudo(caminho),
+        'motor': motor,
+        'colunas': sorted(desejadas) if desejadas else None,
+    })
+    return df
@@ -0,0 +1,206 @@
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from atributos_derivados import periodos_contrato
+from saida_modelo import fontes_tabela_modelo, ler_tabela_modelo, pasta_tabelas
+
+# =======================================================================
+# CONSULTA DE QUEM ESTAVA ATIVO (DATA OU PERÍODO, POR FILIAL)
+# =======================================================================
+# Os contratos da Fato_Contratos viram intervalos [início, fim) (mesma regra
+# do tempo de casa e do headcount: fim = Data Afastamento só no desligamento,
+# reintegração reabre o contrato; contrato aberto = fim infinito). Os
+# intervalos são particionados por Filial_ID e, dentro de cada filial,
+# ordenados pelo início: uma consulta localiza por searchsorted o trecho que
+# já tinha começado na data e filtra o fim só nele; a contagem usa dois
+# searchsorted (inícios e fins ordenados), sem percorrer os contratos.
+#
+# O índice é montado uma vez a partir do modelo (da pasta Parquet/CSV, se
+# houver) e guardado ao lado dele ('<modelo>_indice_contratos.pkl') junto com
+# o tamanho/mtime dos arquivos de onde foi lido; enquanto ler_tabela_modelo
+# escolher esses mesmos arquivos, as consultas seguintes só carregam o índice.
+#
+# Uso: python consulta_headcount.py --data 30/06/2025 --filial 3
+#      python consulta_headcount.py --data 01/01/2025 --ate 31/03/2025 --saida ativos_1tri.csv
+
+ARQUIVO_MODELO_PADRAO = 'Base_MODELADA_PowerBI_V4.xlsx'
+COLUNAS_INDICE = [
+    'Pessoa_ID', 'Cadastro', 'Empresa_ID', 'Filial_ID', 'Cargo_ID', 'CCusto_ID',
+    'Admissão', 'Data Afastamento', 'Data de Reintegração', 'Situação'
+]
+COLUNAS_RESULTADO = ['Pessoa_ID', 'Cadastro', 'Empresa_ID', 'Filial_ID', 'Cargo_ID', 'CCusto_ID']
+FIM_ABERTO = np.iinfo('int64').max
+
+
+def _dia(valor):
+    """Data (texto dd/mm/aaaa, ISO ou Timestamp) como número do dia (datetime64[D])."""
+    if isinstance(valor, str) and '/' in valor:
+        data = pd.to_datetime(valor, format='%d/%m/%Y')
+    else:
+        data = pd.Timestamp(valor)
+    return int(np.datetime64(data.date(), 'D').astype('int64'))
+
+
+def _caminho_indice(caminho_modelo):
+    return f"{os.path.splitext(caminho_modelo)[0]}_indice_contratos.pkl"
+
+
+def _assinatura_fontes(caminho_modelo):
+    """Arquivo (e seu tamanho/mtime) de onde cada tabela usada pelo índice seria lida agora."""
+    assinatura = []
+    for tabela in ('Fato_Contratos', 'Dim_Pessoa'):
+        fontes = fontes_tabela_modelo(caminho_modelo, tabela)
+        if fontes:
+            formato, caminho = fontes[0]
+            estado = os.stat(caminho)
+            assinatura.append((tabela, formato, os.path.abspath(caminho), estado.st_size, estado.st_mtime))
+    return assinatura
+
+
+class IndiceContratos:
+    """Intervalos de contrato por Filial_ID para consultas de quem estava ativo numa data ou período."""
+
+    def __init__(self, fato, dim_pessoa=None):
+        self.fontes = None
+        colunas = [col for col in COLUNAS_RESULTADO if col in fato.columns]
+        periodos = periodos_contrato(fato, colunas).reset_index(drop=True)
+        if dim_pessoa is not None and {'Pessoa_ID', 'Nome'}.issubset(dim_pessoa.columns):
+            nomes = dict(zip(dim_pessoa['Pessoa_ID'], dim_pessoa['Nome']))
+            periodos.insert(1, 'Nome', periodos['Pessoa_ID'].map(nomes))
+
+        inicio = periodos['inicio'].to_numpy(dtype='datetime64[D]').astype('int64')
+        fim_datas = periodos['fim'].to_numpy(dtype='datetime64[D]')
+        fim = np.where(np.isnat(fim_datas), FIM_ABERTO, fim_datas.astype('int64'))
+        filial = periodos['Filial_ID'] if 'Filial_ID' in periodos.columns else pd.Series(0, index=periodos.index)
+        codigos, filiais = pd.factorize(filial, use_na_sentinel=False)
+
+        # Ordem: filial, depois início; cada filial ocupa um trecho contínuo [a, b)
+        ordem = np.lexsort((inicio, codigos))
+        self.periodos = periodos.iloc[ordem].rename(columns={'inicio': 'Início', 'fim': 'Fim'}).reset_index(drop=True)
+        self._inicio, self._fim, codigos = inicio[ordem], fim[ordem], codigos[ordem]
+        limites = np.searchsorted(codigos, np.arange(len(filiais) + 1))
+        self._trechos = {filiais[i]: (int(limites[i]), int(limites[i + 1])) for i in range(len(filiais))}
+        # Fins ordenados por filial, para a contagem sem varrer os contratos
+        self._fins_ordenados = {
+            f: np.sort(self._fim[a:b]) for f, (a, b) in self._trechos.items()
+        }
+
+    def filiais(self):
+        return sorted(f for f in self._trechos if pd.notna(f))
+
+    def _selecionar(self, filial):
+        if filial is None:
+            return list(self._trechos.items())
+        return [(filial, self._trechos[filial])] if filial in self._trechos else []
+
+    def ativos_entre(self, inicio, fim=None, filial=None):
+        """Contratos ativos em algum dia de [inicio, fim] (fim=None: só na data `inicio`)."""
+        dia_inicio = _dia(inicio)
+        dia_fim = dia_inicio if fim is None else _dia(fim)
+        posicoes = []
+        for _, (a, b) in self._selecionar(filial):
+            # Começaram até o último dia pedido e ainda não tinham terminado no primeiro
+            ja_iniciados = a + np.searchsorted(self._inicio[a:b], dia_fim, side='right')
+            candidatos = np.arange(a, ja_iniciados)
+            posicoes.append(candidatos[self._fim[a:ja_iniciados] > dia_inicio])
+        selecionados = np.concatenate(posicoes) if posicoes else np.array([], dtype='int64')
+        return self.periodos.iloc[selecionados].reset_index(drop=True)
+
+    def ativos_em(self, data, filial=None):
+        """Contratos ativos na data: início <= data < fim."""
+        return self.ativos_entre(data, None, filial)
+
+    def contar_ativos(self, data, filial=None):
+        """Quantidade de contratos ativos na data, por busca binária (sem listar)."""
+        dia = _dia(data)
+        total = 0
+        for f, (a, b) in self._selecionar(filial):
+            iniciados = np.searchsorted(self._inicio[a:b], dia, side='right')
+            encerrados = np.searchsorted(self._fins_ordenados[f], dia, side='right')
+            total += int(iniciados - encerrados)
+        return total
+
+    def salvar(self, caminho):
+        with open(caminho, 'wb') as arquivo:
+            pickle.dump(self, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def de_modelo(cls, caminho_modelo=ARQUIVO_MODELO_PADRAO, usar_cache=True):
+        """Índice do modelo gravado pelo agrupar.py, reaproveitando o arquivo do índice se o modelo não mudou."""
+        caminho_indice = _caminho_indice(caminho_modelo)
+        fontes = _assinatura_fontes(caminho_modelo)
+        if usar_cache and os.path.exists(caminho_indice):
+            try:
+                with open(caminho_indice, 'rb') as arquivo:
+                    indice = pickle.load(arquivo)
+                if getattr(indice, 'fontes', None) == fontes:
+                    return indice
+            except Exception as e:
+                print(f"  AVISO: índice '{os.path.basename(caminho_indice)}' ilegível ({e}). Recriando.")
+
+        try:
+            fato = ler_tabela_modelo(caminho_modelo, 'Fato_Contratos', colunas=COLUNAS_INDICE)
+        except ValueError:
+            # Modelo sem reintegração/situação: todo afastamento encerra o contrato
+            fato = ler_tabela_modelo(caminho_modelo, 'Fato_Contratos', colunas=COLUNAS_RESULTADO + ['Admissão', 'Data Afastamento'])
+        try:
+            dim_pessoa = ler_tabela_modelo(caminho_modelo, 'Dim_Pessoa', colunas=['Pessoa_ID', 'Nome'])
+        except ValueError:
+            dim_pessoa = None
+        indice = cls(fato, dim_pessoa)
+        indice.fontes = fontes
+        if usar_cache:
+            try:
+                indice.salvar(caminho_indice)
+            except OSError as e:
+                print(f"  AVISO: não foi possível gravar o índice '{caminho_indice}': {e}")
+        return indice
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lista (ou conta) os contratos ativos numa data ou período, por filial.")
+    parser.add_argument('--modelo', default=ARQUIVO_MODELO_PADRAO, help="pasta de trabalho do modelo (Base_MODELADA_PowerBI_V4.xlsx)")
+    parser.add_argument('--data', required=True, help="data da consulta (dd/mm/aaaa ou aaaa-mm-dd)")
+    parser.add_argument('--ate', help="fim do período: lista quem esteve ativo em algum dia entre --data e --ate")
+    parser.add_argument('--filial', type=int, help="Filial_ID (sem ele, todas as filiais)")
+    parser.add_argument('--contar', action='store_true', help="só a quantidade de ativos na data, por filial")
+    parser.add_argument('--saida', help="grava o resultado neste CSV em vez de mostrar na tela")
+    parser.add_argument('--sem-cache', action='store_true', help="remonta o índice a partir do modelo")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.modelo) and not os.path.isdir(pasta_tabelas(args.modelo, 'parquet')):
+        print(f"ERRO: modelo '{args.modelo}' não encontrado.")
+        return 1
+
+    inicio = time.perf_counter()
+    indice = IndiceContratos.de_modelo(args.modelo, usar_cache=not args.sem_cache)
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if args.contar:
+        filiais = [args.filial] if args.filial is not None else indice.filiais()
+        resultado = pd.DataFrame({'Filial_ID': filiais, 'Ativos': [indice.contar_ativos(args.data, f) for f in filiais]})
+    else:
+        resultado = indice.ativos_entre(args.data, args.ate, args.filial)
+    consulta = time.perf_counter() - inicio
+
+    periodo = f"{args.data} a {args.ate}" if args.ate else args.data
+    filial = f"filial {args.filial}" if args.filial is not None else "todas as filiais"
+    total = int(resultado['Ativos'].sum()) if args.contar else len(resultado)
+    print(f"{total} contratos ativos em {periodo} ({filial}) | índice {carga * 1000:.0f} ms, consulta {consulta * 1000:.1f} ms")
+    if args.saida:
+        resultado.to_csv(args.saida, index=False, sep=';', encoding='utf-8-sig')
+        print(f"Resultado salvo em: {args.saida}")
+    else:
+        with pd.option_context('display.max_rows', 200, 'display.width', 200):
+            print(resultado.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# =======================================================================
+# CONVERSÃO DE DATAS (FORMATO FIXO + CACHE DE VALORES ÚNICOS)
+# =======================================================================
+# O export usa sempre dd/mm/aaaa e '00/00/0000' para "sem data". Cada coluna é
+# convertida uma única vez: os valores são fatorizados, o sentinela vira NaT
+# sem passar pelo parser, e só os valores distintos ainda não vistos (em
+# qualquer coluna) são convertidos com o formato explícito. O que não bate com
+# o formato (ex.: células que o Excel já entregou como data) cai num parser
+# flexível apenas para esses poucos valores.
+
+FORMATO_DATA = '%d/%m/%Y'
+SENTINELAS_DATA = {'00/00/0000', '0', ''}
+
+_CACHE_DATAS = {}
+
+
+def colunas_de_data(colunas):
+    """Critério usado em todo o ETL para identificar as colunas de data."""
+    return [col for col in colunas if 'Data' in col or 'Admissão' in col or 'Nascimento' in col or 'Última Simulação' in col]
+
+
+def _eh_sentinela(valor):
+    return isinstance(valor, str) and valor.strip() in SENTINELAS_DATA
+
+
+def _converter_unicos(valores, formato):
+    serie = pd.Series(valores, dtype=object)
+    texto = serie.map(lambda v: v.strip() if isinstance(v, str) else v)
+    convertidos = pd.to_datetime(texto, format=formato, errors='coerce')
+    falhas = convertidos.isna() & texto.notna()
+    if falhas.any():
+        convertidos[falhas] = pd.to_datetime(texto[falhas], format='mixed', dayfirst=True, errors='coerce')
+    return convertidos.to_numpy(dtype='datetime64[ns]')
+
+
+def converter_coluna_data(serie, formato=FORMATO_DATA):
+    """Converte uma Series para datetime64. Retorna (serie_convertida, nº de valores inválidos)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, 0
+
+    codigos, unicos = pd.factorize(serie)
+    sentinela = np.fromiter((_eh_sentinela(v) for v in unicos), dtype=bool, count=len(unicos))
+    faltantes = [v for v, s in zip(unicos, sentinela) if not s and v not in _CACHE_DATAS]
+    if faltantes:
+        _CACHE_DATAS.update(zip(faltantes, _converter_unicos(faltantes, formato)))
+
+    valores = np.full(len(unicos) + 1, np.datetime64('NaT'), dtype='datetime64[ns]')
+    for i, (valor, s) in enumerate(zip(unicos, sentinela)):
+        if not s:
+            valores[i] = _CACHE_DATAS[valor]
+
+    # Inválidos: valores preenchidos (não sentinela) que não viraram data
+    invalidos_unicos = np.isnat(valores[:-1]) & ~sentinela
+    linhas_por_unico = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+    invalidos = int(linhas_por_unico[invalidos_unicos].sum())
+
+    return pd.Series(valores[codigos], index=serie.index, name=serie.name), invalidos
+
+
+def converter_datas(df, colunas, formato=FORMATO_DATA):
+    """
+    Converte, no próprio DataFrame, as colunas de data existentes e imprime a
+    contagem de valores inválidos por coluna. Retorna {coluna: inválidos}.
+    """
+    relatorio = {}
+    for col in colunas:
+        if col in df.columns:
+            df[col], relatorio[col] = converter_coluna_data(df[col], formato)
+    com_invalidos = {col: n for col, n in relatorio.items() if n}
+    if com_invalidos:
+        print("  Valores de data inválidos (convertidos para vazio) por coluna:")
+        for col, n in com_invalidos.items():
+            print(f"    - {col}: {n}")
+    print(f"  {len(relatorio)} colunas de data convertidas ({len(_CACHE_DATAS)} valores distintos em cache).")
+    return relatorio
+
+
+# =======================================================================
+# DURAÇÕES (HHH:MM[:SS]) EM MINUTOS
+# =======================================================================
+# As horas dos relatórios de ponto passam de 24 (ex.: '124:40:00'). Como nas
+# datas, só os valores distintos passam pelo regex; os segundos são
+# descartados (a duração é truncada no minuto) e vazio continua vazio.
+
+PADRAO_DURACAO = r'^\s*(?P<horas>\d+):(?P<minutos>[0-5]?\d)(?::[0-5]?\d)?\s*$'
+
+
+def converter_coluna_duracao(serie):
+    """Converte 'HHH:MM[:SS]' em minutos inteiros (Int32). Retorna (serie_convertida, nº de valores inválidos)."""
+    codigos, unicos = pd.factorize(serie)
+    partes = pd.Series(unicos, dtype='string').str.extract(PADRAO_DURACAO)
+    minutos = (pd.to_numeric(partes['horas']) * 60 + pd.to_numeric(partes['minutos'])).astype('Int32')
+
+    preenchidos = pd.Series(unicos, dtype='string').str.strip().fillna('') != ''
+    invalidos_unicos = (minutos.isna() & preenchidos).to_numpy()
+    linhas_por_unico = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+    invalidos = int(linhas_por_unico[invalidos_unicos].sum())
+
+    valores = pd.concat([minutos, pd.Series([pd.NA], dtype='Int32')], ignore_index=True)
+    return pd.Series(valores.array.take(codigos), index=serie.index, name=serie.name), invalidos
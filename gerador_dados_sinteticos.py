@@ -0,0 +1,295 @@
+import argparse
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from agrupar import COLUNAS_DESEJADAS
+from datas import converter_coluna_data, colunas_de_data
+
+# =======================================================================
+# GERADOR DE DADOS SINTÉTICOS (EXPORT DE TURNOVER, FALTAS E ABSENTEÍSMO)
+# =======================================================================
+# Produz bases no formato dos arquivos reais, em qualquer volume, para medir
+# como o ETL escala (ver benchmark_etl.py). As colunas descritivas (empresa,
+# filial, cargo, centro de custo, situação/causa, escala...) são sorteadas em
+# blocos a partir das linhas da amostra, o que mantém os pares código/descrição
+# coerentes. Pessoas, CPFs, matrículas e datas são gerados e reproduzem os
+# padrões de duplicidade da origem: readmissões (mesma pessoa, nova matrícula),
+# homônimos, grafias diferentes do mesmo nome, CPF com e sem máscara e datas
+# misturando dd/mm/aaaa, aaaa-mm-dd e o sentinela '00/00/0000'.
+
+ARQUIVO_PERFIL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_BI_Consolidada_TESTE.csv")
+NOME_EXPORT = "relatório turnover - att (sintético)"
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+
+# Proporções observadas (ou aproximadas) na amostra real
+PROPORCAO_READMISSOES = 0.12      # linhas que são um novo contrato de uma pessoa já existente
+PROPORCAO_HOMONIMOS = 0.01        # pessoas distintas com o mesmo nome (nascimento diferente)
+PROPORCAO_VARIANTES_NOME = 0.05   # linhas com outra grafia do nome (caixa, espaços, acentos)
+PROPORCAO_CPF_FORMATADO = 0.15    # '000.000.000-00'; o restante vem numérico (sem zeros à esquerda)
+PROPORCAO_CPF_AUSENTE = 0.005
+PROPORCAO_DATA_ISO = 0.10         # células de data no formato 'aaaa-mm-dd 00:00:00'
+PROPORCAO_SEXO_FEMININO = 0.7
+FALTAS_POR_LINHA = 2.4            # faltas_cpf.csv: ~2.555 faltas para ~1.056 linhas
+ABS_POR_LINHA = 0.38              # abs_atualizado.csv: ~400 pessoas para ~1.056 linhas
+
+DATA_MINIMA = pd.Timestamp(2000, 1, 1)
+DIAS_SEMANA = np.array(['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom'], dtype=object)
+MOTIVOS_FALTA = np.array([None, 'Atestado', 'Troca de Plantão', 'Férias', 'Day OFF', 'BANCO DE HORAS',
+                          'Ausência Justificada', 'Falta', 'Ajuste'], dtype=object)
+PESOS_MOTIVOS_FALTA = np.array([2152, 215, 72, 38, 33, 17, 15, 11, 2], dtype=float)
+
+PRIMEIROS_NOMES = {
+    'Feminino': [
+        'Maria', 'Ana', 'Adriana', 'Juliana', 'Patrícia', 'Fernanda', 'Aline', 'Camila', 'Núbia', 'Sílvia',
+        'Márcia', 'Cláudia', 'Luciana', 'Vanessa', 'Débora', 'Priscila', 'Simone', 'Tatiane', 'Érica', 'Lúcia',
+        'Rosângela', 'Acácia', 'Bárbara', 'Cristiane', 'Daniela', 'Elaine', 'Fabiana', 'Gisele', 'Helena', 'Ingrid',
+        'Jéssica', 'Kátia', 'Larissa', 'Mônica', 'Natália', 'Raquel', 'Sônia', 'Thaís', 'Valéria', 'Viviane',
+    ],
+    'Masculino': [
+        'José', 'João', 'Carlos', 'Paulo', 'Leandro', 'Ronan', 'Sidney', 'Marcos', 'Luís', 'André',
+        'Antônio', 'Fábio', 'Rodrigo', 'Sérgio', 'Márcio', 'Gustavo', 'Rafael', 'Thiago', 'Vinícius', 'Abeilard',
+        'Bruno', 'César', 'Diego', 'Eduardo', 'Felipe', 'Geraldo', 'Hélio', 'Igor', 'Júlio', 'Lucas',
+    ],
+}
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+    'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira', 'Araújo', 'Brito', 'Moraes', 'Conceição', 'Jesus',
+    'Morandi', 'Guimarães', 'Magalhães', 'Assunção', 'Resende', 'Figueiredo', 'Batista', 'Campos', 'Pinto', 'Melo',
+]
+PARTICULAS = ['de', 'da', 'dos', 'do']
+
+# Colunas de data com valor próprio da pessoa (as demais acompanham o contrato)
+COLUNAS_DATA_PESSOA = ['Nascimento']
+
+
+def _formatar_datas(datas, rng, proporcao_iso=PROPORCAO_DATA_ISO):
+    """Formata datas como no export (dd/mm/aaaa e uma parte em aaaa-mm-dd 00:00:00); formata só os únicos."""
+    codigos, unicos = pd.factorize(pd.DatetimeIndex(datas))
+    br = np.append(unicos.strftime('%d/%m/%Y').to_numpy(dtype=object), None)
+    iso = np.append(unicos.strftime('%Y-%m-%d 00:00:00').to_numpy(dtype=object), None)
+    return np.where(rng.random(len(codigos)) < proporcao_iso, iso[codigos], br[codigos])
+
+
+def _montar_nomes(sexos, rng):
+    n = len(sexos)
+    primeiros = np.empty(n, dtype=object)
+    for sexo, nomes in PRIMEIROS_NOMES.items():
+        mascara = sexos == sexo
+        primeiros[mascara] = rng.choice(nomes, size=int(mascara.sum()))
+    nome = pd.Series(primeiros)
+    # 2 a 5 sobrenomes, às vezes com partícula ('de', 'dos'...) antes do último
+    qtd_sobrenomes = rng.choice([1, 2, 3, 4], size=n, p=[0.15, 0.45, 0.3, 0.1])
+    for i in range(4):
+        sobrenome = pd.Series(rng.choice(SOBRENOMES, size=n))
+        particula = pd.Series(rng.choice(PARTICULAS, size=n)) + ' '
+        usar_particula = (rng.random(n) < 0.25) & (i == qtd_sobrenomes - 1)
+        sobrenome = particula.where(usar_particula, '') + sobrenome
+        nome = nome.where(qtd_sobrenomes <= i, nome + ' ' + sobrenome)
+    return nome.to_numpy(dtype=object)
+
+
+def gerar_pessoas(quantidade, rng):
+    """Cadastro de pessoas: Nome, Sexo e CPF (11 dígitos, texto)."""
+    sexos = np.where(rng.random(quantidade) < PROPORCAO_SEXO_FEMININO, 'Feminino', 'Masculino').astype(object)
+    nomes = _montar_nomes(sexos, rng)
+
+    # Homônimos: pessoas diferentes (outro CPF e nascimento) com o nome de outra pessoa
+    homonimos = np.flatnonzero(rng.random(quantidade) < PROPORCAO_HOMONIMOS)
+    origem = rng.integers(0, quantidade, size=len(homonimos))
+    nomes[homonimos] = nomes[origem]
+    sexos[homonimos] = sexos[origem]
+
+    cpf = pd.Series(rng.integers(0, 10**11, size=quantidade)).astype(str).str.zfill(11)
+    return pd.DataFrame({'Nome': nomes, 'Sexo': sexos, 'CPF': cpf.to_numpy()})
+
+
+def _variar_grafia(nomes, rng):
+    """Outra grafia do mesmo nome: caixa diferente, espaços extras ou sem acentos."""
+    nomes = pd.Series(nomes, dtype=object)
+    tipo = rng.integers(0, 3, size=len(nomes))
+    sem_acento = nomes.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('utf-8')
+    resultado = nomes.str.title().where(tipo == 0, nomes.str.replace(' ', '  ', n=1) + ' ')
+    return resultado.where(tipo != 2, sem_acento).to_numpy(dtype=object)
+
+
+def _formatar_cpf(cpf, rng):
+    """Mistura CPF com máscara (texto) e numérico (perde os zeros à esquerda), com alguns ausentes."""
+    cpf = pd.Series(cpf)
+    mascarado = cpf.str[:3] + '.' + cpf.str[3:6] + '.' + cpf.str[6:9] + '-' + cpf.str[9:]
+    sorteio = rng.random(len(cpf))
+    valores = np.where(sorteio < PROPORCAO_CPF_FORMATADO, mascarado.to_numpy(dtype=object),
+                       cpf.astype('int64').to_numpy(dtype=object))
+    valores[sorteio > 1 - PROPORCAO_CPF_AUSENTE] = None
+    return valores
+
+
+def carregar_perfil(caminho_perfil=ARQUIVO_PERFIL):
+    """Linhas da amostra real usadas como modelo das colunas descritivas."""
+    perfil = pd.read_csv(caminho_perfil)
+    perfil.columns = perfil.columns.str.strip()
+    return perfil[[col for col in COLUNAS_DESEJADAS if col in perfil.columns]]
+
+
+def gerar_export_turnover(linhas, semente=0, caminho_perfil=ARQUIVO_PERFIL):
+    """
+    Gera um export de turnover sintético com `linhas` contratos.
+    Retorna (export, pessoas); `pessoas` alimenta os geradores de faltas e absenteísmo.
+    """
+    rng = np.random.default_rng(semente)
+    perfil = carregar_perfil(caminho_perfil)
+
+    # Cada linha parte de uma linha da amostra (pares código/descrição coerentes)
+    df = perfil.iloc[rng.integers(0, len(perfil), size=linhas)].reset_index(drop=True)
+
+    # Pessoas: as primeiras linhas são contratos únicos; as demais, readmissões de pessoas já sorteadas
+    qtd_pessoas = max(1, int(round(linhas * (1 - PROPORCAO_READMISSOES))))
+    pessoas = gerar_pessoas(qtd_pessoas, rng)
+    indice_pessoa = np.concatenate([np.arange(qtd_pessoas), rng.integers(0, qtd_pessoas, size=linhas - qtd_pessoas)])
+    rng.shuffle(indice_pessoa)
+
+    # O export traz o nome em maiúsculas; uma parte das linhas vem com outra grafia
+    nomes = pd.Series(pessoas['Nome'].to_numpy(dtype=object)[indice_pessoa]).str.upper().to_numpy(dtype=object)
+    variantes = np.flatnonzero(rng.random(linhas) < PROPORCAO_VARIANTES_NOME)
+    nomes[variantes] = _variar_grafia(nomes[variantes], rng)
+    df['Nome'] = nomes
+    df['Sexo'] = pessoas['Sexo'].to_numpy()[indice_pessoa]
+    df['CPF'] = _formatar_cpf(pessoas['CPF'].to_numpy()[indice_pessoa], rng)
+
+    # Matrícula sequencial dentro de cada empresa (Empresa + Cadastro é a chave do contrato)
+    df['Cadastro'] = df.groupby('Empresa').cumcount().to_numpy() + 1
+
+    # Datas do contrato: a linha modelo é deslocada no tempo como um bloco, preservando a
+    # ordem entre admissão, afastamento, alterações etc.; sentinelas e vazios são mantidos
+    colunas_data = [col for col in colunas_de_data(df.columns) if col not in COLUNAS_DATA_PESSOA]
+    convertidas = {col: converter_coluna_data(df[col])[0] for col in colunas_data}
+    datas = pd.DataFrame(convertidas)
+    hoje = pd.Timestamp(date.today())
+    admissao = datas['Admissão'].fillna(datas.min(axis=1)).fillna(hoje)
+    limite_inferior = (DATA_MINIMA - admissao).dt.days.to_numpy()
+    limite_superior = (hoje - datas.max(axis=1).fillna(admissao)).dt.days.to_numpy()
+    limite_superior = np.maximum(limite_superior, limite_inferior)
+    deslocamento = pd.to_timedelta(rng.integers(limite_inferior, limite_superior + 1), unit='D')
+    admissao = admissao + deslocamento
+    for col in colunas_data:
+        preenchidas = datas[col].notna().to_numpy()
+        valores = df[col].to_numpy(dtype=object).copy()
+        valores[preenchidas] = _formatar_datas(datas[col][preenchidas] + deslocamento[preenchidas], rng)
+        df[col] = valores
+
+    # Nascimento: entre 18 e 50 anos antes da primeira admissão da pessoa
+    primeira_admissao = admissao.groupby(indice_pessoa).min().reindex(range(qtd_pessoas))
+    idade_dias = pd.to_timedelta(rng.integers(18 * 365, 50 * 365, size=qtd_pessoas), unit='D')
+    pessoas['Nascimento'] = (primeira_admissao - idade_dias).to_numpy()
+    df['Nascimento'] = _formatar_datas(pessoas['Nascimento'].to_numpy()[indice_pessoa], rng)
+
+    pessoas = pessoas.assign(Ativa=np.bincount(indice_pessoa[df['Situação'].to_numpy() != 7], minlength=qtd_pessoas) > 0)
+    return df[[col for col in COLUNAS_DESEJADAS if col in df.columns]], pessoas
+
+
+def _nome_como_apontamento(nomes, rng):
+    # Nos controles de ponto o nome vem com iniciais maiúsculas, às vezes todo em maiúsculas
+    nomes = pd.Series(nomes, dtype=object)
+    titulo = nomes.str.title().str.replace(r'\b(De|Da|Dos|Do)\b', lambda m: m.group(0).lower(), regex=True)
+    return titulo.where(rng.random(len(nomes)) < 0.85, nomes.str.upper()).to_numpy(dtype=object)
+
+
+def _sortear_apontados(pessoas, quantidade, rng):
+    candidatas = pessoas[pessoas['Ativa']] if pessoas['Ativa'].any() else pessoas
+    return candidatas.iloc[rng.choice(len(candidatas), size=min(quantidade, len(candidatas)), replace=False)]
+
+
+def gerar_faltas(pessoas, quantidade, semente=0):
+    """faltas_cpf.csv: Nome;Data;Motivo;CPF, com data como 'Sáb, 25/10/2025'."""
+    rng = np.random.default_rng(semente + 1)
+    # Poucas pessoas concentram as faltas (~9 por pessoa na amostra)
+    apontadas = _sortear_apontados(pessoas, max(1, quantidade // 9), rng)
+    escolhidas = apontadas.iloc[rng.integers(0, len(apontadas), size=quantidade)]
+
+    hoje = pd.Timestamp(date.today())
+    datas = pd.DatetimeIndex(hoje - pd.to_timedelta(rng.integers(1, 120, size=quantidade), unit='D'))
+    data_texto = DIAS_SEMANA[datas.dayofweek] + ', ' + _formatar_datas(datas, rng, proporcao_iso=0)
+    cpf = escolhidas['CPF']
+    return pd.DataFrame({
+        'Nome': _nome_como_apontamento(escolhidas['Nome'].to_numpy(), rng),
+        'Data': data_texto,
+        'Motivo': rng.choice(MOTIVOS_FALTA, size=quantidade, p=PESOS_MOTIVOS_FALTA / PESOS_MOTIVOS_FALTA.sum()),
+        'CPF': (cpf.str[:3] + '.' + cpf.str[3:6] + '.' + cpf.str[6:9] + '-' + cpf.str[9:]).to_numpy(),
+    }).sort_values(['Nome', 'Data'], ignore_index=True)
+
+
+def _formatar_duracao(minutos):
+    # Como no relatório: abaixo de 24h vem 'HH:MM'; a partir disso 'HHH:MM:SS'
+    minutos = pd.Series(minutos.astype('int64'))
+    horas = (minutos // 60).astype(str).str.zfill(2)
+    resto = (minutos % 60).astype(str).str.zfill(2)
+    return (horas + ':' + resto).where(minutos < 24 * 60, horas + ':' + resto + ':00').to_numpy(dtype=object)
+
+
+def gerar_absenteismo(pessoas, quantidade, semente=0):
+    """abs_atualizado.csv: Nome;Previsto;Ausência;Presença;ABS (ex.: '124:40:00', '09:00', '7,22%')."""
+    rng = np.random.default_rng(semente + 2)
+    apontadas = _sortear_apontados(pessoas, quantidade, rng)
+    n = len(apontadas)
+
+    previsto = rng.integers(60, 420, size=n) * 60 + rng.choice([0, 20, 40], size=n)
+    taxa = np.clip(rng.gamma(1.2, 0.06, size=n), 0, 1)
+    taxa[rng.random(n) < 0.1] = 0.0
+    ausencia = np.round(previsto * taxa)
+    presenca = np.clip(previsto - ausencia + rng.integers(-900, 900, size=n), 0, None)
+    abs_texto = pd.Series(ausencia / previsto * 100).map(lambda v: f"{v:.2f}".replace('.', ',') + '%')
+
+    df = pd.DataFrame({
+        'Nome': _nome_como_apontamento(apontadas['Nome'].to_numpy(), rng),
+        'Previsto': _formatar_duracao(previsto),
+        'Ausência': _formatar_duracao(ausencia),
+        'Presença': _formatar_duracao(presenca),
+        'ABS': abs_texto.to_numpy(),
+    }).sort_values('Nome', ignore_index=True)
+    # O relatório termina com uma linha em branco
+    return pd.concat([df, pd.DataFrame([[None] * len(df.columns)], columns=df.columns)], ignore_index=True)
+
+
+def salvar_dados_sinteticos(pasta, linhas, semente=0, formato='xlsx', caminho_perfil=ARQUIVO_PERFIL):
+    """
+    Grava na pasta o export de turnover ('xlsx' ou 'csv' com ';' e latin1, ambos aceitos
+    pelo agrupar.py), faltas_cpf.csv e abs_atualizado.csv. Retorna os caminhos gravados.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    export, pessoas = gerar_export_turnover(linhas, semente, caminho_perfil)
+    caminho_export = os.path.join(pasta, f"{NOME_EXPORT}.{formato}")
+    if formato == 'xlsx':
+        export.to_excel(caminho_export, index=False, engine='xlsxwriter')
+    elif formato == 'csv':
+        export.to_csv(caminho_export, sep=';', index=False, encoding='latin1', errors='replace')
+    else:
+        raise ValueError(f"Formato de export desconhecido: {formato}")
+
+    caminho_faltas = os.path.join(pasta, "faltas_cpf.csv")
+    caminho_abs = os.path.join(pasta, "abs_atualizado.csv")
+    gerar_faltas(pessoas, int(linhas * FALTAS_POR_LINHA), semente).to_csv(caminho_faltas, sep=';', index=False, encoding='utf-8')
+    gerar_absenteismo(pessoas, int(linhas * ABS_POR_LINHA), semente).to_csv(caminho_abs, sep=';', index=False, encoding='utf-8')
+    return {'export': caminho_export, 'faltas': caminho_faltas, 'abs': caminho_abs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera export de turnover, faltas e absenteísmo sintéticos.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help="quantidade de linhas do export (uma pasta por tamanho)")
+    parser.add_argument('--pasta', default='dados_sinteticos', help="pasta de saída")
+    parser.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx', help="formato do export de turnover")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    for linhas in args.linhas:
+        pasta = os.path.join(args.pasta, f"{linhas}_linhas")
+        inicio = pd.Timestamp.now()
+        caminhos = salvar_dados_sinteticos(pasta, linhas, args.semente, args.formato)
+        segundos = (pd.Timestamp.now() - inicio).total_seconds()
+        print(f"{linhas} linhas geradas em {segundos:.1f}s:")
+        for caminho in caminhos.values():
+            print(f"  - {caminho}")
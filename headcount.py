@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from atributos_derivados import periodos_contrato, data_referencia
+
+# =======================================================================
+# HEADCOUNT E TURNOVER MENSAL (AGREGADO PRÉ-CALCULADO)
+# =======================================================================
+# Em vez de o Power BI varrer a Fato_Contratos a cada visual, o ETL grava a
+# Fato_Headcount_Mensal: uma linha por mês e combinação Filial/C.Custo/Cargo.
+# Os períodos de contrato (mesma regra do tempo de casa: desligamento pela
+# Situação, reintegração reabre o contrato) viram eventos +1 no mês de início
+# e -1 no mês do desligamento; os eventos são contados numa matriz
+# grupos x meses (bincount) e o headcount sai da soma acumulada ao longo dos
+# meses, de uma vez para todos os grupos.
+#
+# Reintegração não é movimento de turnover: o afastamento que ela desfaz sai
+# em 'Afastamentos Revertidos' (não em 'Desligamentos') e a volta em
+# 'Reintegrações' (não em 'Admissões'). Assim o headcount continua igual ao
+# de quem estava ativo em cada fim de mês:
+#   Headcount Fim = Início + Admissões + Reintegrações
+#                   - Desligamentos - Afastamentos Revertidos
+#
+# Taxa Turnover = ((admissões + desligamentos) / 2) / headcount médio do mês.
+# Para totais (ex.: por filial), somar as colunas de contagem e refazer a
+# taxa; a taxa não deve ser somada.
+
+COLUNAS_GRUPO_HEADCOUNT = ['Filial_ID', 'CCusto_ID', 'Cargo_ID']
+# Quantos meses (até o mês da data de referência) entram na tabela; None = desde a primeira admissão.
+# O headcount do primeiro mês já considera toda a história anterior.
+MESES_HEADCOUNT_MENSAL = 60
+COLUNAS_CONTAGEM_HEADCOUNT = ['Headcount Início', 'Admissões', 'Reintegrações', 'Desligamentos',
+                              'Afastamentos Revertidos', 'Headcount Fim']
+
+
+def _mes(datas):
+    """Número do mês (datetime64[M] como inteiro) de cada data; -1 para vazio."""
+    meses = pd.to_datetime(datas).to_numpy(dtype='datetime64[M]')
+    return np.where(np.isnat(meses), -1, meses.astype('int64'))
+
+
+def fato_headcount_mensal(fato, colunas_grupo=None, data_ref=None, meses=MESES_HEADCOUNT_MENSAL):
+    """
+    Agregado mensal por grupo: 'Mês' (1º dia), colunas do grupo, 'Headcount
+    Início', 'Admissões', 'Reintegrações', 'Desligamentos', 'Afastamentos
+    Revertidos', 'Headcount Fim' e 'Taxa Turnover'. Só entram as combinações
+    grupo x mês com headcount ou movimento.
+    """
+    colunas_grupo = [col for col in (colunas_grupo or COLUNAS_GRUPO_HEADCOUNT) if col in fato.columns]
+    periodos = periodos_contrato(fato, colunas_grupo, com_reintegracao=True)
+    mes_final = int(np.datetime64(data_referencia(data_ref), 'M').astype('int64'))
+    mes_inicio, mes_fim = _mes(periodos['inicio']), _mes(periodos['fim'])
+    iniciados = mes_inicio <= mes_final
+    periodos, mes_inicio, mes_fim = periodos[iniciados], mes_inicio[iniciados], mes_fim[iniciados]
+    # Desligamento anterior à admissão (dado inconsistente) conta no próprio mês da admissão
+    mes_fim = np.where(mes_fim >= 0, np.maximum(mes_fim, mes_inicio), -1)
+    if periodos.empty:
+        return pd.DataFrame(columns=['Mês'] + colunas_grupo + COLUNAS_CONTAGEM_HEADCOUNT + ['Taxa Turnover'])
+
+    # Grupos como códigos inteiros (vazios formam grupo próprio)
+    grupos = periodos.groupby(colunas_grupo, dropna=False, sort=True) if colunas_grupo else None
+    codigo_grupo = grupos.ngroup().to_numpy() if grupos is not None else np.zeros(len(periodos), dtype='int64')
+    qtd_grupos = int(codigo_grupo.max()) + 1
+    primeiro_mes = int(mes_inicio.min())
+    qtd_meses = mes_final - primeiro_mes + 1
+
+    def contar(codigos, meses_evento):
+        indice = codigos * qtd_meses + (meses_evento - primeiro_mes)
+        return np.bincount(indice, minlength=qtd_grupos * qtd_meses).reshape(qtd_grupos, qtd_meses)
+
+    # Entradas e saídas separadas entre turnover e reintegração
+    reintegracao = periodos['reintegracao'].to_numpy()
+    revertido = periodos['fim_revertido'].to_numpy()
+    com_fim = (mes_fim >= 0) & (mes_fim <= mes_final)
+    admissoes = contar(codigo_grupo[~reintegracao], mes_inicio[~reintegracao])
+    reintegracoes = contar(codigo_grupo[reintegracao], mes_inicio[reintegracao])
+    desligamentos = contar(codigo_grupo[com_fim & ~revertido], mes_fim[com_fim & ~revertido])
+    revertidos = contar(codigo_grupo[com_fim & revertido], mes_fim[com_fim & revertido])
+    entradas, saidas = admissoes + reintegracoes, desligamentos + revertidos
+    headcount_fim = np.cumsum(entradas - saidas, axis=1)
+    headcount_inicio = headcount_fim - entradas + saidas
+
+    # Janela de meses pedida e só as células com headcount ou movimento
+    janela = slice(max(0, qtd_meses - meses), None) if meses else slice(None)
+    matrizes = [m[:, janela] for m in (headcount_inicio, admissoes, reintegracoes, desligamentos, revertidos, headcount_fim)]
+    manter = np.logical_or.reduce([m > 0 for m in matrizes])
+    linha_grupo, coluna_mes = np.nonzero(manter)
+    deslocamento = janela.start or 0
+
+    resultado = pd.DataFrame({
+        'Mês': (primeiro_mes + deslocamento + coluna_mes).astype('datetime64[M]').astype('datetime64[ns]'),
+    })
+    if grupos is not None:
+        # Mesma ordem dos códigos do ngroup()
+        chaves = grupos.size().index.to_frame(index=False)
+        for col in colunas_grupo:
+            resultado[col] = chaves[col].to_numpy()[linha_grupo]
+    for nome, matriz in zip(COLUNAS_CONTAGEM_HEADCOUNT, matrizes):
+        resultado[nome] = matriz[linha_grupo, coluna_mes].astype('int64')
+    headcount_medio = (resultado['Headcount Início'] + resultado['Headcount Fim']) / 2
+    resultado['Taxa Turnover'] = ((resultado['Admissões'] + resultado['Desligamentos']) / 2 / headcount_medio.where(headcount_medio > 0)).round(4)
+    return resultado.sort_values(['Mês'] + colunas_grupo, kind='stable').reset_index(drop=True)
@@ -0,0 +1,363 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+import pandas as pd
+
+from normalizacao import primeiros_nomes
+
+# =======================================================================
+# ÍNDICE LOCAL PRIMEIRO NOME -> SEXO
+# =======================================================================
+# Substitui a chamada por linha ao gender-guesser-br (API do IBGE) por um
+# dicionário em disco (SQLite), consultado uma única vez por primeiro nome
+# distinto e com um LRU em memória na frente. As respostas da fonte remota
+# (acertos, 'Não Encontrado' e falhas) ficam num cache persistente, cada tipo
+# com sua própria validade, para que execuções seguidas não repitam chamadas.
+
+SEXOS_VALIDOS = ('Masculino', 'Feminino')
+TAMANHO_LRU_PADRAO = 8192
+
+# Validade (em dias) das respostas da fonte remota guardadas no cache persistente
+DIAS_VALIDADE_POSITIVO = 365
+DIAS_VALIDADE_NEGATIVO = 30
+DIAS_VALIDADE_FALHA = 1
+
+# Consultas remotas: limite de chamadas simultâneas, timeout por chamada (s) e retentativas com backoff
+MAX_CONSULTAS_SIMULTANEAS = 8
+TIMEOUT_CONSULTA_SEGUNDOS = 10
+TENTATIVAS_CONSULTA = 3
+ESPERA_BASE_SEGUNDOS = 0.5
+# Prazo total (s) de uma rodada de consultas remotas; None = sem prazo (o disjuntor continua valendo)
+PRAZO_TOTAL_CONSULTAS_SEGUNDOS = 300
+
+STATUS_POSITIVO = 'positivo'
+STATUS_NEGATIVO = 'negativo'
+STATUS_FALHA = 'falha'
+
+
+def _padronizar_sexo(valor):
+    if valor is None or pd.isna(valor):
+        return None
+    valor = str(valor).strip().capitalize()
+    return valor if valor in SEXOS_VALIDOS else None
+
+
+def consultar_ibge(primeiro_nome):
+    """Consulta o gender-guesser-br (API do IBGE). Erros de rede/timeout são propagados."""
+    from gender_guesser_br import Genero
+    resultado = Genero(primeiro_nome)()
+    if resultado == 'masculino':
+        return 'Masculino'
+    if resultado == 'feminino':
+        return 'Feminino'
+    return None
+
+
+def _eh_timeout(erro):
+    return isinstance(erro, (socket.timeout, TimeoutError)) or 'timeout' in type(erro).__name__.lower()
+
+
+class _ControleConsultas:
+    """
+    Estado de uma rodada de consultas remotas: vagas de concorrência, chamadas presas
+    (threads que estouraram o timeout e ainda não voltaram) e prazo total. Quando todas
+    as vagas estão presas ou o prazo acaba, o disjuntor abre e nenhuma chamada nova sai.
+    """
+
+    def __init__(self, loop, max_concorrencia, prazo_total):
+        self.loop = loop
+        self.vagas = asyncio.Semaphore(max_concorrencia)
+        self.max_concorrencia = max_concorrencia
+        self.presas = 0
+        self.prazo = loop.time() + prazo_total if prazo_total else None
+        self.interrompido = None
+        self._disjuntor = asyncio.Event()
+
+    def _interromper(self, motivo):
+        if not self.interrompido:
+            self.interrompido = motivo
+            self._disjuntor.set()
+
+    def registrar_presa(self):
+        self.presas += 1
+        if self.presas >= self.max_concorrencia:
+            self._interromper(f"todas as {self.max_concorrencia} vagas presas em chamadas sem resposta")
+
+    def espera(self, segundos):
+        """`segundos`, limitado ao que resta do prazo total."""
+        if self.prazo is None:
+            return segundos
+        return max(0.0, min(segundos, self.prazo - self.loop.time()))
+
+    async def ocupar_vaga(self, timeout):
+        # Espera em fatias de `timeout`: com chamadas saudáveis as vagas vão sendo liberadas
+        # e a fila anda; o disjuntor e o prazo são conferidos a cada fatia
+        while True:
+            if self.prazo is not None and self.loop.time() >= self.prazo:
+                self._interromper("prazo total esgotado")
+            if self.interrompido:
+                raise TimeoutError(f"consulta remota não iniciada: {self.interrompido}")
+            try:
+                await asyncio.wait_for(self.vagas.acquire(), self.espera(timeout))
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    async def pausar(self, segundos):
+        """Espera do backoff, encerrada antes se o disjuntor abrir."""
+        try:
+            await asyncio.wait_for(self._disjuntor.wait(), self.espera(segundos))
+        except asyncio.TimeoutError:
+            pass
+
+
+class IndiceSexo:
+    """Dicionário persistente primeiro nome -> sexo com cache LRU em memória."""
+
+    def __init__(self, caminho_banco, tamanho_lru=TAMANHO_LRU_PADRAO, dias_validade_positivo=DIAS_VALIDADE_POSITIVO,
+                 dias_validade_negativo=DIAS_VALIDADE_NEGATIVO, dias_validade_falha=DIAS_VALIDADE_FALHA):
+        self.caminho_banco = caminho_banco
+        self.conexao = sqlite3.connect(caminho_banco)
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS primeiro_nome (nome TEXT PRIMARY KEY, sexo TEXT NOT NULL)"
+        )
+        # Cache das respostas remotas: positivas, negativas ('Não Encontrado') e falhas, cada uma com sua validade
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS cache_remoto ("
+            "nome TEXT PRIMARY KEY, sexo TEXT, status TEXT NOT NULL, expira_em REAL NOT NULL)"
+        )
+        self.conexao.commit()
+        self.consultar = lru_cache(maxsize=tamanho_lru)(self._consultar_banco)
+        self.validade_segundos = {
+            STATUS_POSITIVO: dias_validade_positivo * 86400,
+            STATUS_NEGATIVO: dias_validade_negativo * 86400,
+            STATUS_FALHA: dias_validade_falha * 86400,
+        }
+        self.estatisticas = Counter()
+
+    def _consultar_banco(self, chave):
+        if not chave:
+            return None
+        linha = self.conexao.execute(
+            "SELECT sexo FROM primeiro_nome WHERE nome = ?", (chave,)
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def __len__(self):
+        return self.conexao.execute("SELECT COUNT(*) FROM primeiro_nome").fetchone()[0]
+
+    def registrar(self, mapeamento):
+        """Grava/atualiza pares {primeiro_nome: sexo} no índice."""
+        chaves = primeiros_nomes(pd.Series(list(mapeamento.keys()), dtype=object))
+        pares = [
+            (chave, sexo) for chave, sexo in zip(chaves, map(_padronizar_sexo, mapeamento.values()))
+            if chave and sexo
+        ]
+        if not pares:
+            return 0
+        self.conexao.executemany(
+            "INSERT INTO primeiro_nome (nome, sexo) VALUES (?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET sexo = excluded.sexo",
+            pares
+        )
+        self.conexao.commit()
+        self.consultar.cache_clear()
+        return len(pares)
+
+    def _consultar_cache(self, chaves):
+        """Retorna {chave: (status, sexo)} apenas para entradas ainda válidas do cache remoto."""
+        agora = time.time()
+        encontrados = {}
+        chaves = list(chaves)
+        for inicio in range(0, len(chaves), 500):
+            lote = chaves[inicio:inicio + 500]
+            marcadores = ','.join('?' * len(lote))
+            for nome, sexo, status in self.conexao.execute(
+                f"SELECT nome, sexo, status FROM cache_remoto WHERE expira_em > ? AND nome IN ({marcadores})",
+                [agora, *lote]
+            ):
+                encontrados[nome] = (status, sexo)
+        return encontrados
+
+    def _gravar_cache(self, respostas):
+        """Grava {chave: (status, sexo)} no cache remoto com a validade do respectivo status."""
+        if not respostas:
+            return
+        agora = time.time()
+        self.conexao.executemany(
+            "INSERT INTO cache_remoto (nome, sexo, status, expira_em) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET sexo = excluded.sexo, status = excluded.status, "
+            "expira_em = excluded.expira_em",
+            [(chave, sexo, status, agora + self.validade_segundos[status]) for chave, (status, sexo) in respostas.items()]
+        )
+        self.conexao.commit()
+
+    @staticmethod
+    async def _chamar_em_thread(consulta_remota, nome, controle, timeout):
+        """
+        Executa uma chamada numa thread daemon. A vaga só é devolvida quando a thread
+        termina de fato (não no timeout): chamadas presas na rede continuam contando no
+        limite de concorrência e não seguram o encerramento do processo. A espera pela
+        vaga e pela resposta respeitam o timeout e o prazo total da rodada.
+        """
+        await controle.ocupar_vaga(timeout)
+        loop = controle.loop
+        futuro = loop.create_future()
+        abandonada = False
+
+        def concluir(sexo, erro):
+            controle.vagas.release()
+            if abandonada:
+                controle.presas -= 1
+            if futuro.done():
+                return
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(sexo)
+
+        def executar():
+            sexo, erro = None, None
+            try:
+                sexo = consulta_remota(nome)
+            except Exception as e:
+                erro = e
+            try:
+                loop.call_soon_threadsafe(concluir, sexo, erro)
+            except RuntimeError:
+                pass  # o loop já foi encerrado: ninguém espera mais por esta resposta
+
+        threading.Thread(target=executar, name='consulta_sexo', daemon=True).start()
+        try:
+            return await asyncio.wait_for(futuro, controle.espera(timeout))
+        except asyncio.TimeoutError:
+            if not futuro.done() or futuro.cancelled():
+                abandonada = True
+                controle.registrar_presa()
+            raise
+
+    async def _consultar_com_retentativas(self, chave, consulta_remota, controle, timeout, tentativas, espera_base):
+        erro = None
+        for tentativa in range(tentativas):
+            if tentativa:
+                if controle.interrompido:
+                    break
+                self.estatisticas['retentativas'] += 1
+                await controle.pausar(espera_base * 2 ** (tentativa - 1))
+                if controle.interrompido:
+                    break
+            try:
+                sexo = await self._chamar_em_thread(consulta_remota, chave.capitalize(), controle, timeout)
+            except Exception as e:
+                erro = e
+                continue
+            status = STATUS_POSITIVO if _padronizar_sexo(sexo) else STATUS_NEGATIVO
+            self.estatisticas[f'remoto_{status}'] += 1
+            return chave, (status, _padronizar_sexo(sexo))
+        self.estatisticas['remoto_timeout' if _eh_timeout(erro) else 'remoto_falha'] += 1
+        return chave, (STATUS_FALHA, None)
+
+    async def _consultar_remoto_async(self, chaves, consulta_remota, max_concorrencia, timeout, tentativas, espera_base,
+                                      prazo_total):
+        controle = _ControleConsultas(asyncio.get_running_loop(), max_concorrencia, prazo_total)
+        pares = await asyncio.gather(*(
+            self._consultar_com_retentativas(chave, consulta_remota, controle, timeout, tentativas, espera_base)
+            for chave in chaves
+        ))
+        if controle.interrompido:
+            print(f"  AVISO: consultas remotas interrompidas ({controle.interrompido}). "
+                  f"Os nomes restantes ficam como falha (nova consulta quando a falha expirar no cache).")
+        return dict(pares)
+
+    def _consultar_remoto(self, chaves, consulta_remota, max_concorrencia=MAX_CONSULTAS_SIMULTANEAS,
+                          timeout=TIMEOUT_CONSULTA_SEGUNDOS, tentativas=TENTATIVAS_CONSULTA,
+                          espera_base=ESPERA_BASE_SEGUNDOS, prazo_total=PRAZO_TOTAL_CONSULTAS_SEGUNDOS):
+        """
+        Consulta os primeiros nomes em paralelo (pool limitado), com timeout por chamada e backoff
+        exponencial. A rodada é interrompida (nomes restantes = falha) quando todas as vagas ficam
+        presas em chamadas que já estouraram o timeout ou quando passa de `prazo_total` segundos.
+        """
+        return asyncio.run(self._consultar_remoto_async(
+            chaves, consulta_remota, max_concorrencia, timeout, max(1, tentativas), espera_base, prazo_total
+        ))
+
+    def semear(self, df, coluna_nome='Nome', coluna_sexo='Sexo'):
+        """Alimenta o índice a partir de uma base Nome/Sexo (voto da maioria por primeiro nome)."""
+        if df is None or coluna_nome not in df.columns or coluna_sexo not in df.columns:
+            return 0
+        base = pd.DataFrame({
+            'chave': primeiros_nomes(df[coluna_nome]),
+            'sexo': df[coluna_sexo].map(_padronizar_sexo),
+        }).dropna()
+        if base.empty:
+            return 0
+        votos = base.groupby(['chave', 'sexo']).size().unstack(fill_value=0)
+        maximo = votos.max(axis=1)
+        # Nomes empatados (ex.: unissex) ficam fora do índice
+        sem_empate = votos.eq(maximo, axis=0).sum(axis=1) == 1
+        return self.registrar(votos[sem_empate].idxmax(axis=1).to_dict())
+
+    def inferir_serie(self, nomes, consulta_remota=None, **opcoes_remotas):
+        """
+        Infere o sexo de uma Series de nomes completos consultando o índice uma vez
+        por primeiro nome distinto. Nomes ausentes do índice passam pelo cache persistente
+        e, se não houver resposta válida guardada (inclusive negativa ou falha recente),
+        são enviados uma única vez cada para `consulta_remota` (ver `_consultar_remoto`
+        para as opções de concorrência, timeout e retentativas).
+        """
+        nomes_unicos = pd.Series(pd.unique(nomes.dropna()), dtype=object)
+        chaves_por_nome = dict(zip(nomes_unicos, primeiros_nomes(nomes_unicos)))
+        chaves_unicas = {c for c in chaves_por_nome.values() if c}
+        resultado = {chave: self.consultar(chave) for chave in chaves_unicas}
+
+        pendentes = [chave for chave, sexo in resultado.items() if sexo is None]
+        self.estatisticas['indice'] += len(chaves_unicas) - len(pendentes)
+
+        em_cache = self._consultar_cache(pendentes)
+        for chave, (status, sexo) in em_cache.items():
+            self.estatisticas[f'cache_{status}'] += 1
+            resultado[chave] = sexo
+
+        pendentes = [chave for chave in pendentes if chave not in em_cache]
+        if pendentes and consulta_remota is not None:
+            print(f"  -> {len(pendentes)} primeiros nomes sem resposta local. Consultando fonte remota em paralelo...")
+            respostas = self._consultar_remoto(pendentes, consulta_remota, **opcoes_remotas)
+            self._gravar_cache(respostas)
+            resultado.update({chave: sexo for chave, (_, sexo) in respostas.items()})
+        else:
+            self.estatisticas['sem_resposta'] += len(pendentes)
+
+        sexo_por_nome = {nome: resultado.get(chave) for nome, chave in chaves_por_nome.items()}
+        return nomes.map(sexo_por_nome)
+
+    def imprimir_estatisticas(self):
+        e = self.estatisticas
+        acertos_cache = e['cache_positivo'] + e['cache_negativo'] + e['cache_falha']
+        consultas_remotas = e['remoto_positivo'] + e['remoto_negativo'] + e['remoto_falha'] + e['remoto_timeout']
+        print("  Resumo da inferência de sexo (por primeiro nome distinto):")
+        print(f"    Acertos no índice local: {e['indice']}")
+        print(f"    Acertos no cache persistente: {acertos_cache} "
+              f"(positivos: {e['cache_positivo']}, negativos: {e['cache_negativo']}, falhas recentes: {e['cache_falha']})")
+        print(f"    Misses (consultas remotas): {consultas_remotas} "
+              f"(positivas: {e['remoto_positivo']}, não encontrados: {e['remoto_negativo']}, "
+              f"timeouts: {e['remoto_timeout']}, outras falhas: {e['remoto_falha']}, "
+              f"retentativas: {e['retentativas']})")
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def abrir_indice_sexo(caminho_banco, *bases_semente):
+    """Abre (ou cria) o índice e o alimenta com as bases Nome/Sexo informadas."""
+    print(f"\n-> Abrindo índice local de sexo: {os.path.basename(caminho_banco)}")
+    indice = IndiceSexo(caminho_banco)
+    for base in bases_semente:
+        indice.semear(base)
+    print(f"  Índice com {len(indice)} primeiros nomes conhecidos.")
+    return indice
@@ -0,0 +1,258 @@
+import atexit
+import cProfile
+import csv
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# =======================================================================
+# INSTRUMENTAÇÃO DAS ETAPAS (TEMPO, CPU, LINHAS E MEMÓRIA)
+# =======================================================================
+# Cada script abre uma execução com iniciar_execucao() e marca as etapas com
+# o gerenciador de contexto etapa() ou o decorador medir_etapa(). Para cada
+# etapa são registrados tempo de relógio, tempo de CPU do processo, linhas de
+# entrada/saída e memória do processo (RSS atual e pico); ao final o log da
+# execução é gravado em JSON e acrescentado ao CSV histórico. Sem execução
+# aberta (ex.: funções chamadas pelo benchmark_etl.py) nada é registrado.
+#
+# Uma única etapa pode ser perfilada (cProfile ou pyinstrument, se instalado)
+# passando o nome dela em `perfilar_etapa`.
+
+ARQUIVO_LOG_CSV = "log_execucoes.csv"
+LINHAS_RELATORIO_PERFIL = 25
+
+_execucao_atual = None
+
+
+def _memoria_processo():
+    """Retorna (RSS atual, pico de RSS) do processo em MB; None onde não for possível medir."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ContadoresMemoria(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            contadores = ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            processo = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+                return None, None
+            return contadores.WorkingSetSize / 2**20, contadores.PeakWorkingSetSize / 2**20
+
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        pico_mb = pico / 2**20 if sys.platform == 'darwin' else pico / 2**10  # macOS em bytes, Linux em KB
+        atual_mb = None
+        if os.path.exists('/proc/self/statm'):
+            with open('/proc/self/statm') as statm:
+                atual_mb = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+        return atual_mb, pico_mb
+    except Exception:
+        return None, None
+
+
+def _contar_linhas(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    return None
+
+
+class Etapa:
+    """Medição de uma etapa; `saida(df)` registra as linhas produzidas."""
+
+    def __init__(self, nome, linhas_entrada=None):
+        self.nome = nome
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+
+    def saida(self, valor):
+        self.linhas_saida = _contar_linhas(valor)
+        return valor
+
+
+class RegistroExecucao:
+    """Acumula as etapas de uma execução de script e grava o log (JSON + CSV histórico)."""
+
+    def __init__(self, script, pasta_log, perfilar_etapa=None, perfilador='cprofile'):
+        self.script = script
+        self.pasta_log = pasta_log
+        self.perfilar_etapa = perfilar_etapa
+        self.perfilador = perfilador
+        self.inicio = datetime.now()
+        self.id_execucao = f"{script}_{self.inicio:%Y%m%d_%H%M%S}"
+        self.etapas = []
+        self._pilha = []
+        self._proxima_ordem = 1
+        self._relogio_inicial = time.perf_counter()
+        self._cpu_inicial = time.process_time()
+        self.finalizada = False
+
+    @contextmanager
+    def etapa(self, nome, entrada=None):
+        caminho = '/'.join(self._pilha + [nome])
+        medicao = Etapa(caminho, _contar_linhas(entrada))
+        ordem, inicio = self._proxima_ordem, datetime.now()
+        self._proxima_ordem += 1
+        self._pilha.append(nome)
+        perfil = self._iniciar_perfil(nome)
+        relogio, cpu = time.perf_counter(), time.process_time()
+        status = 'ok'
+        try:
+            yield medicao
+        except BaseException:
+            status = 'erro'
+            raise
+        finally:
+            segundos, cpu_segundos = time.perf_counter() - relogio, time.process_time() - cpu
+            if perfil is not None:
+                self._encerrar_perfil(perfil, nome)
+            self._pilha.pop()
+            rss_mb, pico_rss_mb = _memoria_processo()
+            self.etapas.append({
+                'execucao': self.id_execucao, 'script': self.script, 'ordem': ordem, 'etapa': caminho,
+                'nivel': len(self._pilha), 'inicio': inicio.isoformat(timespec='seconds'),
+                'segundos': round(segundos, 4), 'cpu_segundos': round(cpu_segundos, 4),
+                'linhas_entrada': medicao.linhas_entrada, 'linhas_saida': medicao.linhas_saida,
+                'rss_mb': None if rss_mb is None else round(rss_mb, 1),
+                'pico_rss_mb': None if pico_rss_mb is None else round(pico_rss_mb, 1),
+                'status': status,
+            })
+
+    # --- Perfilamento de uma etapa ---
+    def _iniciar_perfil(self, nome):
+        if nome != self.perfilar_etapa:
+            return None
+        if self.perfilador == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                perfil = Profiler()
+                perfil.start()
+                return perfil
+            except ImportError:
+                print("  AVISO: pyinstrument não instalado. Usando cProfile.")
+        perfil = cProfile.Profile()
+        perfil.enable()
+        return perfil
+
+    def _encerrar_perfil(self, perfil, nome):
+        os.makedirs(self.pasta_log, exist_ok=True)
+        base = os.path.join(self.pasta_log, f"perfil_{self.id_execucao}_{nome}")
+        if isinstance(perfil, cProfile.Profile):
+            perfil.disable()
+            perfil.dump_stats(base + '.prof')
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats('cumulative').print_stats(LINHAS_RELATORIO_PERFIL)
+            print(f"\n--- Perfil da etapa '{nome}' (cProfile, ordenado por tempo acumulado) ---")
+            print(texto.getvalue())
+            print(f"Perfil completo salvo em: {base}.prof")
+        else:
+            perfil.stop()
+            with open(base + '.html', 'w', encoding='utf-8') as arquivo:
+                arquivo.write(perfil.output_html())
+            print(f"\n--- Perfil da etapa '{nome}' (pyinstrument) ---")
+            print(perfil.output_text())
+            print(f"Perfil completo salvo em: {base}.html")
+
+    # --- Log da execução ---
+    def finalizar(self):
+        if self.finalizada:
+            return None
+        self.finalizada = True
+        total = time.perf_counter() - self._relogio_inicial
+        _, pico_rss_mb = _memoria_processo()
+        resumo = {
+            'execucao': self.id_execucao, 'script': self.script,
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'fim': datetime.now().isoformat(timespec='seconds'),
+            'segundos': round(total, 4), 'cpu_segundos': round(time.process_time() - self._cpu_inicial, 4),
+            'pico_rss_mb': None if pico_rss_mb is None else round(pico_rss_mb, 1),
+            'etapas': self.etapas,
+        }
+        try:
+            os.makedirs(self.pasta_log, exist_ok=True)
+            caminho_json = os.path.join(self.pasta_log, f"{self.id_execucao}.json")
+            with open(caminho_json, 'w', encoding='utf-8') as arquivo:
+                json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+            if self.etapas:
+                caminho_csv = os.path.join(self.pasta_log, ARQUIVO_LOG_CSV)
+                novo = not os.path.exists(caminho_csv)
+                with open(caminho_csv, 'a', newline='', encoding='utf-8') as arquivo:
+                    escritor = csv.DictWriter(arquivo, fieldnames=list(self.etapas[0]))
+                    if novo:
+                        escritor.writeheader()
+                    escritor.writerows(self.etapas)
+        except OSError as e:
+            print(f"AVISO: não foi possível gravar o log de execução em '{self.pasta_log}': {e}")
+            return resumo
+
+        self.imprimir_resumo(total)
+        print(f"Log da execução salvo em: {caminho_json}")
+        return resumo
+
+    def imprimir_resumo(self, total):
+        print("\n" + "-" * 70)
+        print(f"TEMPO POR ETAPA ({self.script}) | total {total:.2f}s")
+        print("-" * 70)
+        for e in sorted(self.etapas, key=lambda e: e['ordem']):
+            linhas = ""
+            if e['linhas_entrada'] is not None or e['linhas_saida'] is not None:
+                linhas = f" | linhas {e['linhas_entrada'] if e['linhas_entrada'] is not None else '-'}" \
+                         f" -> {e['linhas_saida'] if e['linhas_saida'] is not None else '-'}"
+            memoria = f" | pico RSS {e['pico_rss_mb']:.0f} MB" if e['pico_rss_mb'] is not None else ""
+            print(f"{'  ' * e['nivel']}{e['etapa'].split('/')[-1]:<{30 - 2 * e['nivel']}} "
+                  f"{e['segundos']:8.2f}s (CPU {e['cpu_segundos']:7.2f}s){linhas}{memoria}"
+                  f"{'  [ERRO]' if e['status'] != 'ok' else ''}")
+
+
+def iniciar_execucao(script, pasta_log, perfilar_etapa=None, perfilador='cprofile'):
+    """Abre a execução do script; o log é gravado em finalizar_execucao() ou na saída do processo."""
+    global _execucao_atual
+    _execucao_atual = RegistroExecucao(script, pasta_log, perfilar_etapa, perfilador)
+    atexit.register(_execucao_atual.finalizar)
+    return _execucao_atual
+
+
+def finalizar_execucao():
+    global _execucao_atual
+    execucao, _execucao_atual = _execucao_atual, None
+    return execucao.finalizar() if execucao is not None else None
+
+
+@contextmanager
+def etapa(nome, entrada=None):
+    """Mede o bloco como uma etapa da execução aberta (ou não faz nada, se não houver)."""
+    if _execucao_atual is None:
+        yield Etapa(nome, _contar_linhas(entrada))
+        return
+    with _execucao_atual.etapa(nome, entrada) as medicao:
+        yield medicao
+
+
+def medir_etapa(nome):
+    """Decorador: mede a função como etapa; linhas de entrada = 1º DataFrame dos argumentos, saída = retorno."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            entrada = next((a for a in args if isinstance(a, (pd.DataFrame, pd.Series))), None)
+            with etapa(nome, entrada) as medicao:
+                return medicao.saida(funcao(*args, **kwargs))
+        return envoltorio
+    return decorador
@@ -0,0 +1,286 @@
+import json
+import os
+
+import pandas as pd
+
+from datas import converter_coluna_data, colunas_de_data
+
+# =======================================================================
+# BASE INTERMEDIÁRIA (ETAPA 1 -> ETAPA 2 / faltas.py)
+# =======================================================================
+# O CSV continua sendo gravado para compatibilidade; opcionalmente uma cópia
+# colunar (Parquet ou Feather/Arrow IPC) é salva ao lado dele, já tipada
+# (datas como datetime64, inteiros anuláveis como Int64), e os leitores
+# carregam apenas as colunas de que precisam.
+#
+# A cópia colunar e o CSV da mesma gravação ficam pareados num manifesto
+# ('<base>.<formato>.json', com tamanho e mtime de cada um): o leitor usa a
+# cópia colunar enquanto o CSV for o mesmo daquela gravação, sem depender de
+# qual dos dois arquivos terminou de ser gravado por último.
+
+FORMATOS_COLUNARES = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+def caminho_colunar(caminho_csv, formato):
+    return os.path.splitext(caminho_csv)[0] + FORMATOS_COLUNARES[formato]
+
+
+def caminho_manifesto(caminho_csv, formato):
+    return caminho_colunar(caminho_csv, formato) + '.json'
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return {'tamanho': estado.st_size, 'mtime': estado.st_mtime}
+
+
+def _gravar_manifesto(caminho_csv, formato, com_csv):
+    """Registra o par cópia colunar + CSV (None quando o CSV não foi gravado junto)."""
+    with open(caminho_manifesto(caminho_csv, formato), 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'colunar': _assinatura(caminho_colunar(caminho_csv, formato)),
+            'csv': _assinatura(caminho_csv) if com_csv else None,
+        }, arquivo, indent=2)
+
+
+def _colunar_atualizado(caminho_csv, formato):
+    """A cópia colunar existe e corresponde ao CSV atual (ou não há CSV)."""
+    destino = caminho_colunar(caminho_csv, formato)
+    if not os.path.exists(destino):
+        return False
+    if not os.path.exists(caminho_csv):
+        return True
+    try:
+        with open(caminho_manifesto(caminho_csv, formato), encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        manifesto = None
+    if manifesto is not None and manifesto.get('colunar') == _assinatura(destino) and manifesto.get('csv') is not None:
+        return manifesto['csv'] == _assinatura(caminho_csv)
+    # Sem par registrado (base antiga ou CSV gravado em outra execução): vale a mais recente
+    return os.path.getmtime(destino) >= os.path.getmtime(caminho_csv)
+
+
+def tipar_para_colunar(df):
+    """Converte as colunas para tipos que o formato colunar preserva (base intermediária e modelo em Parquet)."""
+    df = df.reset_index(drop=True).copy()
+    datas = set(colunas_de_data(df.columns))
+    for col in df.columns:
+        serie = df[col]
+        if col in datas:
+            df[col], _ = converter_coluna_data(serie)
+        elif pd.api.types.is_float_dtype(serie):
+            valores = serie.dropna()
+            if not valores.empty and (valores % 1 == 0).all() and valores.abs().max() < 2**53:
+                df[col] = serie.astype('Int64')
+        elif serie.dtype == object:
+            # Colunas com tipos misturados (ex.: números e textos) viram texto para o Arrow
+            df[col] = serie.where(serie.isna(), serie.astype(str))
+    return df
+
+
+def salvar_intermediario(df, caminho_csv, formato='csv', manter_csv=True):
+    """Grava a base intermediária em CSV e/ou no formato colunar escolhido."""
+    caminhos = []
+    if formato not in FORMATOS_COLUNARES:
+        if formato != 'csv':
+            print(f"  AVISO: formato intermediário '{formato}' desconhecido. Gravando apenas o CSV.")
+        formato, manter_csv = None, True
+
+    if manter_csv:
+        df.to_csv(caminho_csv, index=False, encoding='utf-8')
+        caminhos.append(caminho_csv)
+
+    if formato is not None:
+        destino = caminho_colunar(caminho_csv, formato)
+        try:
+            df_tipado = tipar_para_colunar(df)
+            if formato == 'parquet':
+                df_tipado.to_parquet(destino, index=False)
+            else:
+                df_tipado.to_feather(destino)
+            _gravar_manifesto(caminho_csv, formato, manter_csv)
+            caminhos.insert(0, destino)
+        except ImportError as e:
+            print(f"  AVISO: formato '{formato}' indisponível ({e}). Gravando apenas o CSV.")
+            if not manter_csv:
+                df.to_csv(caminho_csv, index=False, encoding='utf-8')
+                caminhos.append(caminho_csv)
+    return caminhos
+
+
+def _esquema_do_arquivo_colunar(caminho, formato):
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    if formato == 'parquet':
+        return pq.ParquetFile(caminho).schema_arrow
+    with ipc.open_file(caminho) as leitor:
+        return leitor.schema
+
+
+def _colunas_a_inferir(esquema):
+    """Colunas gravadas como texto pelo GravadorIntermediario, cujo tipo é inferido na leitura."""
+    valor = (esquema.metadata or {}).get(CHAVE_COLUNAS_A_INFERIR)
+    return json.loads(valor) if valor else []
+
+
+def _inferir_numeros(df, colunas):
+    """Como o read_csv: coluna só com valores numéricos (ou vazios) vira número, senão fica texto."""
+    for col in colunas:
+        if col in df.columns:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+def ler_intermediario(caminho_csv, colunas=None, formato=None):
+    """
+    Lê a base intermediária priorizando a cópia colunar (se corresponder ao CSV
+    atual, ver o manifesto). Com `colunas`, apenas as colunas existentes da lista são lidas.
+    """
+    formatos = [formato] if formato in FORMATOS_COLUNARES else list(FORMATOS_COLUNARES)
+    for fmt in formatos:
+        if not _colunar_atualizado(caminho_csv, fmt):
+            continue
+        destino = caminho_colunar(caminho_csv, fmt)
+        try:
+            esquema = _esquema_do_arquivo_colunar(destino, fmt)
+            selecao = None
+            if colunas is not None:
+                existentes = set(esquema.names)
+                selecao = [col for col in colunas if col in existentes]
+            if fmt == 'parquet':
+                df = pd.read_parquet(destino, columns=selecao)
+            else:
+                df = pd.read_feather(destino, columns=selecao)
+            return _inferir_numeros(df, _colunas_a_inferir(esquema))
+        except ImportError as e:
+            print(f"  AVISO: não foi possível ler '{os.path.basename(destino)}' ({e}). Usando o CSV.")
+            break
+
+    if colunas is None:
+        df = pd.read_csv(caminho_csv)
+    else:
+        desejadas = {col.strip() for col in colunas}
+        df = pd.read_csv(caminho_csv, usecols=lambda c: c.strip() in desejadas)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+# =======================================================================
+# GRAVAÇÃO EM LOTES
+# =======================================================================
+# Na consolidação em lotes cada lote é acrescentado ao CSV e à cópia colunar
+# assim que fica pronto. O formato colunar exige um esquema único para o
+# arquivo todo, fixado no primeiro lote: datas -> timestamp e o restante ->
+# texto. Um lote não diz o tipo dos seguintes (coluna vazia no primeiro lote,
+# cadastro que parece número e depois vem '3A'), então nenhum valor é
+# convertido na gravação; as colunas de texto ficam listadas nos metadados do
+# arquivo e ler_intermediario as converte para número só quando todos os
+# valores são numéricos, como o read_csv faria com o CSV. Os arquivos são
+# gravados com sufixo '.parcial' e só substituem a base anterior quando o
+# último lote é gravado.
+
+CHAVE_COLUNAS_A_INFERIR = b'intermediario.colunas_a_inferir'
+
+
+def _esquema_lotes(df_tipado):
+    import pyarrow as pa
+    campos = []
+    for col in df_tipado.columns:
+        tipo = pa.timestamp('ns') if pd.api.types.is_datetime64_any_dtype(df_tipado[col]) else pa.string()
+        campos.append(pa.field(col, tipo))
+    texto = [campo.name for campo in campos if pa.types.is_string(campo.type)]
+    return pa.schema(campos, metadata={CHAVE_COLUNAS_A_INFERIR: json.dumps(texto).encode('utf-8')})
+
+
+class GravadorIntermediario:
+    """Acrescenta lotes à base intermediária (CSV e/ou formato colunar) com esquema fixo."""
+
+    def __init__(self, caminho_csv, formato='csv', manter_csv=True):
+        if formato not in FORMATOS_COLUNARES:
+            if formato != 'csv':
+                print(f"  AVISO: formato intermediário '{formato}' desconhecido. Gravando apenas o CSV.")
+            formato, manter_csv = None, True
+        self.caminho_csv = caminho_csv
+        self.formato = formato
+        self.manter_csv = manter_csv
+        self.linhas = 0
+        self._colunas = None
+        self._esquema = None
+        self._escritor_colunar = None
+        self._arquivo_csv = None
+
+    def _tabela_do_lote(self, df):
+        import pyarrow as pa
+        df_tipado = tipar_para_colunar(df)
+        if self._esquema is None:
+            self._esquema = _esquema_lotes(df_tipado)
+        for campo in self._esquema:
+            serie = df_tipado[campo.name]
+            if pa.types.is_timestamp(campo.type):
+                df_tipado[campo.name] = pd.to_datetime(serie, errors='coerce')
+            else:
+                df_tipado[campo.name] = serie.astype(object).where(serie.isna(), serie.astype(str))
+        return pa.Table.from_pandas(df_tipado, schema=self._esquema, preserve_index=False)
+
+    def _acrescentar_colunar(self, df):
+        tabela = self._tabela_do_lote(df)
+        if self._escritor_colunar is None:
+            destino = caminho_colunar(self.caminho_csv, self.formato) + '.parcial'
+            if self.formato == 'parquet':
+                import pyarrow.parquet as pq
+                self._escritor_colunar = pq.ParquetWriter(destino, self._esquema)
+            else:
+                import pyarrow.ipc as ipc
+                self._escritor_colunar = ipc.new_file(destino, self._esquema)
+        self._escritor_colunar.write_table(tabela)
+
+    def acrescentar(self, df):
+        """Grava um lote; as colunas (e a ordem) do primeiro lote valem para os seguintes."""
+        if self._colunas is None:
+            self._colunas = list(df.columns)
+        df = df.reindex(columns=self._colunas)
+
+        if self.formato is not None:
+            try:
+                self._acrescentar_colunar(df)
+            except ImportError as e:
+                print(f"  AVISO: formato '{self.formato}' indisponível ({e}). Gravando apenas o CSV.")
+                self.formato, self.manter_csv = None, True
+
+        if self.manter_csv:
+            if self._arquivo_csv is None:
+                self._arquivo_csv = open(self.caminho_csv + '.parcial', 'w', encoding='utf-8', newline='')
+            df.to_csv(self._arquivo_csv, index=False, header=self.linhas == 0)
+        self.linhas += len(df)
+
+    def _fechar_arquivos(self):
+        # CSV primeiro: sem manifesto (base interrompida/antiga) vale a cópia mais recente
+        if self._arquivo_csv is not None:
+            self._arquivo_csv.close()
+        if self._escritor_colunar is not None:
+            self._escritor_colunar.close()
+
+    def fechar(self):
+        """Finaliza os arquivos, substitui a base anterior e retorna os caminhos gravados."""
+        self._fechar_arquivos()
+        caminhos = []
+        if self._arquivo_csv is not None:
+            os.replace(self.caminho_csv + '.parcial', self.caminho_csv)
+            caminhos.append(self.caminho_csv)
+        if self._escritor_colunar is not None:
+            destino = caminho_colunar(self.caminho_csv, self.formato)
+            os.replace(destino + '.parcial', destino)
+            _gravar_manifesto(self.caminho_csv, self.formato, self._arquivo_csv is not None)
+            caminhos.insert(0, destino)
+        return caminhos
+
+    def descartar(self):
+        """Interrompe a gravação e remove os arquivos parciais (a base anterior é preservada)."""
+        self._fechar_arquivos()
+        for destino in (self.caminho_csv, *(caminho_colunar(self.caminho_csv, f) for f in FORMATOS_COLUNARES)):
+            if os.path.exists(destino + '.parcial'):
+                os.remove(destino + '.parcial')
@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+
+# =======================================================================
+# LEITURA DO EXPORT EM LOTES (MEMÓRIA LIMITADA)
+# =======================================================================
+# Gera DataFrames de tamanho fixo a partir do arquivo de origem sem carregar a
+# planilha inteira: .xlsx é percorrido em modo somente leitura do openpyxl
+# (linha a linha) e CSV com `chunksize` do pandas. Apenas as colunas pedidas
+# são mantidas em cada lote. O .xls antigo não tem leitura incremental; nesse
+# caso o arquivo é lido de uma vez e entregue fatiado.
+
+TAMANHO_LOTE_PADRAO = 50_000
+
+
+def _filtro_colunas(colunas):
+    if colunas is None:
+        return lambda nome: True
+    desejadas = {str(col).strip() for col in colunas}
+    return lambda nome: str(nome).strip() in desejadas
+
+
+def _lotes_xlsx(caminho, colunas, tamanho_lote):
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = livro.worksheets[0]
+        # Exports gerados por sistemas costumam gravar dimensões erradas; lê até a última linha real
+        planilha.reset_dimensions()
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+
+        manter = _filtro_colunas(colunas)
+        indices, nomes = [], []
+        for i, nome in enumerate(cabecalho):
+            if nome is None:
+                continue
+            nome = str(nome).strip()
+            if manter(nome) and nome not in nomes:
+                indices.append(i)
+                nomes.append(nome)
+
+        lote = []
+        for linha in linhas:
+            valores = [linha[i] if i < len(linha) else None for i in indices]
+            if all(v is None for v in valores):
+                continue
+            lote.append(valores)
+            if len(lote) >= tamanho_lote:
+                yield pd.DataFrame(lote, columns=nomes)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=nomes)
+    finally:
+        livro.close()
+
+
+def _lotes_csv(caminho, colunas, tamanho_lote):
+    with open(caminho, encoding='latin1') as arquivo:
+        primeira_linha = arquivo.readline()
+    separador = ';' if primeira_linha.count(';') >= primeira_linha.count(',') else ','
+
+    leitor = pd.read_csv(
+        caminho, sep=separador, encoding='latin1',
+        usecols=_filtro_colunas(colunas), chunksize=tamanho_lote
+    )
+    with leitor:
+        for lote in leitor:
+            lote.columns = lote.columns.str.strip()
+            yield lote
+
+
+def _lotes_xls(caminho, colunas, tamanho_lote):
+    print(f"  AVISO: '{os.path.basename(caminho)}' é .xls e não permite leitura incremental; o arquivo será lido inteiro.")
+    df = pd.read_excel(caminho, usecols=_filtro_colunas(colunas))
+    df.columns = df.columns.str.strip()
+    for inicio in range(0, len(df), tamanho_lote):
+        yield df.iloc[inicio:inicio + tamanho_lote].reset_index(drop=True)
+
+
+def ler_em_lotes(caminho, colunas=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """
+    Gera DataFrames de até `tamanho_lote` linhas do export (.xlsx, .xls ou CSV),
+    com os nomes de coluna já sem espaços nas pontas. Com `colunas`, só as
+    colunas da lista que existirem no arquivo são mantidas.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao in ('.xlsx', '.xlsm'):
+        return _lotes_xlsx(caminho, colunas, tamanho_lote)
+    if extensao == '.xls':
+        return _lotes_xls(caminho, colunas, tamanho_lote)
+    return _lotes_csv(caminho, colunas, tamanho_lote)
@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+
+# =======================================================================
+# RECONSTRUÇÃO INCREMENTAL (DELTA) DO MODELO ESTRELA
+# =======================================================================
+# O estado da última execução (dimensões com a chave natural e o ID, e a fato
+# com a chave do contrato e o hash da linha de origem) fica salvo em disco.
+# Na execução seguinte só as linhas novas/alteradas são reprocessadas; os IDs
+# vêm do registro persistente de chaves (registro_chaves.py), então as relações
+# do Power BI não mudam.
+#
+# Linhas de dimensão cuja chave não aparece mais na origem (ex.: contrato
+# removido) saem ao final (podar_dimensoes): cada linha da Fato recomposta
+# guarda o ID de cada dimensão de onde veio (para a Dim_Pessoa, o ID da chave
+# Nome + Nascimento da própria linha, em COLUNA_PESSOA_ORIGEM), e só as linhas
+# referenciadas ficam. Assim as dimensões incrementais têm as mesmas linhas
+# de uma reconstrução completa com a mesma entrada (se uma chave tem
+# atributos divergentes entre contratos, vale o do contrato processado por
+# último, e não o da primeira linha da origem).
+#
+# O estado só vale junto com o registro de chaves que deu os IDs a ele: a
+# assinatura do registro (identificador do banco e maior ID por dimensão) é
+# salva com o estado, e um registro apagado, trocado ou restaurado de uma
+# cópia antiga força a reconstrução completa (senão os IDs novos do delta
+# colidiriam com os da Fato e das dimensões mantidas).
+
+CHAVE_CONTRATO = ['Empresa', 'Cadastro']
+COLUNA_CHAVE_CONTRATO = '_Chave_Contrato'
+COLUNA_HASH_LINHA = '_Hash_Linha'
+COLUNA_PESSOA_ORIGEM = '_Pessoa_ID_Origem'
+# Colunas de controle da Fato: ficam no estado, mas não vão para o modelo
+COLUNAS_CONTROLE = [COLUNA_CHAVE_CONTRATO, COLUNA_HASH_LINHA, COLUNA_PESSOA_ORIGEM]
+# Dimensão -> (coluna de ID na dimensão, coluna da Fato que aponta a linha de origem)
+REFERENCIAS_DIMENSOES = {
+    'dim_empresa': ('Empresa_ID', 'Empresa_ID'),
+    'dim_filial': ('Filial_ID', 'Filial_ID'),
+    'dim_pessoa': ('Pessoa_ID', COLUNA_PESSOA_ORIGEM),
+    'dim_cargo': ('Cargo_ID', 'Cargo_ID'),
+    'dim_ccusto': ('CCusto_ID', 'CCusto_ID'),
+}
+TABELAS_ESTADO = ['dim_empresa', 'dim_filial', 'dim_pessoa', 'dim_cargo', 'dim_ccusto', 'fato']
+
+
+def registro_compativel(assinatura_salva, assinatura_atual):
+    """Mesmo banco de registro e nenhum ID a menos do que quando o estado foi salvo."""
+    if not assinatura_salva or assinatura_salva.get('identificador') != assinatura_atual['identificador']:
+        return False
+    maximos = assinatura_atual['maximos']
+    return all(maximos.get(dimensao, 0) >= maximo for dimensao, maximo in assinatura_salva['maximos'].items())
+
+
+def carregar_estado(pasta_estado, colunas, assinatura_registro):
+    """
+    Carrega o estado anterior; retorna None se não existir, se as colunas de origem
+    mudaram ou se ele não corresponde ao registro de chaves atual.
+    """
+    caminho_colunas = os.path.join(pasta_estado, 'colunas.pkl')
+    if not os.path.exists(caminho_colunas):
+        return None
+    try:
+        if pd.read_pickle(caminho_colunas) != list(colunas):
+            print("  AVISO: as colunas da base mudaram desde a última execução. Reconstrução completa.")
+            return None
+        caminho_registro = os.path.join(pasta_estado, 'registro.pkl')
+        assinatura_salva = pd.read_pickle(caminho_registro) if os.path.exists(caminho_registro) else None
+        if not registro_compativel(assinatura_salva, assinatura_registro):
+            print("  AVISO: o registro de chaves não é o mesmo da última execução (apagado, trocado ou "
+                  "restaurado). Reconstrução completa.")
+            return None
+        estado = {nome: pd.read_pickle(os.path.join(pasta_estado, f'{nome}.pkl')) for nome in TABELAS_ESTADO}
+    except Exception as e:
+        print(f"  AVISO: estado incremental ilegível ({e}). Reconstrução completa.")
+        return None
+    if not set(COLUNAS_CONTROLE).issubset(estado['fato'].columns):
+        print("  AVISO: estado incremental de uma versão anterior (sem as colunas de controle). Reconstrução completa.")
+        return None
+    return estado
+
+
+def salvar_estado(pasta_estado, colunas, tabelas, assinatura_registro):
+    os.makedirs(pasta_estado, exist_ok=True)
+    for nome in TABELAS_ESTADO:
+        tabelas[nome].to_pickle(os.path.join(pasta_estado, f'{nome}.pkl'))
+    pd.to_pickle(assinatura_registro, os.path.join(pasta_estado, 'registro.pkl'))
+    pd.to_pickle(list(colunas), os.path.join(pasta_estado, 'colunas.pkl'))
+
+
+def marcar_linhas(df):
+    """Adiciona a chave natural do contrato e o hash do conteúdo de cada linha."""
+    df = df.copy()
+    df[COLUNA_CHAVE_CONTRATO] = df[CHAVE_CONTRATO[0]].astype(str)
+    for col in CHAVE_CONTRATO[1:]:
+        df[COLUNA_CHAVE_CONTRATO] += '|' + df[col].astype(str)
+    colunas_conteudo = [col for col in df.columns if col != COLUNA_CHAVE_CONTRATO]
+    df[COLUNA_HASH_LINHA] = pd.util.hash_pandas_object(df[colunas_conteudo], index=False).values
+    return df
+
+
+def separar_delta(df_marcado, fato_anterior):
+    """
+    Compara as linhas atuais com a fato anterior pela chave do contrato.
+    Retorna (linhas novas/alteradas, linhas da fato anterior que continuam válidas, resumo).
+    """
+    hash_anterior = fato_anterior.drop_duplicates(COLUNA_CHAVE_CONTRATO).set_index(COLUNA_CHAVE_CONTRATO)[COLUNA_HASH_LINHA]
+    hash_conhecido = df_marcado[COLUNA_CHAVE_CONTRATO].map(hash_anterior)
+    inalteradas = hash_conhecido.eq(df_marcado[COLUNA_HASH_LINHA])
+
+    chaves_inalteradas = df_marcado.loc[inalteradas, COLUNA_CHAVE_CONTRATO]
+    fato_mantida = fato_anterior[fato_anterior[COLUNA_CHAVE_CONTRATO].isin(chaves_inalteradas)]
+    resumo = {
+        'novas': int(hash_conhecido.isna().sum()),
+        'alteradas': int((hash_conhecido.notna() & ~inalteradas).sum()),
+        'inalteradas': int(inalteradas.sum()),
+        'removidas': int((~hash_anterior.index.isin(df_marcado[COLUNA_CHAVE_CONTRATO])).sum()),
+    }
+    return df_marcado[~inalteradas].copy(), fato_mantida, resumo
+
+
+def mesclar_dimensao(dim_nova, dim_anterior, chaves, coluna_id):
+    """
+    Junta a dimensão construída a partir do delta com a anterior: linhas cuja
+    chave aparece no delta são substituídas (atributos atualizados) e as demais
+    linhas anteriores são mantidas (as que ficarem sem referência na Fato saem
+    em podar_dimensoes). Os IDs vêm do registro de chaves, portanto uma mesma
+    chave tem o mesmo ID nas duas versões.
+    """
+    if dim_anterior is None or dim_anterior.empty:
+        return dim_nova
+    chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+
+    atualizadas = pd.MultiIndex.from_frame(dim_anterior[chaves]).isin(pd.MultiIndex.from_frame(dim_nova[chaves]))
+    novas = len(dim_nova) - int(atualizadas.sum())
+    resultado = pd.concat([dim_anterior[~atualizadas], dim_nova], ignore_index=True, sort=False)
+    resultado = resultado.sort_values(coluna_id, ignore_index=True)
+    colunas = [coluna_id] + [col for col in resultado.columns if col != coluna_id]
+    print(f"  {coluna_id}: {novas} novos, {int(atualizadas.sum())} atualizados, "
+          f"{int((~atualizadas).sum())} mantidos da execução anterior.")
+    return resultado[colunas]
+
+
+def podar_dimensoes(dims, fato):
+    """Remove das dimensões as linhas que nenhuma linha da Fato (recomposta) referencia mais."""
+    podadas = {}
+    for nome, dim in dims.items():
+        coluna_id, coluna_fato = REFERENCIAS_DIMENSOES[nome]
+        referenciadas = dim[coluna_id].isin(fato[coluna_fato].dropna())
+        if not referenciadas.all():
+            print(f"  {coluna_id}: {int((~referenciadas).sum())} linhas sem contrato na origem removidas da dimensão.")
+        podadas[nome] = dim[referenciadas].reset_index(drop=True)
+    return podadas
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# =======================================================================
+# NORMALIZAÇÃO VETORIZADA DE NOMES E CHAVES
+# =======================================================================
+# Cada valor distinto é normalizado uma única vez por execução: as Series são
+# fatorizadas, apenas os valores ainda ausentes da tabela de memo passam pelas
+# operações de texto (vetorizadas, sobre os únicos) e o resultado é expandido
+# de volta às linhas pelos códigos.
+#
+# As chaves de relacionamento (CPF, Cadastro, Empresa, Filial...) seguem o
+# mesmo caminho: o memo é compartilhado por todas as colunas de chave e
+# pelos scripts (agrupar.py e faltas.py), e os nulos continuam nulos (sem
+# virar o texto 'NAN').
+
+_MEMO_NOME = {}
+_MEMO_PRIMEIRO_NOME = {}
+_MEMO_CHAVE = {}
+
+# Textos que representam vazio em chaves já convertidas para texto por versões anteriores
+# (str(NaN) -> 'NAN', str(None) -> 'NONE', str(pd.NA) -> '<NA>'); só valores exatamente iguais
+TEXTOS_NULOS_CHAVE = {'', 'NAN', 'NONE', '<NA>', 'NAT'}
+
+
+def _sem_acento_maiusculo(textos):
+    return (
+        textos.astype(str).str.strip()
+        .str.normalize('NFKD')
+        .str.encode('ascii', 'ignore').str.decode('utf-8')
+        .str.upper()
+    )
+
+
+def _normalizar_nomes_unicos(unicos):
+    texto = _sem_acento_maiusculo(unicos).str.replace(r'[^A-Z\s]', '', regex=True)
+    return texto.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _primeiros_nomes_unicos(unicos):
+    # Acentos são removidos antes do filtro de letras, então "Ângela" vira "ANGELA" (e não "NGELA")
+    palavras = _sem_acento_maiusculo(unicos).str.replace(r'[^A-Z\s]', ' ', regex=True).str.split()
+    return palavras.str[0].where(palavras.str.len() > 0, None)
+
+
+def _aplicar_com_memo(serie, memo, normalizar_unicos):
+    codigos, unicos = pd.factorize(serie)
+    faltantes = [valor for valor in unicos if valor not in memo]
+    if faltantes:
+        memo.update(zip(faltantes, normalizar_unicos(pd.Series(faltantes, dtype=object))))
+    # O último elemento (None) atende o código -1 que o factorize dá aos nulos
+    valores = np.array([memo[valor] for valor in unicos] + [None], dtype=object)
+    return pd.Series(valores[codigos], index=serie.index, name=serie.name)
+
+
+def _texto_chave(valor):
+    # Números inteiros lidos como float (123.0) voltam a ser o código '123'
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _canonizar_chaves_unicas(unicos):
+    texto = pd.Series([_texto_chave(valor) for valor in unicos], dtype=object).str.strip().str.upper()
+    return texto.where(~texto.isin(TEXTOS_NULOS_CHAVE), None)
+
+
+def canonizar_chave(serie):
+    """Chave como texto sem espaços nas pontas e em caixa alta ('123.0' -> '123'); vazios viram None."""
+    return _aplicar_com_memo(serie, _MEMO_CHAVE, _canonizar_chaves_unicas)
+
+
+def limpar_chaves(df, colunas):
+    """Aplica canonizar_chave, no próprio DataFrame, às colunas da lista que existirem."""
+    for col in colunas:
+        if col in df.columns:
+            df[col] = canonizar_chave(df[col])
+    return df
+
+
+def padronizar_nomes(serie):
+    """Remove acentos, deixa maiúsculo, mantém só letras/espaços e elimina espaços duplos."""
+    return _aplicar_com_memo(serie, _MEMO_NOME, _normalizar_nomes_unicos)
+
+
+def primeiros_nomes(serie):
+    """Primeiro nome de cada valor (sem acento, maiúsculo); None quando não há letras."""
+    return _aplicar_com_memo(serie, _MEMO_PRIMEIRO_NOME, _primeiros_nomes_unicos)
+
+
+def padronizar_nome_pessoa(nome):
+    if nome is None or pd.isna(nome):
+        return None
+    return padronizar_nomes(pd.Series([nome], dtype=object)).iloc[0]
+
+
+def primeiro_nome(nome):
+    if nome is None or pd.isna(nome):
+        return None
+    return primeiros_nomes(pd.Series([nome], dtype=object)).iloc[0]
+
+
+def limpar_memo():
+    _MEMO_NOME.clear()
+    _MEMO_PRIMEIRO_NOME.clear()
+    _MEMO_CHAVE.clear()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from datas import converter_datas, colunas_de_data
+
+# =======================================================================
+# PLANO DE TIPOS DA BASE CONSOLIDADA
+# =======================================================================
+# Aplicado uma vez na ingestão, para a base não ficar toda em `object`:
+#   - datas (mesmo critério do ETL)         -> datetime64
+#   - colunas '% ...'                       -> float32
+#   - números inteiros (códigos, contagens) -> menor inteiro anulável (Int8/16/32)
+#   - textos que repetem poucos valores     -> category
+# As chaves de relacionamento ficam como estão até a limpeza da Etapa 2, que
+# as converte para category (compactar_chaves), de modo que drop_duplicates e
+# merges das dimensões trabalham sobre os códigos inteiros.
+
+# Texto vira category quando os valores distintos são no máximo esta fração das linhas
+LIMITE_CATEGORIA = 0.5
+INTEIROS_COMPACTOS = ['Int8', 'Int16', 'Int32']
+
+
+def _memoria_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def _para_percentual(serie):
+    """float32 a partir de números ou de textos com vírgula decimal; None se algum valor não for número."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype('float32')
+    texto = serie.astype(str).str.strip().str.replace('%', '', regex=False).str.replace(',', '.', regex=False)
+    numeros = pd.to_numeric(texto.where(serie.notna()), errors='coerce')
+    if (numeros.isna() & serie.notna()).any():
+        return None
+    return numeros.astype('float32')
+
+
+def _para_inteiro_compacto(serie):
+    valores = serie.dropna()
+    if valores.empty or not (valores % 1 == 0).all():
+        return None
+    for tipo in INTEIROS_COMPACTOS:
+        info = np.iinfo(tipo.lower())
+        if valores.min() >= info.min and valores.max() <= info.max:
+            return serie.astype(tipo)
+    return None
+
+
+def _para_categoria(serie):
+    texto = serie.where(serie.isna(), serie.astype(str).str.strip())
+    texto = texto.mask(texto == '')
+    if texto.nunique() > LIMITE_CATEGORIA * max(len(texto), 1):
+        return None
+    return texto.astype('category')
+
+
+def aplicar_plano_tipos(df, colunas_chave=()):
+    """
+    Converte, no próprio DataFrame, as colunas conforme o plano acima (as de
+    `colunas_chave` não são tocadas). Retorna o DataFrame e imprime a memória
+    antes/depois e quantas colunas foram para cada tipo.
+    """
+    antes = _memoria_mb(df)
+    datas = colunas_de_data(df.columns)
+    converter_datas(df, datas)
+
+    contagem = {'datetime64': len(datas), 'float32': 0, 'inteiro': 0, 'category': 0}
+    for col in df.columns:
+        if col in datas or col in colunas_chave:
+            continue
+        serie = df[col]
+        if col.startswith('%'):
+            convertida, tipo = _para_percentual(serie), 'float32'
+            if convertida is None:
+                print(f"  AVISO: '{col}' tem valores não numéricos; mantida como texto.")
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            convertida, tipo = _para_inteiro_compacto(serie), 'inteiro'
+        elif serie.dtype == object:
+            convertida, tipo = _para_categoria(serie), 'category'
+        else:
+            continue
+        if convertida is not None:
+            df[col] = convertida
+            contagem[tipo] += 1
+
+    depois = _memoria_mb(df)
+    print(f"  Plano de tipos: {contagem['datetime64']} datas, {contagem['float32']} percentuais (float32), "
+          f"{contagem['inteiro']} inteiros compactos, {contagem['category']} categorias.")
+    print(f"  Memória da base: {antes:.1f} MB -> {depois:.1f} MB")
+    return df
+
+
+def compactar_chaves(df, colunas):
+    """Chaves já limpas (texto) viram category: dimensões e merges passam a comparar códigos."""
+    for col in colunas:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def preencher_vazios(serie, valor):
+    """fillna que também funciona em colunas category (o valor entra como nova categoria)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype) and valor not in serie.cat.categories:
+        serie = serie.cat.add_categories([valor])
+    return serie.fillna(valor)
+
+
+def float32_para_float64(serie):
+    """float64 com o valor decimal que o float32 representa (2.67 e não 2.6700000762939453), para a saída."""
+    codigos, unicos = pd.factorize(serie)
+    valores = pd.to_numeric(pd.Index(unicos).astype(str)).to_numpy(dtype='float64')
+    return pd.Series(np.append(valores, np.nan)[codigos], index=serie.index, name=serie.name)
@@ -0,0 +1,141 @@
+import sqlite3
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# =======================================================================
+# REGISTRO PERSISTENTE DE CHAVES SUPLEMENTARES (IDs DAS DIMENSÕES)
+# =======================================================================
+# Cada dimensão tem um índice chave natural -> ID gravado em disco (SQLite) e
+# carregado num dicionário em memória na primeira consulta. Um ID, uma vez
+# atribuído, nunca muda: incluir ou remover linhas da origem não desloca os
+# demais IDs, e artefatos derivados (ex.: TempoDeCasa_Calculado.csv) continuam
+# válidos entre execuções e entre scripts.
+#
+# O banco guarda também um identificador próprio, criado junto com ele: quem
+# guarda IDs fora do registro (ex.: o estado do modelo incremental) confere
+# pela assinatura() se ainda fala com o mesmo registro, e não com um banco
+# apagado e recriado que voltaria a numerar os IDs a partir de 1.
+
+SEPARADOR_CHAVE = '\x1f'
+
+
+def montar_chave(valores):
+    """Converte uma Series (ou as colunas de um DataFrame) na chave natural em texto; nulos viram NA."""
+    if isinstance(valores, pd.DataFrame):
+        nulos = valores.isna().any(axis=1)
+        chave = valores.iloc[:, 0].astype(str)
+        for col in valores.columns[1:]:
+            chave = chave + SEPARADOR_CHAVE + valores[col].astype(str)
+    else:
+        nulos = valores.isna()
+        chave = valores.astype(str)
+    return chave.mask(nulos)
+
+
+def fatorar(valores):
+    """
+    Códigos da chave natural (Series ou colunas de um DataFrame) numa passada:
+    um código por linha (-1 quando alguma parte da chave é nula), na ordem de
+    primeira aparição, e a posição da primeira linha de cada código.
+    """
+    colunas = [valores[col] for col in valores.columns] if isinstance(valores, pd.DataFrame) else [valores]
+    codigos = np.zeros(len(valores), dtype='int64')
+    nulos = np.zeros(len(valores), dtype=bool)
+    for coluna in colunas:
+        # Chave composta: combina os códigos coluna a coluna e recodifica (os códigos não crescem)
+        codigos_coluna, unicos = pd.factorize(coluna)
+        nulos |= codigos_coluna < 0
+        codigos, _ = pd.factorize(codigos * (len(unicos) + 1) + codigos_coluna + 1)
+    codigos[nulos] = -1
+    validos = ~nulos
+    codigos[validos], _ = pd.factorize(codigos[validos])
+    _, posicoes = np.unique(codigos[validos], return_index=True)
+    return codigos, np.flatnonzero(validos)[posicoes]
+
+
+class RegistroChaves:
+    """Índice persistente chave natural -> ID por dimensão, com alocação O(1) de novos IDs."""
+
+    def __init__(self, caminho_banco):
+        self.caminho_banco = caminho_banco
+        self.conexao = sqlite3.connect(caminho_banco)
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS chaves ("
+            "dimensao TEXT NOT NULL, chave TEXT NOT NULL, id INTEGER NOT NULL, "
+            "PRIMARY KEY (dimensao, chave))"
+        )
+        self.conexao.execute("CREATE TABLE IF NOT EXISTS meta (nome TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        self.conexao.execute("INSERT OR IGNORE INTO meta (nome, valor) VALUES ('identificador', ?)", (uuid.uuid4().hex,))
+        self.conexao.commit()
+        self._mapas = {}
+        self._proximos = {}
+        self._pendentes = {}
+
+    def _mapa(self, dimensao):
+        if dimensao not in self._mapas:
+            linhas = self.conexao.execute("SELECT chave, id FROM chaves WHERE dimensao = ?", (dimensao,))
+            self._mapas[dimensao] = dict(linhas)
+            self._proximos[dimensao] = max(self._mapas[dimensao].values(), default=0) + 1
+            self._pendentes[dimensao] = []
+        return self._mapas[dimensao]
+
+    def obter_id(self, dimensao, chave):
+        return self._mapa(dimensao).get(chave)
+
+    def alocar(self, dimensao, chave):
+        """Retorna o ID da chave, alocando o próximo ID livre se ela ainda não existir."""
+        mapa = self._mapa(dimensao)
+        id_existente = mapa.get(chave)
+        if id_existente is not None:
+            return id_existente
+        novo_id = self._proximos[dimensao]
+        self._proximos[dimensao] += 1
+        mapa[chave] = novo_id
+        self._pendentes[dimensao].append((dimensao, chave, novo_id))
+        return novo_id
+
+    def atribuir(self, dimensao, valores):
+        """
+        Atribui IDs em lote a uma Series/DataFrame de chaves naturais: cada chave
+        distinta é consultada (ou alocada) uma única vez e o resultado é expandido
+        de volta às linhas. Chaves nulas recebem NA.
+        """
+        return self.atribuir_com_posicoes(dimensao, valores)[0]
+
+    def atribuir_com_posicoes(self, dimensao, valores):
+        """
+        Como atribuir(), retornando também a posição da primeira linha de cada
+        chave distinta (as linhas da dimensão, sem drop_duplicates). Só as chaves
+        distintas são convertidas em texto para o registro.
+        """
+        codigos, posicoes = fatorar(valores)
+        unicos = montar_chave(valores.iloc[posicoes])
+        ids_unicos = np.fromiter((self.alocar(dimensao, c) for c in unicos), dtype='int64', count=len(unicos))
+        # Chaves nulas ficam NA (inclusive quando todas são nulas e não há nenhum ID)
+        ids = pd.Series(pd.NA, index=valores.index, dtype='Int64', name=f'{dimensao}_ID')
+        validos = codigos >= 0
+        ids[validos] = ids_unicos[codigos[validos]]
+        return ids, posicoes
+
+    def novos(self):
+        return sum(len(p) for p in self._pendentes.values())
+
+    def salvar(self):
+        registros = [r for pendentes in self._pendentes.values() for r in pendentes]
+        if registros:
+            self.conexao.executemany("INSERT INTO chaves (dimensao, chave, id) VALUES (?, ?, ?)", registros)
+            self.conexao.commit()
+        for pendentes in self._pendentes.values():
+            pendentes.clear()
+        return len(registros)
+
+    def assinatura(self):
+        """Identificador do banco e maior ID gravado por dimensão (só cresce enquanto o registro for o mesmo)."""
+        identificador = self.conexao.execute("SELECT valor FROM meta WHERE nome = 'identificador'").fetchone()[0]
+        maximos = dict(self.conexao.execute("SELECT dimensao, MAX(id) FROM chaves GROUP BY dimensao"))
+        return {'identificador': identificador, 'maximos': maximos}
+
+    def fechar(self):
+        self.conexao.close()
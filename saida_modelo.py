@@ -0,0 +1,202 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from intermediario import tipar_para_colunar
+from plano_tipos import float32_para_float64
+
+# =======================================================================
+# GRAVAÇÃO DO MODELO (EXCEL, PARQUET OU CSV)
+# =======================================================================
+# As tabelas do modelo (nome da aba -> DataFrame) são gravadas por um dos
+# formatos abaixo; vários podem ser pedidos na mesma execução e o tempo e o
+# tamanho de cada um são reportados no final.
+#   - 'xlsx': uma pasta de trabalho com uma aba por tabela, escrita linha a
+#     linha pelo xlsxwriter em modo constant_memory (a memória não cresce com
+#     o número de linhas). O xlsxwriter não é thread-safe: abas em sequência.
+#   - 'parquet' / 'csv': uma pasta '<modelo>_<formato>' com um arquivo por
+#     tabela, que o Power BI carrega direto (Pasta/Parquet). Os arquivos são
+#     gravados em paralelo.
+#
+# Cada gravação registra num manifesto ('<modelo>_saidas.json') os formatos
+# gravados e o tamanho/mtime de cada arquivo. Os leitores (ler_tabela_modelo)
+# usam a cópia Parquet/CSV enquanto ela for a da última gravação, qualquer
+# que seja a ordem em que os formatos foram escritos; sem manifesto, vale a
+# cópia que não for mais antiga que a pasta de trabalho Excel.
+
+FORMATOS_SAIDA = ('xlsx', 'parquet', 'csv')
+FORMATO_DATA_EXCEL = 'dd/mm/yyyy'
+MAX_THREADS_ESCRITA = 4
+
+
+def pasta_tabelas(caminho_modelo, formato):
+    return f"{os.path.splitext(caminho_modelo)[0]}_{formato}"
+
+
+def caminho_manifesto_saidas(caminho_modelo):
+    return f"{os.path.splitext(caminho_modelo)[0]}_saidas.json"
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return {'tamanho': estado.st_size, 'mtime': estado.st_mtime}
+
+
+def _gravar_manifesto(relatorio, tabelas, caminho_modelo):
+    formatos = {}
+    for item in relatorio:
+        if item['formato'] == 'xlsx':
+            formatos['xlsx'] = _assinatura(item['caminho'])
+        else:
+            formatos[item['formato']] = {
+                nome: _assinatura(os.path.join(item['caminho'], f"{nome}.{item['formato']}")) for nome in tabelas
+            }
+    with open(caminho_manifesto_saidas(caminho_modelo), 'w', encoding='utf-8') as arquivo:
+        json.dump({'gravado_em': time.time(), 'formatos': formatos}, arquivo, ensure_ascii=False, indent=2)
+
+
+def _tamanho_mb(caminho):
+    if os.path.isdir(caminho):
+        total = sum(os.path.getsize(os.path.join(caminho, f)) for f in os.listdir(caminho))
+    else:
+        total = os.path.getsize(caminho)
+    return total / 2**20
+
+
+def _preparar_saida(df):
+    # Percentuais em float32 (plano de tipos) saem com o valor decimal, sem resíduo binário
+    colunas_float32 = [col for col in df.columns if df[col].dtype == 'float32']
+    if not colunas_float32:
+        return df
+    df = df.copy()
+    for col in colunas_float32:
+        df[col] = float32_para_float64(df[col])
+    return df
+
+
+def _escrever_aba(livro, nome, df):
+    aba = livro.add_worksheet(nome)
+    aba.write_row(0, 0, [str(col) for col in df.columns])
+    # Vazios (NaN/NaT/NA) viram células em branco; as colunas são convertidas de uma vez e
+    # as linhas saem em ordem, como o modo constant_memory exige
+    colunas = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in df.columns]
+    for i, linha in enumerate(zip(*colunas), start=1):
+        aba.write_row(i, 0, linha)
+
+
+def _salvar_xlsx(tabelas, caminho_modelo):
+    import xlsxwriter
+    livro = xlsxwriter.Workbook(caminho_modelo, {
+        'constant_memory': True, 'default_date_format': FORMATO_DATA_EXCEL, 'strings_to_urls': False,
+    })
+    try:
+        for nome, df in tabelas.items():
+            _escrever_aba(livro, nome, _preparar_saida(df))
+    finally:
+        livro.close()
+    return caminho_modelo
+
+
+def _salvar_pasta(tabelas, caminho_modelo, formato, max_threads):
+    pasta = pasta_tabelas(caminho_modelo, formato)
+    os.makedirs(pasta, exist_ok=True)
+
+    def gravar(item):
+        nome, df = item
+        df = _preparar_saida(df)
+        destino = os.path.join(pasta, f"{nome}.{formato}")
+        if formato == 'parquet':
+            tipar_para_colunar(df).to_parquet(destino, index=False)
+        else:
+            df.to_csv(destino, index=False, encoding='utf-8')
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_threads, len(tabelas)))) as executor:
+        list(executor.map(gravar, tabelas.items()))
+    return pasta
+
+
+def salvar_tabelas(tabelas, caminho_modelo, formatos=('xlsx',), max_threads=MAX_THREADS_ESCRITA):
+    """
+    Grava {aba: DataFrame} em cada formato pedido e retorna uma lista com
+    formato, caminho, segundos e tamanho (MB) de cada saída gravada.
+    """
+    relatorio = []
+    for formato in formatos:
+        if formato not in FORMATOS_SAIDA:
+            print(f"  AVISO: formato de saída '{formato}' desconhecido (use {', '.join(FORMATOS_SAIDA)}). Ignorado.")
+            continue
+        inicio = time.perf_counter()
+        try:
+            if formato == 'xlsx':
+                caminho = _salvar_xlsx(tabelas, caminho_modelo)
+            else:
+                caminho = _salvar_pasta(tabelas, caminho_modelo, formato, max_threads)
+        except ImportError as e:
+            print(f"  AVISO: formato de saída '{formato}' indisponível ({e}).")
+            continue
+        relatorio.append({
+            'formato': formato, 'caminho': caminho,
+            'segundos': round(time.perf_counter() - inicio, 2), 'tamanho_mb': round(_tamanho_mb(caminho), 2),
+        })
+
+    if relatorio:
+        _gravar_manifesto(relatorio, tabelas, caminho_modelo)
+        print(f"\nSaídas do modelo ({len(tabelas)} tabelas, {sum(len(df) for df in tabelas.values())} linhas):")
+        for item in relatorio:
+            print(f"  - {item['formato']:<8} {item['segundos']:8.2f}s {item['tamanho_mb']:9.2f} MB  {item['caminho']}")
+    return relatorio
+
+
+def fontes_tabela_modelo(caminho_modelo, tabela):
+    """
+    Lista (formato, caminho) de onde a tabela pode ser lida, na ordem de
+    preferência: cópias Parquet/CSV da última gravação do modelo e, por fim,
+    a pasta de trabalho Excel.
+    """
+    destinos = {formato: os.path.join(pasta_tabelas(caminho_modelo, formato), f"{tabela}.{formato}")
+                for formato in ('parquet', 'csv')}
+    existe_xlsx = os.path.exists(caminho_modelo)
+    try:
+        with open(caminho_manifesto_saidas(caminho_modelo), encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        manifesto = None
+
+    if manifesto is not None:
+        formatos = manifesto.get('formatos', {})
+        # Pasta de trabalho regravada fora de salvar_tabelas depois do manifesto: vale a regra por data
+        xlsx_alterado = existe_xlsx and formatos.get('xlsx') != _assinatura(caminho_modelo) and \
+            os.path.getmtime(caminho_modelo) > manifesto.get('gravado_em', 0)
+        if not xlsx_alterado:
+            fontes = [
+                (formato, destino) for formato, destino in destinos.items()
+                if os.path.exists(destino) and formatos.get(formato, {}).get(tabela) == _assinatura(destino)
+            ]
+            return fontes + ([('xlsx', caminho_modelo)] if existe_xlsx else [])
+
+    data_xlsx = os.path.getmtime(caminho_modelo) if existe_xlsx else 0
+    fontes = [
+        (formato, destino) for formato, destino in destinos.items()
+        if os.path.exists(destino) and os.path.getmtime(destino) >= data_xlsx
+    ]
+    return fontes + ([('xlsx', caminho_modelo)] if existe_xlsx else [])
+
+
+def ler_tabela_modelo(caminho_modelo, tabela, colunas=None):
+    """
+    Lê uma tabela do modelo priorizando a pasta Parquet/CSV da última gravação
+    (ver fontes_tabela_modelo); sem ela, lê a aba do .xlsx.
+    """
+    for formato, destino in fontes_tabela_modelo(caminho_modelo, tabela):
+        if formato == 'parquet':
+            try:
+                return pd.read_parquet(destino, columns=colunas)
+            except ImportError as e:
+                print(f"  AVISO: não foi possível ler '{os.path.basename(destino)}' ({e}).")
+                continue
+        if formato == 'csv':
+            return pd.read_csv(destino, usecols=colunas)
+    return pd.read_excel(caminho_modelo, sheet_name=tabela, usecols=colunas)
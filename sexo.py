@@ -1,16 +1,22 @@
 import pandas as pd
-from gender_guesser_br import Genero # Importa a biblioteca brasileira
-import re
+from inferencia_sexo import abrir_indice_sexo, consultar_ibge
+from instrumentacao import iniciar_execucao, etapa
 
 # --- CONFIGURAÇÃO ---
 nome_arquivo_excel = 'Nomes_e_Sexo_Inferido.xlsx'
 coluna_nome = 'Nome'
 coluna_sexo = 'Sexo'
+arquivo_indice_sexo = 'indice_sexo.sqlite'
+pasta_log_execucao = 'logs_execucao'  # tempo/memória por etapa
+perfilar_etapa = None                 # ex.: 'inferencia_sexo' para gerar um perfil cProfile
 # --------------------
 
+iniciar_execucao('sexo', pasta_log_execucao, perfilar_etapa)
+
 # 1. Carregar o arquivo Excel
 try:
-    df = pd.read_excel(nome_arquivo_excel)
+    with etapa('leitura') as e:
+        df = e.saida(pd.read_excel(nome_arquivo_excel))
 except FileNotFoundError:
     print(f"Erro: O arquivo '{nome_arquivo_excel}' não foi encontrado.")
     exit()
@@ -25,53 +31,20 @@ if df_a_tratar.empty:
 
 total_inicial_problemas = len(df_a_tratar)
 print(f"Iniciando tentativa final com gender-guesser-br para {total_inicial_problemas} nomes.")
-print("ATENÇÃO: Este processo pode ser lento ou travar devido à dependência da API do IBGE.")
-
-# 3. Funções de Limpeza de Nome (Reutilizadas da última melhoria)
-def extrair_primeiro_nome(nome_completo):
-    """Extrai e limpa o primeiro nome da string completa."""
-    if pd.isna(nome_completo):
-        return None
-    nome = str(nome_completo).strip()
-    # Limpeza agressiva: remove tudo que não for letra ou espaço
-    nome_limpo_completo = re.sub(r'[^a-zA-Z\s]', ' ', nome) 
-    palavras = [p for p in nome_limpo_completo.split() if p]
-    if not palavras:
-        return None
-    return palavras[0].capitalize()
-
-# 4. Função de Inferência com 'gender-guesser-br'
-def inferir_sexo_br(primeiro_nome):
-    """Inferir o sexo usando a biblioteca gender-guesser-br (IBGE)."""
-    if not primeiro_nome:
-        return None 
-    
-    # O pacote brasileiro requer instanciar a classe
-    try:
-        # A API do IBGE pode falhar ou demorar. O try/except é crucial aqui.
-        resultado = Genero(primeiro_nome)() 
-        
-        # Traduz os resultados: 'masculino', 'feminino' ou 'Não Encontrado'
-        if resultado == 'masculino':
-            return 'Masculino'
-        elif resultado == 'feminino':
-            return 'Feminino'
-        else: # 'Não Encontrado'
-            return None # Retorna None para indicar que não houve sucesso
-            
-    except Exception as e:
-        # Captura erros de API, timeout, etc.
-        # print(f"Erro ao consultar nome {primeiro_nome}: {e}") # Descomente para debug
-        return None 
-
-# 5. Aplicação e Atualização
-# Cria a coluna com o primeiro nome limpo SÓ nos nomes a serem tratados
-df_a_tratar['Primeiro_Nome'] = df_a_tratar[coluna_nome].apply(extrair_primeiro_nome)
+print("Nomes já conhecidos são resolvidos pelo índice local; apenas primeiros nomes novos consultam a API do IBGE.")
 
-# Aplica a função de inferência (a parte lenta/instável)
-novos_sexos = df_a_tratar['Primeiro_Nome'].apply(inferir_sexo_br)
+# 3. Aplicação e Atualização
+# O índice é alimentado com os nomes já classificados da própria planilha e
+# consultado uma vez por primeiro nome distinto (IBGE só para os ausentes)
+with etapa('inferencia_sexo', df_a_tratar) as e:
+    indice_sexo = abrir_indice_sexo(arquivo_indice_sexo, df[~condicao_tratar])
+    # Respostas remotas (inclusive 'Não Encontrado' e falhas) ficam em cache com validade própria
+    novos_sexos = indice_sexo.inferir_serie(df_a_tratar[coluna_nome], consulta_remota=consultar_ibge)
+    indice_sexo.imprimir_estatisticas()
+    indice_sexo.fechar()
+    e.saida(novos_sexos.dropna())
 
-# 6. ATUALIZAÇÃO DO DATAFRAME ORIGINAL
+# 4. ATUALIZAÇÃO DO DATAFRAME ORIGINAL
 # Filtrar apenas os resultados que não são None (ou seja, onde houve sucesso na API)
 sucesso_br = novos_sexos.dropna()
 
@@ -79,11 +52,12 @@ sucesso_br = novos_sexos.dropna()
 # usando o índice da série 'sucesso_br' para garantir que SÓ os sucessos sejam atualizados.
 df.loc[sucesso_br.index, coluna_sexo] = sucesso_br
 
-# 7. Salvar o arquivo atualizado
-df.to_excel(nome_arquivo_excel, index=False)
+# 5. Salvar o arquivo atualizado
+with etapa('escrita_excel', df):
+    df.to_excel(nome_arquivo_excel, index=False)
 print("\nArquivo atualizado com a tentativa final de tratamento (gender-guesser-br) salvo.")
 
-# 8. Imprimir os novos totais
+# 6. Imprimir os novos totais
 novos_totais = df[coluna_sexo].value_counts()
 print("\n--- Totais Finais por Categoria de Sexo ---")
 print(novos_totais)
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from cache_ingestao import ler_excel_com_cache, motor_excel_disponivel
+
+
+def _excel(tmp_path):
+    caminho = str(tmp_path / 'export.xlsx')
+    pd.DataFrame({'Nome': ['ANA', 'JOAO'], 'Cadastro': [1, 2], 'Outra': ['x', 'y']}).to_excel(caminho, index=False)
+    return caminho
+
+
+def test_cache_corrompido_relê_o_excel(tmp_path, capsys):
+    caminho = _excel(tmp_path)
+    pasta_cache = str(tmp_path / 'cache')
+    ler_excel_com_cache(caminho, ['Nome', 'Cadastro'], pasta_cache)
+    (caminho_dados,) = [os.path.join(pasta_cache, f) for f in os.listdir(pasta_cache) if f.endswith('.pkl')]
+    with open(caminho_dados, 'wb') as arquivo:
+        arquivo.write(b'\x80\x05truncado')
+
+    df = ler_excel_com_cache(caminho, ['Nome', 'Cadastro'], pasta_cache)
+    assert df['Nome'].tolist() == ['ANA', 'JOAO']
+    assert 'ilegível' in capsys.readouterr().out
+    # O cache foi regravado e volta a ser usado
+    pd.testing.assert_frame_equal(pd.read_pickle(caminho_dados), df)
+    assert not [f for f in os.listdir(pasta_cache) if f.endswith('.parcial')]
+
+
+def test_aviso_do_motor_uma_vez_por_processo(monkeypatch, capsys):
+    import builtins
+    importar = builtins.__import__
+
+    def sem_calamine(nome, *args, **kwargs):
+        if nome == 'python_calamine':
+            raise ImportError(nome)
+        return importar(nome, *args, **kwargs)
+
+    motor_excel_disponivel.cache_clear()
+    monkeypatch.setattr(builtins, '__import__', sem_calamine)
+    try:
+        assert motor_excel_disponivel('calamine') is None
+        assert motor_excel_disponivel('calamine') is None
+        assert capsys.readouterr().out.count('indisponível') == 1
+    finally:
+        motor_excel_disponivel.cache_clear()
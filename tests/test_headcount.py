@@ -0,0 +1,33 @@
+import pandas as pd
+
+from headcount import fato_headcount_mensal
+
+
+def _fato():
+    return pd.DataFrame({
+        'Filial_ID': [1, 1, 1],
+        'Admissão': pd.to_datetime(['2024-01-10', '2024-02-05', '2024-01-15']),
+        'Data Afastamento': pd.to_datetime(['2024-03-20', '2024-04-10', None]),
+        'Data de Reintegração': pd.to_datetime(['2024-05-02', None, None]),
+        'Situação': [1, 7, 1],
+    })
+
+
+def test_reintegracao_fora_do_turnover():
+    resultado = fato_headcount_mensal(_fato(), ['Filial_ID'], data_ref='2024-06-30', meses=None)
+    por_mes = resultado.set_index(resultado['Mês'].dt.strftime('%Y-%m'))
+
+    assert por_mes['Admissões'].to_dict() == {'2024-01': 2, '2024-02': 1, '2024-03': 0, '2024-04': 0, '2024-05': 0, '2024-06': 0}
+    assert por_mes['Desligamentos'].sum() == 1
+    assert por_mes.loc['2024-04', 'Desligamentos'] == 1
+    assert por_mes.loc['2024-03', 'Afastamentos Revertidos'] == 1
+    assert por_mes.loc['2024-05', 'Reintegrações'] == 1
+    assert por_mes.loc['2024-03', 'Taxa Turnover'] == 0
+    assert por_mes['Headcount Fim'].tolist() == [2, 3, 2, 1, 2, 2]
+
+
+def test_headcount_fecha_com_os_movimentos():
+    resultado = fato_headcount_mensal(_fato(), ['Filial_ID'], data_ref='2024-06-30', meses=None)
+    esperado = (resultado['Headcount Início'] + resultado['Admissões'] + resultado['Reintegrações']
+                - resultado['Desligamentos'] - resultado['Afastamentos Revertidos'])
+    assert (resultado['Headcount Fim'] == esperado).all()
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import agrupar
+from inferencia_sexo import IndiceSexo, STATUS_FALHA, STATUS_NEGATIVO, STATUS_POSITIVO
+
+
+class ConsultaFalsa:
+    """Fonte remota local: responde por primeiro nome, com atraso/falhas configuráveis e contagem de chamadas."""
+
+    def __init__(self, respostas=None, atraso=0.0, falhas_por_nome=None, erro=ConnectionError):
+        self.respostas = respostas or {}
+        self.atraso = atraso
+        self.falhas_por_nome = dict(falhas_por_nome or {})
+        self.erro = erro
+        self.chamadas = []
+        self.instantes = {}
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self._trava = threading.Lock()
+
+    def __call__(self, nome):
+        with self._trava:
+            self.chamadas.append(nome)
+            self.instantes.setdefault(nome, []).append(time.monotonic())
+            self.simultaneas += 1
+            self.max_simultaneas = max(self.max_simultaneas, self.simultaneas)
+            falhar = self.falhas_por_nome.get(nome, 0) > 0
+            if falhar:
+                self.falhas_por_nome[nome] -= 1
+        try:
+            time.sleep(self.atraso)
+            if falhar:
+                raise self.erro(f"falha simulada para {nome}")
+            return self.respostas.get(nome)
+        finally:
+            with self._trava:
+                self.simultaneas -= 1
+
+
+@pytest.fixture
+def indice(tmp_path):
+    indice = IndiceSexo(str(tmp_path / 'indice_sexo.sqlite'))
+    yield indice
+    indice.fechar()
+
+
+def test_limite_de_concorrencia(indice):
+    consulta = ConsultaFalsa(atraso=0.05)
+    chaves = [f'NOME{i}' for i in range(20)]
+    respostas = indice._consultar_remoto(chaves, consulta, max_concorrencia=4, timeout=5, tentativas=1)
+    assert len(respostas) == 20
+    assert len(consulta.chamadas) == 20
+    assert consulta.max_simultaneas <= 4
+
+
+def test_chamadas_com_timeout_continuam_ocupando_vaga(indice):
+    # As chamadas demoram mais que o timeout: mesmo abandonadas, as threads presas contam no limite
+    consulta = ConsultaFalsa(atraso=0.3)
+    chaves = [f'NOME{i}' for i in range(8)]
+    respostas = indice._consultar_remoto(chaves, consulta, max_concorrencia=4, timeout=0.05, tentativas=2,
+                                         espera_base=0.01)
+    assert all(status == STATUS_FALHA for status, _ in respostas.values())
+    assert consulta.max_simultaneas <= 4
+    assert indice.estatisticas['remoto_timeout'] == 8
+
+
+def test_timeout_por_chamada(indice):
+    consulta = ConsultaFalsa(respostas={'Ana': 'Feminino', 'Lenta': 'Masculino'}, atraso=0.0)
+    lenta = ConsultaFalsa(respostas={'Lenta': 'Masculino'}, atraso=1.0)
+
+    def roteada(nome):
+        return lenta(nome) if nome == 'Lenta' else consulta(nome)
+
+    inicio = time.monotonic()
+    respostas = indice._consultar_remoto(['ANA', 'LENTA'], roteada, max_concorrencia=2, timeout=0.1, tentativas=1)
+    assert time.monotonic() - inicio < 0.8
+    assert respostas['ANA'] == (STATUS_POSITIVO, 'Feminino')
+    assert respostas['LENTA'] == (STATUS_FALHA, None)
+    assert indice.estatisticas['remoto_timeout'] == 1
+
+
+def test_retentativas_com_backoff(indice):
+    consulta = ConsultaFalsa(respostas={'Maria': 'feminino'}, falhas_por_nome={'Maria': 2})
+    respostas = indice._consultar_remoto(['MARIA'], consulta, max_concorrencia=2, timeout=1, tentativas=3,
+                                         espera_base=0.1)
+    assert respostas['MARIA'] == (STATUS_POSITIVO, 'Feminino')
+    assert consulta.chamadas == ['Maria'] * 3
+    assert indice.estatisticas['retentativas'] == 2
+    primeira, segunda, terceira = consulta.instantes['Maria']
+    assert segunda - primeira >= 0.1
+    assert terceira - segunda >= 0.2
+
+
+def test_tentativas_esgotadas_viram_falha(indice):
+    consulta = ConsultaFalsa(falhas_por_nome={'Jose': 5})
+    respostas = indice._consultar_remoto(['JOSE'], consulta, max_concorrencia=1, timeout=1, tentativas=2,
+                                         espera_base=0.01)
+    assert respostas['JOSE'] == (STATUS_FALHA, None)
+    assert len(consulta.chamadas) == 2
+    assert indice.estatisticas['remoto_falha'] == 1
+
+
+def test_preencher_sexo_atualiza_so_as_linhas_inferidas(tmp_path):
+    consulta = ConsultaFalsa(respostas={'Ana': 'Feminino', 'Joao': 'Masculino'})
+    df = pd.DataFrame({'Nome': ['ANA SILVA', 'JOAO SOUZA', 'ANA COSTA', 'PEDRO LIMA', 'XPTO QWE']},
+                      index=[10, 20, 30, 40, 50])
+    df_sexo = pd.DataFrame({'Nome': ['PEDRO LIMA'], 'Sexo': ['Masculino']})
+
+    resultado = agrupar.preencher_sexo(df, df_sexo, caminho_indice=str(tmp_path / 'indice.sqlite'),
+                                       consulta_remota=consulta)
+
+    assert resultado['Sexo'].tolist()[:4] == ['Feminino', 'Masculino', 'Feminino', 'Masculino']
+    assert pd.isna(resultado['Sexo'].iloc[4])
+    # PEDRO vem da planilha manual e semeia o índice; só os primeiros nomes novos vão à fonte remota, uma vez cada
+    assert sorted(consulta.chamadas) == ['Ana', 'Joao', 'Xpto']
+    # Resposta negativa fica no cache persistente: a segunda execução não consulta de novo
+    consulta.chamadas.clear()
+    agrupar.preencher_sexo(df, df_sexo, caminho_indice=str(tmp_path / 'indice.sqlite'), consulta_remota=consulta)
+    assert consulta.chamadas == []
+
+
+def test_respostas_negativas(indice):
+    consulta = ConsultaFalsa()
+    respostas = indice._consultar_remoto(['KWZ'], consulta, max_concorrencia=1, timeout=1, tentativas=3)
+    assert respostas['KWZ'] == (STATUS_NEGATIVO, None)
+    assert len(consulta.chamadas) == 1
+
+
+def test_todas_as_chamadas_travadas(indice):
+    # Fonte que nunca responde: o disjuntor abre quando todas as vagas ficam presas e o resto vira falha
+    liberar = threading.Event()
+    chamadas = []
+
+    def trava(nome):
+        chamadas.append(nome)
+        liberar.wait()
+
+    try:
+        inicio = time.monotonic()
+        respostas = indice._consultar_remoto(['ANA', 'JOSE', 'MARIA', 'PAULO', 'LUCAS'], trava,
+                                             max_concorrencia=2, timeout=0.2, tentativas=1)
+        assert time.monotonic() - inicio < 2
+    finally:
+        liberar.set()
+    assert respostas == {chave: (STATUS_FALHA, None) for chave in ['ANA', 'JOSE', 'MARIA', 'PAULO', 'LUCAS']}
+    assert len(chamadas) == 2
+    assert indice.estatisticas['remoto_timeout'] == 5
+
+
+def test_prazo_total(indice):
+    consulta = ConsultaFalsa(respostas={'Nome0': 'Feminino'}, atraso=0.1)
+    chaves = [f'NOME{i}' for i in range(40)]
+    inicio = time.monotonic()
+    respostas = indice._consultar_remoto(chaves, consulta, max_concorrencia=2, timeout=1, tentativas=1,
+                                         prazo_total=0.35)
+    assert time.monotonic() - inicio < 1
+    assert respostas['NOME0'] == (STATUS_POSITIVO, 'Feminino')
+    assert sum(status == STATUS_FALHA for status, _ in respostas.values()) >= 30
+    assert len(consulta.chamadas) < 40
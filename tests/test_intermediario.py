@@ -0,0 +1,72 @@
+import os
+import time
+
+import pandas as pd
+
+from intermediario import caminho_colunar, ler_intermediario, salvar_intermediario, GravadorIntermediario
+
+
+def _base():
+    return pd.DataFrame({
+        'Nome': ['ANA', 'JOAO'],
+        'Admissão': ['01/02/2020', '15/03/2021'],
+        'Cadastro': [1.0, 2.0],
+    })
+
+
+def test_copia_colunar_lida_com_csv_gravado_na_mesma_execucao(tmp_path):
+    caminho_csv = str(tmp_path / 'base.csv')
+    salvar_intermediario(_base(), caminho_csv, formato='parquet', manter_csv=True)
+    assert os.path.exists(caminho_colunar(caminho_csv, 'parquet') + '.json')
+
+    df = ler_intermediario(caminho_csv, colunas=['Nome', 'Admissão'], formato='parquet')
+    assert list(df.columns) == ['Nome', 'Admissão']
+    assert pd.api.types.is_datetime64_any_dtype(df['Admissão'])
+
+
+def test_csv_alterado_depois_invalida_copia_colunar(tmp_path):
+    caminho_csv = str(tmp_path / 'base.csv')
+    salvar_intermediario(_base(), caminho_csv, formato='parquet', manter_csv=True)
+    _base().iloc[:1].to_csv(caminho_csv, index=False)
+    agora = time.time()
+    os.utime(caminho_csv, (agora - 60, agora - 60))
+
+    df = ler_intermediario(caminho_csv, formato='parquet')
+    assert len(df) == 1
+
+
+def test_gravador_em_lotes_registra_o_par(tmp_path):
+    caminho_csv = str(tmp_path / 'base.csv')
+    gravador = GravadorIntermediario(caminho_csv, formato='parquet', manter_csv=True)
+    gravador.acrescentar(_base())
+    gravador.fechar()
+
+    df = ler_intermediario(caminho_csv, colunas=['Admissão'], formato='parquet')
+    assert pd.api.types.is_datetime64_any_dtype(df['Admissão'])
+
+
+def test_lotes_com_tipos_diferentes_nao_perdem_valores(tmp_path):
+    # Coluna vazia e cadastro numérico no primeiro lote; texto nos seguintes
+    caminho_csv = str(tmp_path / 'base.csv')
+    gravador = GravadorIntermediario(caminho_csv, formato='parquet', manter_csv=True)
+    gravador.acrescentar(pd.DataFrame({'Cadastro': [1, 2], 'Escala': [float('nan'), float('nan')]}))
+    gravador.acrescentar(pd.DataFrame({'Cadastro': ['3A', 4], 'Escala': ['12x36', 'NOTURNO']}))
+    gravador.acrescentar(pd.DataFrame({'Cadastro': [5, 6], 'Escala': [float('nan'), '6x1']}))
+    gravador.fechar()
+
+    df = ler_intermediario(caminho_csv, formato='parquet')
+    assert df['Cadastro'].tolist() == ['1', '2', '3A', '4', '5', '6']
+    assert df['Escala'].iloc[2:4].tolist() == ['12x36', 'NOTURNO']
+    assert df['Escala'].iloc[:2].isna().all()
+
+
+def test_lotes_numericos_voltam_como_numero(tmp_path):
+    caminho_csv = str(tmp_path / 'base.csv')
+    gravador = GravadorIntermediario(caminho_csv, formato='parquet', manter_csv=True)
+    gravador.acrescentar(pd.DataFrame({'Cadastro': [1, 2], 'Salario': [1500.5, None]}))
+    gravador.acrescentar(pd.DataFrame({'Cadastro': [3, None], 'Salario': [2000.0, 3100.0]}))
+    gravador.fechar()
+
+    df = ler_intermediario(caminho_csv, formato='parquet')
+    csv = pd.read_csv(caminho_csv)
+    pd.testing.assert_frame_equal(df, csv)
@@ -0,0 +1,76 @@
+import pandas as pd
+
+import os
+
+import agrupar
+from modelo_incremental import carregar_estado, salvar_estado, TABELAS_ESTADO, COLUNAS_CONTROLE
+from registro_chaves import RegistroChaves, fatorar
+
+
+def _registro(tmp_path):
+    return RegistroChaves(str(tmp_path / 'registro_chaves.sqlite'))
+
+
+def test_ids_estaveis_entre_execucoes(tmp_path):
+    registro = _registro(tmp_path)
+    primeiros = registro.atribuir('Cargo', pd.Series(['A', 'B', 'A', None]))
+    registro.salvar()
+    registro.fechar()
+
+    registro = _registro(tmp_path)
+    segundos = registro.atribuir('Cargo', pd.Series(['C', 'B', 'A']))
+    registro.fechar()
+    assert primeiros.tolist()[:3] == [1, 2, 1]
+    assert pd.isna(primeiros.iloc[3])
+    assert segundos.tolist() == [3, 2, 1]
+
+
+def test_todas_as_chaves_nulas(tmp_path):
+    registro = _registro(tmp_path)
+    ids = registro.atribuir('CCusto', pd.Series([None, pd.NA], index=[7, 9], dtype=object))
+    ids_compostos, posicoes = registro.atribuir_com_posicoes(
+        'Filial', pd.DataFrame({'Filial': ['X', None], 'Empresa': [None, 'E']})
+    )
+    registro.fechar()
+    assert ids.index.tolist() == [7, 9] and ids.isna().all()
+    assert ids_compostos.isna().all() and len(posicoes) == 0
+
+
+def test_fatorar_chave_composta():
+    codigos, posicoes = fatorar(pd.DataFrame({'a': ['x', 'y', 'x', None, 'y'], 'b': [1, 2, 1, 3, 5]}))
+    assert codigos.tolist() == [0, 1, 0, -1, 2]
+    assert posicoes.tolist() == [0, 1, 4]
+
+
+def test_dimensao_de_delta_com_chave_vazia(tmp_path):
+    # Delta incremental de uma linha com C.Custo em branco: dimensão vazia e FK nula na Fato
+    registro = _registro(tmp_path)
+    df = pd.DataFrame({'C.Custo': pd.Series([None], dtype=object), 'Descrição (C.Custo)': [None]})
+    dim = agrupar.construir_dim_ccusto(df, registro)
+    registro.fechar()
+    assert dim.empty
+    assert df['CCusto_ID'].isna().all()
+
+
+def test_estado_incremental_exige_o_mesmo_registro(tmp_path):
+    pasta_estado = str(tmp_path / 'estado')
+    registro = _registro(tmp_path)
+    registro.atribuir('Pessoa', pd.Series(['A', 'B', 'C']))
+    registro.salvar()
+    tabelas = {nome: pd.DataFrame({'x': [1]}) for nome in TABELAS_ESTADO}
+    tabelas['fato'] = pd.DataFrame({col: [1] for col in COLUNAS_CONTROLE})
+    salvar_estado(pasta_estado, ['x'], tabelas, registro.assinatura())
+
+    # O mesmo registro, ainda que com IDs novos de outro script, continua valendo
+    registro.atribuir('Pessoa', pd.Series(['D']))
+    registro.salvar()
+    assert carregar_estado(pasta_estado, ['x'], registro.assinatura()) is not None
+    registro.fechar()
+
+    # Registro apagado e recriado: os IDs recomeçariam em 1
+    os.remove(tmp_path / 'registro_chaves.sqlite')
+    registro = _registro(tmp_path)
+    registro.atribuir('Pessoa', pd.Series(['Z', 'Y', 'X', 'W', 'V']))
+    registro.salvar()
+    assert carregar_estado(pasta_estado, ['x'], registro.assinatura()) is None
+    registro.fechar()
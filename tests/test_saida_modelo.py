@@ -0,0 +1,28 @@
+import pandas as pd
+
+import saida_modelo
+from saida_modelo import fontes_tabela_modelo, ler_tabela_modelo, salvar_tabelas
+
+
+def _tabelas(valor=1):
+    return {'Fato_Contratos': pd.DataFrame({'Pessoa_ID': [valor, 2], 'Admissão': pd.to_datetime(['2020-01-01', '2021-06-15'])})}
+
+
+def test_copia_parquet_vale_mesmo_gravada_antes_do_xlsx(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'modelo.xlsx')
+    salvar_tabelas(_tabelas(), caminho, formatos=['parquet', 'xlsx'])
+    assert fontes_tabela_modelo(caminho, 'Fato_Contratos')[0][0] == 'parquet'
+
+    def sem_excel(*args, **kwargs):
+        raise AssertionError("não deveria ler o xlsx")
+    monkeypatch.setattr(saida_modelo.pd, 'read_excel', sem_excel)
+    df = ler_tabela_modelo(caminho, 'Fato_Contratos', colunas=['Admissão'])
+    assert pd.api.types.is_datetime64_any_dtype(df['Admissão'])
+
+
+def test_copia_de_gravacao_anterior_nao_e_usada(tmp_path):
+    caminho = str(tmp_path / 'modelo.xlsx')
+    salvar_tabelas(_tabelas(valor=1), caminho, formatos=['parquet'])
+    salvar_tabelas(_tabelas(valor=9), caminho, formatos=['xlsx'])
+    assert [formato for formato, _ in fontes_tabela_modelo(caminho, 'Fato_Contratos')] == ['xlsx']
+    assert ler_tabela_modelo(caminho, 'Fato_Contratos')['Pessoa_ID'].tolist() == [9, 2]